@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Agent Metrics for Lessons Learned Tracker
+Counters, gauges and latency histograms for resident agent processes, exposed in Prometheus text format.
+"""
+
+import os
+import time
+import atexit
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans a fast regex pass up to a slow `git log -p` over a large batch
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Seconds; an uncontended lock is taken in microseconds, a queue of writers waits for each other's rewrites
+LOCK_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Metric(ABC):
+    """One metric family; values are kept per label-value tuple."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every label set; called with the lock held."""
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        # An unlabelled counter reports 0 until its first increment, so rate() has a starting point
+        self.values: Dict[Tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(value)}" for key, value in sorted(self.values.items())]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        """Compute the values at scrape time; function returns {label-value tuple: value}."""
+        self.function = function
+
+    def _samples(self) -> List[str]:
+        values = dict(self.values)
+        if self.function:
+            try:
+                values.update(self.function())
+            except Exception:
+                pass
+        return [f"{self.name}{self._label_text(key)} {_number(value)}" for key, value in sorted(values.items())]
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            # Per-bucket counts, then +Inf, sum
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0.0] * (len(self.buckets) + 2)
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block, including when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self.series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, (('le', _number(bound)),))} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {_number(cumulative)}")
+        return lines
+
+class MetricsRegistry:
+    """Named metric families; asking for an existing name returns the same family."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """The whole registry in Prometheus text exposition format 0.0.4."""
+        with self.lock:
+            metrics = [self.metrics[name] for name in sorted(self.metrics)]
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _get_or_create(self, metric_class: type, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered as a different type or label set")
+            return metric
+
+class MetricsHTTPServer:
+    """Serves the registry at /metrics from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        self.registry = registry
+
+        handler = self._handler_class(registry)
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="lessons-metrics-http", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> "MetricsHTTPServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def _handler_class(registry: MetricsRegistry) -> type:
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return MetricsHandler
+
+class TextfileExporter:
+    """Periodically writes the registry to a node_exporter textfile-collector path.
+
+    Each write goes to a temporary file that is renamed over the target, so
+    the collector never reads a half-written file. A final write happens at
+    interpreter exit, which also covers short one-shot commands.
+    """
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 15.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="lessons-metrics-textfile", daemon=True)
+
+    def start(self) -> "TextfileExporter":
+        self.write()
+        self.thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self) -> None:
+        if not self.stop_event.is_set():
+            self.stop_event.set()
+            self.write()
+
+    def write(self) -> None:
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.registry.render())
+        os.replace(temp_path, self.path)
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+class PipelineMetrics:
+    """The metric families the lessons pipeline records.
+
+    Stage timings share one histogram labelled by stage: read, exchanges,
+    detection, formatting, write and git. Git time is also contained in the
+    detection time of the commit analysis that issued the command. Write
+    lock waits and file rewrites are labelled by the markdown file. With a
+    profiler attached, every stage also records its memory use.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        registry = registry or REGISTRY
+
+        self.stage_seconds = registry.histogram(
+            "lessons_stage_duration_seconds", "Time spent per pipeline stage.", ("stage",)
+        )
+        self.lessons = registry.counter(
+            "lessons_extracted_total", "Lessons extracted, by source.", ("source",)
+        )
+        self.exchanges_truncated = registry.counter(
+            "lessons_exchanges_truncated_total", "Chat exchanges whose pattern matching stopped at the time budget."
+        )
+        self.commits = registry.counter(
+            "lessons_commits_processed_total", "Commits analyzed after HEAD moved or a job ran."
+        )
+        self.sections_written = registry.counter(
+            "lessons_sections_written_total", "Lesson sections written to CLAUDE.md."
+        )
+        self.write_failures = registry.counter(
+            "lessons_write_failures_total", "CLAUDE.md updates that failed."
+        )
+        self.commit_lag = registry.gauge(
+            "lessons_commit_lag_seconds", "Seconds between the newest processed commit and the end of its analysis."
+        )
+        self.last_processed = registry.gauge(
+            "lessons_last_processed_timestamp_seconds", "Unix time of the last finished analysis."
+        )
+        self.lock_wait = registry.histogram(
+            "lessons_lock_wait_seconds", "Time spent waiting for a markdown file's write lock, by file.", ("file",),
+            buckets=LOCK_WAIT_BUCKETS
+        )
+        self.lock_contended = registry.counter(
+            "lessons_lock_contended_total", "Write lock acquisitions that had to wait for another writer, by file.", ("file",)
+        )
+        self.file_writes = registry.counter(
+            "lessons_file_writes_total", "Rewrites of a markdown file; one rewrite may apply several spooled sections.", ("file",)
+        )
+
+        # Optional StageMemoryProfiler (see memory-profiler.py)
+        self.profiler = None
+
+    def stage(self, name: str):
+        if self.profiler is None:
+            return self.stage_seconds.time(stage=name)
+        return self._profiled_stage(name)
+
+    @contextmanager
+    def _profiled_stage(self, name: str):
+        # Snapshots are taken outside the timer so they do not inflate the latency histogram
+        with self.profiler.stage(name), self.stage_seconds.time(stage=name):
+            yield
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+# Process-wide registry shared by every agent in the process
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Batch Categorizer for Lessons Learned Tracker
+Scores whole batches of commit messages or chat texts against a category taxonomy with matrix operations.
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; scoring falls back to pure Python
+    np = None
+
+class BatchCategorizer:
+    """Categorizes many texts at once using a term matrix against a keyword taxonomy.
+
+    Keyword semantics match the per-item analyzers: a keyword counts once per
+    text when it occurs as a substring of the lowercased text. All texts are
+    joined into one buffer and each keyword is located with a single C-level
+    split over it, so interpreter work is per keyword and per hit rather than
+    per text. The distinct (text, term) hits are the nonzeros of a sparse
+    presence matrix in coordinate form; scoring adds each hit's row of the
+    term→category weight matrix to its text's scores, so memory grows with
+    the hits rather than with texts × vocabulary. Presence rather than
+    occurrence counts is deliberate: it keeps the per-item scorers' rule
+    that a keyword counts once per text.
+    """
+
+    _SEPARATOR = "\x00"
+
+    def __init__(self, taxonomy: Dict[str, List[str]], first_match: bool = False):
+        """
+        taxonomy: ordered {category: [keywords]}.
+        first_match: pick the first category (in taxonomy order) with any hit,
+            as CommitAnalyzer does; otherwise pick the highest score with ties
+            going to the earlier category, as ChatPatternDetector does.
+        """
+        self.categories = list(taxonomy)
+        self.first_match = first_match
+
+        self.vocabulary = sorted({kw.lower() for kws in taxonomy.values() for kw in kws})
+        self.term_categories = [
+            [c for c, category in enumerate(self.categories) if term in (kw.lower() for kw in taxonomy[category])]
+            for term in self.vocabulary
+        ]
+
+        if np is not None:
+            self.weight_matrix = np.zeros((len(self.vocabulary), len(self.categories)), dtype=np.float32)
+            for i, categories in enumerate(self.term_categories):
+                self.weight_matrix[i, categories] = 1.0
+
+    def categorize(self, texts: List[str]) -> List[Tuple[Optional[str], float]]:
+        """Return (category, confidence) per text.
+
+        Confidence is the winning category's share of all category hits for
+        that text (0.0 when nothing matched). In first_match mode the category
+        is None when no keyword matched, so callers can apply their own fallback.
+        """
+        if not texts:
+            return []
+
+        rows, cols = self._scan(texts)
+
+        if np is not None:
+            return self._score_numpy(len(texts), rows, cols)
+        return self._score_python(len(texts), rows, cols)
+
+    def _scan(self, texts: List[str]) -> Tuple[List[int], List[int]]:
+        """Find (text index, term index) hits for every keyword over one joined buffer.
+
+        Splitting the buffer on a keyword yields the gaps between its
+        occurrences; their cumulative lengths give every occurrence offset.
+        Keywords never contain the separator, so a hit cannot span two texts,
+        and each text containing a keyword gets at least one hit for it.
+        """
+        # Lowercase before joining: some characters lowercase to more code points ('İ' -> 'i̇'),
+        # so offsets must come from the lowered texts
+        lowered = [text.lower() for text in texts]
+        buffer = self._SEPARATOR.join(lowered)
+        starts = list(accumulate((len(text) + 1 for text in lowered[:-1]), initial=0))
+
+        rows = []
+        cols = []
+        for term_index, term in enumerate(self.vocabulary):
+            pieces = buffer.split(term)
+            if len(pieces) == 1:
+                continue
+
+            if np is not None:
+                gaps = np.fromiter(map(len, pieces[:-1]), dtype=np.int64, count=len(pieces) - 1)
+                positions = np.cumsum(gaps + len(term)) - len(term)
+                rows.append(np.searchsorted(starts, positions, side='right') - 1)
+                cols.append(np.full(len(positions), term_index, dtype=np.int64))
+            else:
+                position = -len(term)
+                for piece in pieces[:-1]:
+                    position += len(piece) + len(term)
+                    rows.append(bisect_right(starts, position) - 1)
+                    cols.append(term_index)
+
+        if np is not None:
+            if not rows:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+            return np.concatenate(rows), np.concatenate(cols)
+
+        return rows, cols
+
+    def _score_numpy(self, count: int, rows, cols) -> List[Tuple[Optional[str], float]]:
+        # Distinct (text, term) pairs: the coordinates of the presence matrix's nonzeros
+        hits = np.unique(np.asarray(rows, dtype=np.int64) * len(self.vocabulary) + cols)
+        hit_rows, hit_cols = np.divmod(hits, len(self.vocabulary))
+
+        scores = np.zeros((count, len(self.categories)), dtype=np.float32)
+        np.add.at(scores, hit_rows, self.weight_matrix[hit_cols])
+        totals = scores.sum(axis=1)
+
+        if self.first_match:
+            hit = scores > 0
+            best = np.argmax(hit, axis=1)
+            # Unmatched rows map to the trailing None label
+            best[~hit.any(axis=1)] = len(self.categories)
+        else:
+            best = np.argmax(scores, axis=1)
+
+        best_scores = np.take_along_axis(np.pad(scores, ((0, 0), (0, 1))), best[:, None], axis=1)[:, 0]
+        confidence = np.divide(best_scores, totals, out=np.zeros(count, dtype=np.float32), where=totals > 0)
+
+        labels = np.array(self.categories + [None], dtype=object)[best]
+        return list(zip(labels.tolist(), np.round(confidence.astype(np.float64), 3).tolist()))
+
+    def _score_python(self, count: int, rows: List[int], cols: List[int]) -> List[Tuple[Optional[str], float]]:
+        presence = [set() for _ in range(count)]
+        for row, col in zip(rows, cols):
+            presence[row].add(col)
+
+        results = []
+        for terms in presence:
+            scores = [0] * len(self.categories)
+            for term in terms:
+                for category in self.term_categories[term]:
+                    scores[category] += 1
+
+            total = sum(scores)
+            if self.first_match:
+                best = next((c for c, score in enumerate(scores) if score > 0), None)
+            else:
+                best = max(range(len(scores)), key=lambda c: scores[c]) if scores else None
+
+            if best is None:
+                results.append((None, 0.0))
+            else:
+                results.append((self.categories[best], round(scores[best] / total, 3) if total else 0.0))
+
+        return results
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Bounded Matcher for Lessons Learned Tracker
+Runs lesson-detection regexes over sentence-sized windows with a per-exchange time budget, so pasted logs cannot trigger runaway backtracking.
+"""
+
+import re
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+class BoundedMatcher:
+    """Regex search limited to bounded windows and a per-exchange time budget.
+
+    Text is cut into sentences (split on . ! ? and newlines); sentences longer
+    than window_chars are cut into overlapping chunks. Each pattern only ever
+    sees one window, so even a pattern with nested lazy quantifiers costs at
+    most a fixed amount per window and the total stays linear in the text
+    length. Within an exchange_budget() block, searches stop returning matches
+    once the budget is spent; budget_exceeded counts the exchanges cut short,
+    and last_exchange_truncated tells whether the latest one was.
+    """
+
+    def __init__(self, window_chars: int = 400, overlap_chars: int = 60, budget_ms: Optional[float] = 50.0):
+        self.window_chars = window_chars
+        self.overlap_chars = overlap_chars
+        self.budget_ms = budget_ms
+
+        self.sentence_pattern = re.compile(r"[^.!?\n]+[.!?]*")
+        self.compiled = {}
+        self._deadline = None
+        self._spent = False
+        self.budget_exceeded = 0
+        self.last_exchange_truncated = False
+
+    @contextmanager
+    def exchange_budget(self):
+        """Apply the time budget to every search made inside the block."""
+        previous = (self._deadline, self._spent)
+        self._spent = False
+        if self.budget_ms is not None:
+            self._deadline = time.perf_counter() + self.budget_ms / 1000.0
+        try:
+            yield
+        finally:
+            self.last_exchange_truncated = self._spent
+            self._deadline, self._spent = previous
+
+    def expired(self) -> bool:
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            if not self._spent:
+                self._spent = True
+                self.budget_exceeded += 1
+            return True
+        return False
+
+    def search(self, pattern: str, text: str) -> Optional[re.Match]:
+        """First match of pattern in any window of text, or None (also when over budget)."""
+        compiled = self.compiled.get(pattern)
+        if compiled is None:
+            compiled = self.compiled[pattern] = re.compile(pattern)
+
+        if self.expired():
+            return None
+
+        if len(text) <= self.window_chars:
+            return compiled.search(text)
+
+        for window in self.windows(text):
+            match = compiled.search(window)
+            if match:
+                return match
+            if self.expired():
+                return None
+
+        return None
+
+    def windows(self, text: str) -> Iterator[str]:
+        """Yield sentence windows, chunking overlong sentences with overlap."""
+        step = self.window_chars - self.overlap_chars
+        for match in self.sentence_pattern.finditer(text):
+            sentence = match.group(0)
+            if len(sentence) <= self.window_chars:
+                yield sentence
+                continue
+
+            for start in range(0, len(sentence) - self.overlap_chars, step):
+                yield sentence[start:start + self.window_chars]
+
+# Inputs that made the original unbounded patterns backtrack super-linearly.
+# Each entry is (name, pattern, input generator for a size n).
+ADVERSARIAL_CORPUS: List[Tuple[str, str, Callable[[int], str]]] = [
+    ("added-and-no-work", r"(?i)(added|changed|modified|updated).*and.*work", lambda n: "added and " * n),
+    ("spent-no-digits", r"(?i)(spent|took|wasted).*?(\d+)\s*(hour|minute|min)s?", lambda n: "spent " * n),
+    ("hours-no-fix", r"(?i)(\d+)\s*(hour|minute|min)s?.*?(debug|fix|solve)", lambda n: "5 hours " * n),
+    ("for-page-no-stop", r"(?i)(?:for|in|on)\s+(.*?(?:page|view|component|feature|wizard))(?:\.|,|$)", lambda n: "for page " * n + "\n"),
+    ("navigation-no-failure", r"(?i)(navigation.*?(?:not working|broken|failed))", lambda n: "navigation " * n),
+    ("handle-no-issue", r"(?i)(address|handle|solve)\s+(.+?)\s+(issue|error|problem)", lambda n: "handle x " * n),
+    ("pasted-log", r"(?i)(team|user|workout|competition|earnings)\s+(.*?)(?:$|\s+-)", lambda n: "user id=42 " * n + "\n" + "x" * n),
+]
+
+def run_selfcheck(patterns: Dict[str, str], base_size: int = 2000, max_ratio: float = 6.0) -> bool:
+    """Time each corpus input at n, 2n and 4n against the shipped patterns.
+
+    patterns maps a corpus name to the bounded replacement pattern now used
+    by the analyzers. Linear behaviour means the 4n run costs about 4x the n
+    run; anything above max_ratio is reported as a failure.
+    """
+    matcher = BoundedMatcher(budget_ms=None)
+    all_linear = True
+
+    for name, original, generate in ADVERSARIAL_CORPUS:
+        pattern = patterns.get(name, original)
+        timings = []
+        for size in (base_size, 2 * base_size, 4 * base_size):
+            text = generate(size)
+            start = time.perf_counter()
+            matcher.search(pattern, text)
+            timings.append(max(time.perf_counter() - start, 1e-6))
+
+        ratio = timings[2] / timings[0]
+        linear = ratio <= max_ratio
+        all_linear = all_linear and linear
+        print(f"{'✅' if linear else '❌'} {name}: " + ", ".join(f"{t * 1000:.1f}ms" for t in timings) + f" (4n/n = {ratio:.1f})")
+
+    return all_linear
+
+if __name__ == "__main__":
+    # Check the patterns the analyzers actually ship with
+    import os
+    import importlib.util
+
+    def load(module_name: str, file_name: str):
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    chat_detector = load("chat_pattern_detector", "chat-pattern-detector.py").ChatPatternDetector()
+    commit_analyzer = load("commit_analyzer", "commit-analyzer.py").CommitAnalyzer()
+
+    shipped = {
+        "added-and-no-work": chat_detector.solution_patterns[4],
+        "spent-no-digits": chat_detector.time_patterns[0],
+        "hours-no-fix": chat_detector.time_patterns[1],
+        "for-page-no-stop": chat_detector.context_patterns[2],
+        "navigation-no-failure": commit_analyzer.error_descriptions[3],
+        "handle-no-issue": commit_analyzer.fix_patterns[2],
+        "pasted-log": commit_analyzer.context_patterns[2],
+    }
+
+    sys.exit(0 if run_selfcheck(shipped) else 1)
@@ -6,8 +6,10 @@ Monitors chat conversations to extract problem-solution pairs for documentation.
 
 import re
 import json
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Deque, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
 @dataclass
@@ -18,11 +20,100 @@ class LessonPattern:
     category: str
     time_spent: Optional[str] = None
     files_involved: List[str] = None
+    timestamp: Optional[str] = None
+
+# Words too common, or too tied to the error/solution phrasing itself, to show two exchanges are about the same thing
+PAIRING_STOPWORDS = frozenset("""
+    the and for with that this was were are but not you your have has had from into out then than them they
+    there when what which while will would can could should just now also only still some any all get got
+    let check see try tried trying need needed make made use used does did done its it's i'm don't didn't
+    user assistant tool error errors failed failing fails broken working work works fixed fix fixes solved
+    issue issues problem problems solution resolved turns found actually root cause added changed modified updated
+""".split())
+
+# Source, resource and config files a conversation may name; extensions are listed so
+# member access such as self.view or a version like 1.5 is not taken for a file
+FILE_EXTENSIONS = (
+    "swift", "m", "mm", "h", "c", "cpp", "py", "js", "ts", "tsx", "jsx", "json", "sql", "plist",
+    "storyboard", "xib", "xcconfig", "entitlements", "strings", "pbxproj", "xcscheme", "md",
+    "yml", "yaml", "toml", "sh", "rb", "gradle", "kt", "java", "html", "css", "txt"
+)
+FILE_MENTION_PATTERN = re.compile(
+    r'(?<![\w/.-])(?:\./)?((?:[\w.-]+/)*[\w-]+(?:\.[\w-]+)*\.(?:' + '|'.join(FILE_EXTENSIONS) + r'))(?![\w/])'
+)
+
+@dataclass
+class OpenProblem:
+    index: int
+    text: str
+    keywords: FrozenSet[str]
+
+class ProblemWindow:
+    """Problems from recent exchanges that no later exchange has solved yet.
+    
+    Holds at most `size` problems, and only those raised within the last
+    `size` exchanges, so pairing costs O(size) per exchange and one pass
+    over a stream stays linear.
+    """
+    
+    def __init__(self, size: int = 8, min_overlap: int = 1, adjacent: int = 2):
+        self.size = size
+        self.min_overlap = min_overlap
+        self.adjacent = adjacent
+        
+        self.problems: Deque[OpenProblem] = deque(maxlen=size)
+        self.index = -1
+    
+    def advance(self) -> None:
+        """Move to the next exchange, dropping problems that fell out of the window."""
+        self.index += 1
+        while self.problems and self.problems[0].index <= self.index - self.size:
+            self.problems.popleft()
+    
+    def add(self, text: str, keywords: FrozenSet[str]) -> None:
+        self.problems.append(OpenProblem(self.index, text, keywords))
+    
+    def take(self, keywords: FrozenSet[str]) -> Optional[OpenProblem]:
+        """Remove and return the open problem a solution most likely answers.
+        
+        That is the problem sharing the most keywords with the solution, the
+        most recent one on ties. If none shares min_overlap keywords, the
+        latest problem still qualifies when it is at most `adjacent`
+        exchanges back, as in an error report answered by the next reply.
+        """
+        best = None
+        best_overlap = 0
+        for position in range(len(self.problems) - 1, -1, -1):
+            overlap = len(self.problems[position].keywords & keywords)
+            if overlap > best_overlap:
+                best, best_overlap = position, overlap
+        
+        if best_overlap < self.min_overlap:
+            best = None
+            if self.problems and self.index - self.problems[-1].index <= self.adjacent:
+                best = len(self.problems) - 1
+        
+        if best is None:
+            return None
+        problem = self.problems[best]
+        del self.problems[best]
+        return problem
     
 class ChatPatternDetector:
     """Detects problem-solution patterns in chat conversations."""
     
-    def __init__(self):
+    def __init__(self, categorizer_class: Optional[type] = None, matcher=None, pairing_window: int = 8, metrics=None):
+        # Optional BoundedMatcher (see bounded-matcher.py) for windowed, time-budgeted searches
+        self.matcher = matcher
+        
+        # Optional PipelineMetrics (see agent-metrics.py); exchanges cut short by the budget are counted
+        self.metrics = metrics
+        
+        # Exchanges a reported problem stays open for a later solution to claim; 0 disables pairing
+        self.pairing_window = pairing_window
+        
+        # Gaps between keywords use bounded [^\n]{0,N} runs instead of .* so a
+        # failed match cannot backtrack across an entire pasted log line
         self.error_patterns = [
             r"(?i)(didn't work|not working|broken|failed|error)",
             r"(?i)(blank page|nothing shows|not appearing)",
@@ -36,13 +127,19 @@ class ChatPatternDetector:
             r"(?i)(turns out|actually need to|found out)",
             r"(?i)(working now|solved|got it working)",
             r"(?i)(the issue was|root cause)",
-            r"(?i)(added|changed|modified|updated).*and.*work"
+            r"(?i)(added|changed|modified|updated)[^\n]{0,160}?and[^\n]{0,160}?work"
         ]
         
         self.time_patterns = [
-            r"(?i)(spent|took|wasted).*?(\d+)\s*(hour|minute|min)s?",
-            r"(?i)(\d+)\s*(hour|minute|min)s?.*?(debug|fix|solve)",
-            r"(?i)(finally|eventually).*?(\d+)\s*(hour|minute|min)s?"
+            r"(?i)(spent|took|wasted)[^\n]{0,80}?(\d+)\s*(hour|minute|min)s?",
+            r"(?i)(\d+)\s*(hour|minute|min)s?[^\n]{0,80}?(debug|fix|solve)",
+            r"(?i)(finally|eventually)[^\n]{0,80}?(\d+)\s*(hour|minute|min)s?"
+        ]
+        
+        self.context_patterns = [
+            r"(?i)(implementing|building|creating|working on|adding)\s+([^\n]{1,160}?)(?:\.|,|$)",
+            r"(?i)(trying to|attempting to)\s+([^\n]{1,160}?)(?:\.|,|$)",
+            r"(?i)(?:for|in|on)\s+([^\n]{0,120}?(?:page|view|component|feature|wizard))(?:\.|,|$)"
         ]
         
         self.category_keywords = {
@@ -53,81 +150,178 @@ class ChatPatternDetector:
             "Architecture": ["delegate", "pattern", "service", "manager", "singleton"],
             "Performance": ["memory", "background", "sync", "performance", "optimization"]
         }
+        
+        # Optional vectorized scorer used for batches (see batch-categorizer.py)
+        self.batch_categorizer = categorizer_class(self.category_keywords) if categorizer_class else None
     
     def extract_lessons_from_conversation(self, conversation_text: str) -> List[LessonPattern]:
         """Extract lesson patterns from a conversation transcript."""
-        lessons = []
-        
         # Split conversation into exchanges
         exchanges = self._split_into_exchanges(conversation_text)
         
+        return list(self.iter_lessons(exchanges))
+    
+    def iter_lessons(self, exchanges: Iterable[str], batch_size: int = 256) -> Iterator[LessonPattern]:
+        """Yield lessons one exchange at a time without holding the transcript.
+        
+        A problem reported in one exchange is paired with a solution in a
+        later one (see ProblemWindow) as well as within a single exchange.
+        Lessons are categorized batch_size at a time with categorize_batch().
+        """
+        window = self.problem_window()
+        lessons = []
+        category_texts = []
         for exchange in exchanges:
-            lesson = self._analyze_exchange(exchange)
+            lesson = self._analyze_exchange(exchange, window, category_texts)
             if lesson:
                 lessons.append(lesson)
-                
+                if len(lessons) >= batch_size:
+                    yield from self._categorized(lessons, category_texts)
+                    lessons, category_texts = [], []
+        yield from self._categorized(lessons, category_texts)
+    
+    def _categorized(self, lessons: List[LessonPattern], category_texts: List[str]) -> List[LessonPattern]:
+        for lesson, (category, _) in zip(lessons, self.categorize_batch(category_texts)):
+            lesson.category = category
         return lessons
     
+    def problem_window(self) -> Optional[ProblemWindow]:
+        """Fresh cross-exchange pairing state for one stream, or None when pairing is off."""
+        return ProblemWindow(self.pairing_window) if self.pairing_window > 0 else None
+    
     def _split_into_exchanges(self, text: str) -> List[str]:
         """Split conversation into problem-solution exchanges."""
-        # Split by user/assistant markers or timestamps
-        exchanges = []
-        current_exchange = ""
+        return list(self.iter_exchanges(text.split('\n')))
+    
+    def iter_exchanges(self, lines: Iterable[str], max_exchange_chars: Optional[int] = None) -> Iterator[str]:
+        """Yield exchanges from a stream of lines (e.g. an open file).
+        
+        Splits on user/assistant markers or timestamps. With max_exchange_chars,
+        an exchange that grows past the limit is emitted in pieces so a
+        marker-less log cannot grow without bound, and a single line longer
+        than the limit is cut into limit-sized chunks. Pair with
+        read_bounded_lines() so such a line is not read whole either.
+        """
+        current_lines = []
+        current_size = 0
         
-        lines = text.split('\n')
-        for line in lines:
+        for line in _chunk_lines(lines, max_exchange_chars):
             if any(pattern in line.lower() for pattern in ["user:", "assistant:", "error:", "fixed:"]):
-                if current_exchange.strip():
-                    exchanges.append(current_exchange.strip())
-                current_exchange = line
-            else:
-                current_exchange += "\n" + line
-        
-        if current_exchange.strip():
-            exchanges.append(current_exchange.strip())
+                exchange = '\n'.join(current_lines).strip()
+                if exchange:
+                    yield exchange
+                current_lines = []
+                current_size = 0
+            elif max_exchange_chars and current_size + len(line) > max_exchange_chars:
+                exchange = '\n'.join(current_lines).strip()
+                if exchange:
+                    yield exchange
+                current_lines = []
+                current_size = 0
             
-        return exchanges
+            current_lines.append(line)
+            current_size += len(line) + 1
+        
+        exchange = '\n'.join(current_lines).strip()
+        if exchange:
+            yield exchange
+    
+    def _analyze_exchange(self, exchange: str, window: Optional[ProblemWindow] = None,
+                          category_texts: Optional[List[str]] = None) -> Optional[LessonPattern]:
+        """Analyze a single exchange for lesson patterns.
+        
+        With a window, exchanges are expected in stream order: a problem
+        without a solution is kept open, and a solution without a problem
+        is paired with the open problem it most likely answers.
+        
+        With category_texts, the lesson is left uncategorized and the text to
+        categorize it by is appended there, for a later categorize_batch().
+        
+        When the matcher's time budget runs out, the remaining searches find
+        nothing; the exchange is reported as truncated rather than dropped
+        silently.
+        """
+        with self._exchange_budget():
+            lesson = self._analyze_exchange_within_budget(exchange, window, category_texts)
+        
+        if self.matcher and self.matcher.last_exchange_truncated:
+            if self.metrics:
+                self.metrics.exchanges_truncated.inc()
+            preview = ' '.join(exchange[:60].split())
+            print(f"⚠️ Matching budget spent, exchange only partly analyzed: {preview}...")
+        return lesson
     
-    def _analyze_exchange(self, exchange: str) -> Optional[LessonPattern]:
-        """Analyze a single exchange for lesson patterns."""
-        has_error = any(re.search(pattern, exchange) for pattern in self.error_patterns)
-        has_solution = any(re.search(pattern, exchange) for pattern in self.solution_patterns)
+    def _analyze_exchange_within_budget(self, exchange: str, window: Optional[ProblemWindow] = None,
+                                        category_texts: Optional[List[str]] = None) -> Optional[LessonPattern]:
+        has_error = any(self._search(pattern, exchange) for pattern in self.error_patterns)
+        has_solution = any(self._search(pattern, exchange) for pattern in self.solution_patterns)
+        
+        if window is not None:
+            window.advance()
         
-        if not (has_error and has_solution):
+        if has_error and has_solution:
+            return self._build_lesson(exchange, exchange, exchange, category_texts)
+        
+        if window is None or not (has_error or has_solution):
             return None
-            
-        # Extract components
-        context = self._extract_context(exchange)
-        problem = self._extract_problem(exchange)
-        solution = self._extract_solution(exchange)
-        category = self._categorize_lesson(exchange)
-        time_spent = self._extract_time_spent(exchange)
-        files_involved = self._extract_files(exchange)
+        
+        keywords = self._pairing_keywords(exchange)
+        if has_error:
+            window.add(exchange, keywords)
+            return None
+        
+        open_problem = window.take(keywords)
+        if not open_problem:
+            return None
+        return self._build_lesson(f"{open_problem.text}\n{exchange}", open_problem.text, exchange, category_texts)
+    
+    def _build_lesson(self, text: str, problem_text: str, solution_text: str,
+                      category_texts: Optional[List[str]] = None) -> Optional[LessonPattern]:
+        """Extract a lesson from text, taking the problem and solution from their own exchanges."""
+        context = self._extract_context(text)
+        problem = self._extract_problem(problem_text)
+        solution = self._extract_solution(solution_text)
+        category = self._categorize_lesson(text) if category_texts is None else None
+        time_spent = self._extract_time_spent(text)
+        files_involved = self._extract_files(text)
+        timestamp = self._extract_timestamp(solution_text) or self._extract_timestamp(text)
         
         if problem and solution:
+            if category_texts is not None:
+                category_texts.append(text)
             return LessonPattern(
                 context=context,
                 problem=problem,
                 solution=solution,
                 category=category,
                 time_spent=time_spent,
-                files_involved=files_involved
+                files_involved=files_involved,
+                timestamp=timestamp
             )
         
         return None
     
+    @staticmethod
+    def _pairing_keywords(text: str) -> FrozenSet[str]:
+        return frozenset(re.findall(r'[a-z][a-z0-9_]{2,}', text.lower())) - PAIRING_STOPWORDS
+    
+    def _search(self, pattern: str, text: str) -> Optional[re.Match]:
+        """Search through the bounded matcher when one is configured."""
+        if self.matcher:
+            return self.matcher.search(pattern, text)
+        return re.search(pattern, text)
+    
+    def _exchange_budget(self):
+        """Per-exchange time budget from the matcher, or a no-op."""
+        return self.matcher.exchange_budget() if self.matcher else nullcontext()
+    
     def _extract_context(self, text: str) -> str:
         """Extract what was being built/worked on."""
-        context_patterns = [
-            r"(?i)(implementing|building|creating|working on|adding)\s+(.+?)(?:\.|,|$)",
-            r"(?i)(trying to|attempting to)\s+(.+?)(?:\.|,|$)",
-            r"(?i)(?:for|in|on)\s+(.*?(?:page|view|component|feature|wizard))(?:\.|,|$)"
-        ]
-        
-        for pattern in context_patterns:
-            match = re.search(pattern, text)
+        for pattern in self.context_patterns:
+            match = self._search(pattern, text)
             if match:
-                return match.group(2).strip()
+                # The last group holds the subject; the "for/in/on" pattern has only one
+                return match.group(match.lastindex).strip()
         
         return "Development work"
     
@@ -137,7 +331,7 @@ class ChatPatternDetector:
         sentences = re.split(r'[.!?]+', text)
         
         for sentence in sentences:
-            if any(re.search(pattern, sentence) for pattern in self.error_patterns):
+            if any(self._search(pattern, sentence) for pattern in self.error_patterns):
                 return sentence.strip()
         
         return "Issue encountered"
@@ -148,7 +342,7 @@ class ChatPatternDetector:
         sentences = re.split(r'[.!?]+', text)
         
         for sentence in sentences:
-            if any(re.search(pattern, sentence) for pattern in self.solution_patterns):
+            if any(self._search(pattern, sentence) for pattern in self.solution_patterns):
                 return sentence.strip()
         
         return "Solution applied"
@@ -166,10 +360,17 @@ class ChatPatternDetector:
         
         return "General"
     
+    def categorize_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Categorize many texts at once, returning (category, confidence) per text."""
+        if not self.batch_categorizer:
+            return [(self._categorize_lesson(text), 1.0) for text in texts]
+        
+        return [(category or "General", confidence) for category, confidence in self.batch_categorizer.categorize(texts)]
+    
     def _extract_time_spent(self, text: str) -> Optional[str]:
         """Extract time spent on the issue."""
         for pattern in self.time_patterns:
-            match = re.search(pattern, text)
+            match = self._search(pattern, text)
             if match:
                 number = match.group(2) if len(match.groups()) > 1 else match.group(1)
                 unit = match.group(3) if len(match.groups()) > 2 else match.group(2)
@@ -177,16 +378,21 @@ class ChatPatternDetector:
         
         return None
     
+    @staticmethod
+    def _extract_timestamp(text: str) -> Optional[str]:
+        """First ISO-style date and time in the text (log prefixes, JSONL "timestamp" fields)."""
+        match = re.search(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?', text)
+        return match.group(0) if match else None
+    
     def _extract_files(self, text: str) -> List[str]:
-        """Extract file names mentioned in the conversation."""
-        # Look for Swift file patterns
-        swift_files = re.findall(r'(\w+(?:View|Controller|Service|Manager)\.swift)', text)
+        """Extract file names and paths mentioned in the conversation, in order of first mention.
         
-        # Look for explicit file paths
-        file_paths = re.findall(r'(\w+/\w+/\w+\.swift)', text)
+        A bare name is dropped when the same file is also mentioned by path.
+        """
+        mentions = list(dict.fromkeys(match.group(1) for match in FILE_MENTION_PATTERN.finditer(text)))
         
-        files = list(set(swift_files + file_paths))
-        return files[:5]  # Limit to most relevant files
+        path_names = {mention.rsplit('/', 1)[-1] for mention in mentions if '/' in mention}
+        return [mention for mention in mentions if '/' in mention or mention not in path_names]
     
     def format_lesson_for_claude_md(self, lesson: LessonPattern, lesson_number: int) -> str:
         """Format a lesson for inclusion in CLAUDE.md."""
@@ -252,6 +458,23 @@ class ChatPatternDetector:
         
         return category_tips.get(lesson.category, "Document and test solution for future reference")
 
+def read_bounded_lines(stream, max_chars: int) -> Iterator:
+    """Lines of a text or binary stream, read at most max_chars at a time.
+    
+    A longer line arrives as several pieces, so memory stays bounded even
+    for a pasted log with no newlines.
+    """
+    return iter(lambda: stream.readline(max_chars), stream.read(0))
+
+def _chunk_lines(lines: Iterable[str], max_chars: Optional[int]) -> Iterator[str]:
+    for line in lines:
+        line = line.rstrip('\n')
+        if not max_chars or len(line) <= max_chars:
+            yield line
+            continue
+        for start in range(0, len(line), max_chars):
+            yield line[start:start + max_chars]
+
 # Example usage for the agent
 if __name__ == "__main__":
     detector = ChatPatternDetector()
@@ -6,46 +6,265 @@ Handles updating CLAUDE.md with new lessons while maintaining existing structure
 
 import re
 import os
+import json
+import time
+import uuid
+import fcntl
+import hashlib
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Written when lessons arrive for a file that does not exist yet
+NEW_FILE_TEMPLATE = "# {title}\n\n## Development Lessons Learned\n"
 
 class ClaudeMdUpdater:
     """Updates CLAUDE.md with new lessons while preserving structure."""
     
-    def __init__(self, claude_md_path: str):
+    def __init__(self, claude_md_path: str, max_backups: int = 10, coalesce_window: float = 0.1, metrics=None,
+                 max_applied_keys: int = 10000):
         self.claude_md_path = claude_md_path
         self.backup_path = claude_md_path + ".backup"
+        
+        # Ring of content-addressed backups: <sha256>.md blobs plus an ordered index
+        self.backup_dir = claude_md_path + ".backups"
+        self.backup_index_path = os.path.join(self.backup_dir, "index.json")
+        self.max_backups = max_backups
+        
+        # Cross-process write coordination: advisory lock plus a spool of pending inserts
+        self.lock_path = claude_md_path + ".lock"
+        self.spool_dir = claude_md_path + ".spool"
+        self.coalesce_window = coalesce_window
+        
+        # Durable copy of an in-progress region write, replayed if the write was interrupted
+        self.journal_path = claude_md_path + ".journal"
+        
+        # Lesson statistics kept up to date by applying a delta on every write
+        self.stats_path = claude_md_path + ".stats.json"
+        
+        # Write keys of the most recent keyed inserts, so a re-run job does not add its sections twice
+        self.applied_path = claude_md_path + ".applied.json"
+        self.max_applied_keys = max_applied_keys
+        
+        # Optional PipelineMetrics: lock waits and rewrites, labelled by file name
+        self.metrics = metrics
     
     def add_lesson_to_section(self, lesson_content: str, category: str, feature_name: str) -> bool:
         """Add a new lesson section to CLAUDE.md."""
+        return self.add_lesson_sections([(lesson_content, category, feature_name)])
+    
+    def add_lesson_sections(self, sections: List[Tuple[str, str, str]], write_key: Optional[str] = None) -> bool:
+        """Add several (lesson_content, category, feature_name) sections in one write.
+        
+        Inserts are spooled to disk first, so concurrent writers never lose each
+        other's updates: whoever holds the lock drains every pending insert.
+        With a write_key (e.g. the hash of a hook event), the sections are
+        written at most once per key: a second call with the same key, even
+        one running concurrently, succeeds without writing anything.
+        """
+        if not sections:
+            return True
+        
+        batch = uuid.uuid4().hex
+        entry_paths = [
+            self._spool_insert(lesson_content, category, feature_name, write_key, batch)
+            for lesson_content, category, feature_name in sections
+        ]
+        
+        with self._locked(coalesce=True, own_entries=entry_paths):
+            if not any(os.path.exists(path) for path in entry_paths):
+                # Another writer already applied our inserts
+                return True
+            
+            self._apply_spooled_inserts()
+        
+        return not any(os.path.exists(path) for path in entry_paths)
+    
+    @contextmanager
+    def _locked(self, coalesce: bool = False, own_entries: List[str] = ()):
+        """Hold the CLAUDE.md advisory lock for a read-modify-write cycle.
+        
+        With coalesce=True, a writer that gets the lock uncontended during a
+        burst waits for the coalesce window, so the burst's inserts land in
+        a single write. A lone writer does not wait.
+        """
+        # Read before open(), which creates a missing lock file with a fresh mtime
+        last_write = os.path.getmtime(self.lock_path) if os.path.exists(self.lock_path) else None
+        with open(self.lock_path, 'a') as lock_file:
+            waited = 0.0
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if coalesce and self.coalesce_window > 0 and self._burst_in_progress(own_entries, last_write):
+                    time.sleep(self.coalesce_window)
+            except BlockingIOError:
+                started = time.perf_counter()
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                waited = time.perf_counter() - started
+                if self.metrics:
+                    self.metrics.lock_contended.inc(file=os.path.basename(self.claude_md_path))
+            
+            if self.metrics:
+                self.metrics.lock_wait.observe(waited, file=os.path.basename(self.claude_md_path))
+            
+            self._replay_journal()
+            
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _burst_in_progress(self, own_entries: List[str], last_write: Optional[float]) -> bool:
+        """Other writers' inserts are pending, or the file was written moments ago.
+        
+        last_write is the lock file's mtime, which _apply_spooled_inserts
+        touches after every write.
+        """
+        own_names = {os.path.basename(path) for path in own_entries}
+        try:
+            if any(name.endswith(".json") and name not in own_names for name in os.listdir(self.spool_dir)):
+                return True
+        except OSError:
+            return False
+        return last_write is not None and time.time() - last_write < 10 * self.coalesce_window
+    
+    def _spool_insert(self, lesson_content: str, category: str, feature_name: str,
+                      write_key: Optional[str] = None, batch: Optional[str] = None) -> str:
+        """Durably queue an insert; file names sort in arrival order."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        
+        name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        entry_path = os.path.join(self.spool_dir, name)
+        tmp_path = os.path.join(self.spool_dir, "." + name + ".tmp")
+        
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "lesson_content": lesson_content,
+                "category": category,
+                "feature_name": feature_name,
+                "write_key": write_key,
+                "batch": batch
+            }, f)
+        os.replace(tmp_path, entry_path)
+        
+        return entry_path
+    
+    def _apply_spooled_inserts(self) -> bool:
+        """Apply every pending insert with one write. Caller must hold the lock."""
+        try:
+            names = sorted(name for name in os.listdir(self.spool_dir) if name.endswith(".json"))
+        except FileNotFoundError:
+            return True
+        
+        entries = []
+        for name in names:
+            entry_path = os.path.join(self.spool_dir, name)
+            try:
+                with open(entry_path, 'r') as f:
+                    entries.append((entry_path, json.load(f)))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Quarantining unreadable spool entry {name}: {e}")
+                os.replace(entry_path, entry_path + ".bad")
+        
+        if not entries:
+            return True
+        
+        # Keyed inserts already written, or spooled by an earlier batch with the same key, are dropped
+        applied_set = set(self._load_applied_keys())
+        key_batches = {}
+        pending = []
+        for entry_path, entry in entries:
+            key = entry.get('write_key')
+            if key and (key in applied_set or key_batches.setdefault(key, entry.get('batch')) != entry.get('batch')):
+                os.remove(entry_path)
+                print(f"⏭️ Skipped {entry['feature_name']} lesson already written for {key}")
+            else:
+                pending.append((entry_path, entry))
+        entries = pending
+        if not entries:
+            return True
+        
         try:
             # Create backup
             self._create_backup()
             
-            # Read current content
-            with open(self.claude_md_path, 'r') as f:
-                content = f.read()
-            
-            # Find insertion point
-            insertion_point = self._find_section_insertion_point(content, category)
-            
-            # Insert new section
-            updated_content = self._insert_lesson_section(content, lesson_content, insertion_point)
+            # Read current content, starting a missing file from the template
+            if os.path.exists(self.claude_md_path):
+                with open(self.claude_md_path, 'r') as f:
+                    content = f.read()
+                updated_content = content
+            else:
+                print(f"📄 Creating {os.path.basename(self.claude_md_path)} for {len(entries)} pending lesson(s)")
+                content = ""
+                updated_content = NEW_FILE_TEMPLATE.format(title=os.path.splitext(os.path.basename(self.claude_md_path))[0])
             
-            # Write updated content
-            with open(self.claude_md_path, 'w') as f:
-                f.write(updated_content)
+            for _, entry in entries:
+                # Find insertion point
+                insertion_point = self._find_section_insertion_point(updated_content, entry['category'])
+                
+                # Insert new section
+                updated_content = self._insert_lesson_section(updated_content, entry['lesson_content'], insertion_point)
             
-            print(f"✅ Added {feature_name} lesson to CLAUDE.md")
-            return True
+            # Write only the changed region; the journal also retires the spool entries and their keys
+            self._write_changed_region(content, updated_content, spooled=[path for path, _ in entries],
+                                       write_keys=list(key_batches))
+            os.utime(self.lock_path)
+            if self.metrics:
+                self.metrics.file_writes.inc(file=os.path.basename(self.claude_md_path))
             
         except Exception as e:
             print(f"❌ Error updating CLAUDE.md: {e}")
             self._restore_backup()
             return False
+        
+        for _, entry in entries:
+            print(f"✅ Added {entry['feature_name']} lesson to CLAUDE.md")
+        
+        return True
+    
+    def _load_applied_keys(self) -> List[str]:
+        try:
+            with open(self.applied_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+    
+    def _save_applied_keys(self, keys: List[str]):
+        """Keep the newest max_applied_keys keys. Caller must hold the lock."""
+        keys = list(dict.fromkeys(keys))
+        tmp_path = self.applied_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(keys[-self.max_applied_keys:], f)
+        os.replace(tmp_path, self.applied_path)
+    
+    def update_content(self, edit: Callable[[str], str]) -> bool:
+        """Replace the file with edit(current content) under the lock, backed up and region-written."""
+        with self._locked():
+            try:
+                self._create_backup()
+                
+                content = ""
+                if os.path.exists(self.claude_md_path):
+                    with open(self.claude_md_path, 'r') as f:
+                        content = f.read()
+                
+                updated_content = edit(content)
+                if updated_content != content:
+                    self._write_changed_region(content, updated_content)
+                    if self.metrics:
+                        self.metrics.file_writes.inc(file=os.path.basename(self.claude_md_path))
+                return True
+                
+            except Exception as e:
+                print(f"❌ Error updating {os.path.basename(self.claude_md_path)}: {e}")
+                self._restore_backup()
+                return False
     
     def add_lesson_points_to_existing_section(self, section_name: str, new_points: List[str]) -> bool:
         """Add new numbered points to an existing lesson section."""
+        with self._locked():
+            return self._add_lesson_points(section_name, new_points)
+    
+    def _add_lesson_points(self, section_name: str, new_points: List[str]) -> bool:
         try:
             self._create_backup()
             
@@ -80,8 +299,7 @@ class ClaudeMdUpdater:
             
             updated_content = content[:insert_pos] + formatted_points + content[insert_pos:]
             
-            with open(self.claude_md_path, 'w') as f:
-                f.write(updated_content)
+            self._write_changed_region(content, updated_content)
             
             print(f"✅ Added {len(new_points)} points to {section_name}")
             return True
@@ -93,6 +311,10 @@ class ClaudeMdUpdater:
     
     def update_section_takeaway(self, section_name: str, new_takeaway: str) -> bool:
         """Update the key takeaway for an existing section."""
+        with self._locked():
+            return self._update_takeaway(section_name, new_takeaway)
+    
+    def _update_takeaway(self, section_name: str, new_takeaway: str) -> bool:
         try:
             self._create_backup()
             
@@ -115,8 +337,7 @@ class ClaudeMdUpdater:
                 updated_section = section_content.replace(old_takeaway, f"**Key Takeaway**: {new_takeaway}")
                 updated_content = content[:section_start] + updated_section
                 
-                with open(self.claude_md_path, 'w') as f:
-                    f.write(updated_content)
+                self._write_changed_region(content, updated_content)
                 
                 print(f"✅ Updated takeaway for {section_name}")
                 return True
@@ -127,23 +348,238 @@ class ClaudeMdUpdater:
             
         return False
     
-    def _create_backup(self):
-        """Create backup of CLAUDE.md before modification."""
-        if os.path.exists(self.claude_md_path):
-            with open(self.claude_md_path, 'r') as src:
-                content = src.read()
-            with open(self.backup_path, 'w') as dst:
-                dst.write(content)
+    def _create_backup(self) -> Optional[str]:
+        """Snapshot CLAUDE.md into the backup ring before modification.
+        
+        Backups are stored by content hash, so an unchanged file is never
+        copied twice; the index keeps the most recent `max_backups` versions.
+        """
+        if not os.path.exists(self.claude_md_path):
+            return None
+        
+        with open(self.claude_md_path, 'rb') as src:
+            data = src.read()
+        
+        backup_id = hashlib.sha256(data).hexdigest()[:16]
+        blob_path = os.path.join(self.backup_dir, f"{backup_id}.md")
+        
+        os.makedirs(self.backup_dir, exist_ok=True)
+        if not os.path.exists(blob_path):
+            tmp_path = blob_path + ".tmp"
+            with open(tmp_path, 'wb') as dst:
+                dst.write(data)
+            os.replace(tmp_path, blob_path)
+        
+        index = [entry for entry in self._load_backup_index() if entry['id'] != backup_id]
+        index.append({
+            "id": backup_id,
+            "size": len(data),
+            "created": datetime.now().isoformat()
+        })
+        
+        # Drop the oldest versions beyond the ring size
+        expired = index[:-self.max_backups] if len(index) > self.max_backups else []
+        index = index[len(expired):]
+        self._save_backup_index(index)
+        
+        for entry in expired:
+            try:
+                os.remove(os.path.join(self.backup_dir, f"{entry['id']}.md"))
+            except OSError:
+                pass
+        
+        return backup_id
     
     def _restore_backup(self):
-        """Restore CLAUDE.md from backup if update fails."""
-        if os.path.exists(self.backup_path):
+        """Restore CLAUDE.md from the most recent backup if update fails."""
+        index = self._load_backup_index()
+        if index:
+            self._restore_backup_by_id(index[-1]['id'])
+        elif os.path.exists(self.backup_path):
+            # Legacy single-file backup from older versions of the updater
             with open(self.backup_path, 'r') as src:
                 content = src.read()
             with open(self.claude_md_path, 'w') as dst:
                 dst.write(content)
             print("🔄 Restored CLAUDE.md from backup")
     
+    def list_backups(self) -> List[Dict[str, any]]:
+        """List available backups, oldest first."""
+        return self._load_backup_index()
+    
+    def restore_backup(self, backup_id: str) -> bool:
+        """Restore CLAUDE.md to the backup with the given id (prefix match allowed)."""
+        with self._locked():
+            return self._restore_backup_by_id(backup_id)
+    
+    def _restore_backup_by_id(self, backup_id: str) -> bool:
+        matches = [entry for entry in self._load_backup_index() if entry['id'].startswith(backup_id)]
+        if len(matches) != 1:
+            print(f"❌ Backup '{backup_id}' not found" if not matches else f"❌ Backup id '{backup_id}' is ambiguous")
+            return False
+        
+        blob_path = os.path.join(self.backup_dir, f"{matches[0]['id']}.md")
+        try:
+            with open(blob_path, 'rb') as src:
+                data = src.read()
+            
+            current = b""
+            if os.path.exists(self.claude_md_path):
+                with open(self.claude_md_path, 'rb') as f:
+                    current = f.read()
+            
+            stats = self._load_fresh_statistics()
+            offset = self._common_prefix_length(current, data)
+            self._write_bytes_from_offset(data, offset)
+            self._record_write_statistics(stats, current, data, offset)
+            print(f"🔄 Restored CLAUDE.md from backup {matches[0]['id']}")
+            return True
+            
+        except OSError as e:
+            print(f"❌ Error restoring backup: {e}")
+            return False
+    
+    def _load_backup_index(self) -> List[Dict[str, any]]:
+        """Load the ordered backup index."""
+        try:
+            with open(self.backup_index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+    
+    def _save_backup_index(self, index: List[Dict[str, any]]):
+        """Atomically replace the backup index."""
+        tmp_path = self.backup_index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.backup_index_path)
+    
+    def _write_changed_region(self, old_content: str, new_content: str, spooled: List[str] = (),
+                              write_keys: List[str] = ()):
+        """Write new_content, touching the file only from the first changed byte onward."""
+        old_bytes = old_content.encode('utf-8')
+        new_bytes = new_content.encode('utf-8')
+        
+        stats = self._load_fresh_statistics()
+        offset = self._common_prefix_length(old_bytes, new_bytes)
+        self._write_bytes_from_offset(new_bytes, offset, spooled, write_keys)
+        self._record_write_statistics(stats, old_bytes, new_bytes, offset)
+    
+    def _write_bytes_from_offset(self, new_bytes: bytes, offset: int, spooled: List[str] = (),
+                                 write_keys: List[str] = ()):
+        """Rewrite the file tail starting at offset and truncate any leftover bytes.
+        
+        The tail is first made durable in the journal, together with the
+        spool entries it applies. If the in-place write is cut short by a
+        crash or a full disk, the next lock holder replays the journal, so
+        the file never stays half old and half new and no insert lands twice.
+        """
+        if not os.path.exists(self.claude_md_path):
+            offset = 0
+        tail = new_bytes[offset:]
+        record = {"offset": offset, "length": len(tail), "spooled": list(spooled), "write_keys": list(write_keys)}
+        
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(record).encode('utf-8') + b"\n")
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._fsync_directory()
+        
+        self._write_tail(offset, tail)
+        self._finish_journal(record)
+    
+    def _write_tail(self, offset: int, tail: bytes):
+        mode = 'r+b' if os.path.exists(self.claude_md_path) else 'wb'
+        with open(self.claude_md_path, mode) as f:
+            f.seek(offset)
+            f.write(tail)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _replay_journal(self):
+        """Finish a region write that was interrupted. Caller must hold the lock."""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                header = f.readline()
+                tail = f.read()
+        except FileNotFoundError:
+            return
+        
+        try:
+            record = json.loads(header)
+            complete = len(tail) == record["length"]
+        except (ValueError, KeyError, TypeError):
+            complete = False
+        
+        if complete:
+            self._write_tail(record["offset"], tail)
+            self._finish_journal(record)
+            print(f"🔄 Finished an interrupted write to {os.path.basename(self.claude_md_path)}")
+        else:
+            print(f"⚠️ Discarding unreadable write journal for {os.path.basename(self.claude_md_path)}")
+            os.remove(self.journal_path)
+    
+    def _finish_journal(self, record: Dict[str, any]):
+        """Retire the spool entries and write keys a completed write applied, then drop the journal."""
+        if record.get("write_keys"):
+            self._save_applied_keys(self._load_applied_keys() + record["write_keys"])
+        for entry_path in record.get("spooled", ()):
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+        os.remove(self.journal_path)
+    
+    def _fsync_directory(self):
+        directory = os.open(os.path.dirname(os.path.abspath(self.claude_md_path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+    
+    @staticmethod
+    def _common_prefix_length(a: bytes, b: bytes, chunk_size: int = 64 * 1024) -> int:
+        """Length of the shared prefix of two byte strings, compared chunk by chunk."""
+        limit = min(len(a), len(b))
+        view_a, view_b = memoryview(a), memoryview(b)
+        
+        offset = 0
+        while offset < limit:
+            end = min(offset + chunk_size, limit)
+            if view_a[offset:end] != view_b[offset:end]:
+                break
+            offset = end
+        else:
+            return limit
+        
+        # Narrow down inside the first differing chunk
+        while offset < limit and a[offset] == b[offset]:
+            offset += 1
+        return offset
+    
+    @staticmethod
+    def _common_suffix_length(a: bytes, b: bytes, limit: int, chunk_size: int = 64 * 1024) -> int:
+        """Length of the shared suffix of two byte strings, at most limit bytes."""
+        limit = min(limit, len(a), len(b))
+        view_a, view_b = memoryview(a), memoryview(b)
+        
+        length = 0
+        while length < limit:
+            step = min(chunk_size, limit - length)
+            if view_a[len(a) - length - step:len(a) - length] != view_b[len(b) - length - step:len(b) - length]:
+                break
+            length += step
+        else:
+            return limit
+        
+        while length < limit and a[len(a) - length - 1] == b[len(b) - length - 1]:
+            length += 1
+        return length
+    
     def _find_section_insertion_point(self, content: str, category: str) -> int:
         """Find where to insert a new lesson section."""
         lines = content.split('\n')
@@ -234,36 +670,140 @@ class ClaudeMdUpdater:
         
         return '\n'.join(lines)
     
-    def get_lesson_statistics(self) -> Dict[str, int]:
-        """Get statistics about lessons in CLAUDE.md."""
+    def get_lesson_statistics(self, rebuild: bool = False) -> Dict[str, any]:
+        """Get statistics about lessons in CLAUDE.md.
+        
+        Normally served straight from the stats sidecar, which every write
+        keeps current. The sidecar is rebuilt with a full scan when CLAUDE.md
+        was changed behind the updater's back (size or mtime differ) or when
+        rebuild=True, in which case any drift from the scan is reported.
+        """
+        if not rebuild:
+            stats = self._load_fresh_statistics()
+            if stats:
+                return self._public_statistics(stats)
+        
         try:
-            with open(self.claude_md_path, 'r') as f:
-                content = f.read()
-            
-            # Count sections
-            section_count = len(re.findall(r'^### .* - Key Learnings', content, re.MULTILINE))
-            
-            # Count numbered points
-            point_count = len(re.findall(r'#### \d+\.\s+\*\*', content))
+            with self._locked():
+                previous = self._load_statistics()
+                with open(self.claude_md_path, 'r') as f:
+                    content = f.read()
+                
+                stats = self._scan_statistics(content)
+                stats["last_updated"] = datetime.fromtimestamp(os.stat(self.claude_md_path).st_mtime).isoformat()
+                if previous and previous.get("last_updated"):
+                    stats["last_updated"] = max(previous["last_updated"], stats["last_updated"])
+                self._save_statistics(stats)
             
-            # Count by category
-            categories = {
-                "UI/Layout": len(re.findall(r'(?i)layout.*key learnings', content)),
-                "Navigation": len(re.findall(r'(?i)navigation.*key learnings', content)),
-                "API": len(re.findall(r'(?i)(api|integration).*key learnings', content)),
-                "Build": len(re.findall(r'(?i)(build|compilation).*key learnings', content)),
-                "Architecture": len(re.findall(r'(?i)(architecture|implementation).*key learnings', content))
+        except Exception as e:
+            return {"error": str(e)}
+        
+        result = self._public_statistics(stats)
+        if rebuild:
+            result["drift"] = {
+                key: {"sidecar": previous.get(key) if previous else None, "scan": stats[key]}
+                for key in ("total_sections", "total_points", "categories")
+                if not previous or previous.get(key) != stats[key]
             }
+        return result
+    
+    @staticmethod
+    def _scan_statistics(content: str) -> Dict[str, any]:
+        """Count sections, points and per-category sections with a full scan."""
+        # Count sections
+        section_count = len(re.findall(r'^### .* - Key Learnings', content, re.MULTILINE))
+        
+        # Count numbered points
+        point_count = len(re.findall(r'#### \d+\.\s+\*\*', content))
+        
+        # Count by category
+        categories = {
+            "UI/Layout": len(re.findall(r'(?i)layout.*key learnings', content)),
+            "Navigation": len(re.findall(r'(?i)navigation.*key learnings', content)),
+            "API": len(re.findall(r'(?i)(api|integration).*key learnings', content)),
+            "Build": len(re.findall(r'(?i)(build|compilation).*key learnings', content)),
+            "Architecture": len(re.findall(r'(?i)(architecture|implementation).*key learnings', content))
+        }
+        
+        return {
+            "total_sections": section_count,
+            "total_points": point_count,
+            "categories": categories
+        }
+    
+    @staticmethod
+    def _public_statistics(stats: Dict[str, any]) -> Dict[str, any]:
+        return {key: stats[key] for key in ("total_sections", "total_points", "categories", "last_updated")}
+    
+    def _record_write_statistics(self, stats: Optional[Dict[str, any]], old_bytes: bytes, new_bytes: bytes, offset: int):
+        """Apply the delta of one write to the stats sidecar. Caller must hold the lock.
+        
+        All counted patterns are line-local, so only the changed lines matter:
+        the region between the shared prefix and shared suffix, widened to
+        whole lines, is scanned before and after and the difference applied.
+        Without fresh stats to start from, the new content is scanned in full.
+        """
+        try:
+            if stats is None:
+                stats = self._scan_statistics(new_bytes.decode('utf-8', errors='replace'))
+            else:
+                start = old_bytes.rfind(b'\n', 0, offset) + 1
+                suffix = self._common_suffix_length(old_bytes, new_bytes, min(len(old_bytes), len(new_bytes)) - offset)
+                old_end, new_end = len(old_bytes) - suffix, len(new_bytes) - suffix
+                
+                # Extend both regions to the end of the line inside the shared suffix
+                line_end = old_bytes.find(b'\n', old_end)
+                extra = (line_end + 1 - old_end) if line_end != -1 else suffix
+                
+                removed = self._scan_statistics(old_bytes[start:old_end + extra].decode('utf-8', errors='replace'))
+                added = self._scan_statistics(new_bytes[start:new_end + extra].decode('utf-8', errors='replace'))
+                
+                for key in ("total_sections", "total_points"):
+                    stats[key] += added[key] - removed[key]
+                for category in added["categories"]:
+                    stats["categories"][category] = (
+                        stats["categories"].get(category, 0) + added["categories"][category] - removed["categories"][category]
+                    )
             
-            return {
-                "total_sections": section_count,
-                "total_points": point_count,
-                "categories": categories,
-                "last_updated": datetime.now().isoformat()
-            }
+            stats["last_updated"] = datetime.now().isoformat()
+            self._save_statistics(stats)
             
         except Exception as e:
-            return {"error": str(e)}
+            # The next read notices the stale sidecar and rebuilds it
+            print(f"⚠️ Could not update lesson statistics: {e}")
+    
+    def _load_fresh_statistics(self) -> Optional[Dict[str, any]]:
+        """Load the sidecar only if it still describes CLAUDE.md as it is on disk."""
+        stats = self._load_statistics()
+        if not stats:
+            return None
+        
+        try:
+            file_stat = os.stat(self.claude_md_path)
+        except OSError:
+            return None
+        
+        if stats.get("file_size") != file_stat.st_size or stats.get("file_mtime_ns") != file_stat.st_mtime_ns:
+            return None
+        return stats
+    
+    def _load_statistics(self) -> Optional[Dict[str, any]]:
+        try:
+            with open(self.stats_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _save_statistics(self, stats: Dict[str, any]):
+        """Atomically replace the sidecar, stamped with the file's current size and mtime."""
+        file_stat = os.stat(self.claude_md_path)
+        stats["file_size"] = file_stat.st_size
+        stats["file_mtime_ns"] = file_stat.st_mtime_ns
+        
+        tmp_path = self.stats_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp_path, self.stats_path)
 
 # Example usage for the agent
 if __name__ == "__main__":
@@ -7,9 +7,10 @@ Analyzes git commits to extract learning opportunities and technical insights.
 import subprocess
 import re
 import json
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
 
 @dataclass
 class CommitLesson:
@@ -22,22 +23,67 @@ class CommitLesson:
     files_changed: List[str]
     lines_changed: int
     timestamp: str
+    fix_signatures: List[str] = field(default_factory=list)
+    lesson: Optional[str] = None
+    time_spent: Optional[str] = None
+    # "problem → solution" from the chat lesson merged into this one (see lesson-correlator.py)
+    chat_excerpt: Optional[str] = None
+
+# Body fields of the commit message format documented in README.md
+STRUCTURED_FIELDS = ("CONTEXT", "PROBLEM", "SOLUTION", "LESSON", "TIME")
+
+# NUL-delimited header fields plus the raw body; numstat lines follow the closing NUL
+LOG_FORMAT = '--format=%x00%H%x00%ad%x00%an%x00%B%x00'
+
+# git log arguments _parse_log_records expects: NUL-terminated numstat keeps paths whole,
+# and -M reports a rename as its old and new path instead of an abbreviated {old => new}
+LOG_ARGS = ('-z', '-M', '--numstat', LOG_FORMAT, '--date=iso')
 
 class CommitAnalyzer:
     """Analyzes git commits for learning patterns."""
     
-    def __init__(self):
+    def __init__(self, repo_path: str = '.', categorizer_class: Optional[type] = None, matcher=None, diff_scanner=None,
+                 metrics=None, git_reader=None):
+        self.repo_path = repo_path
+        
+        # Optional GitObjectReader (see git-object-reader.py) to screen commit messages without forking git
+        self.git_reader = git_reader
+        
+        # Optional PipelineMetrics (see agent-metrics.py); git commands are timed as the "git" stage
+        self.metrics = metrics
+        
+        # Optional BoundedMatcher (see bounded-matcher.py) for windowed, time-budgeted searches
+        self.matcher = matcher
+        
+        # Optional DiffSignatureScanner (see diff-analyzer.py) for fix signatures in added lines
+        self.diff_scanner = diff_scanner
+        
+        # Lazy gaps are bounded ({1,N}) so a failed match cannot rescan the rest of the line
         self.fix_patterns = [
             r"(?i)(fix|resolve|correct|repair):\s*(.+)",
             r"(?i)(build\s+fix|bug\s+fix|ui\s+fix):\s*(.+)",
-            r"(?i)(address|handle|solve)\s+(.+?)\s+(issue|error|problem)",
-            r"(?i)(update|change|modify)\s+(.+?)\s+to\s+(fix|resolve|correct)"
+            r"(?i)(address|handle|solve)\s+([^\n]{1,120}?)\s+(issue|error|problem)",
+            r"(?i)(update|change|modify)\s+([^\n]{1,120}?)\s+to\s+(fix|resolve|correct)"
         ]
         
         self.context_patterns = [
-            r"(?i)(implementing|building|creating|adding)\s+(.+?)(?:$|\s+-)",
-            r"(?i)(for|in|on)\s+(.*?(?:page|view|component|feature|wizard))(?:$|\s+-)",
-            r"(?i)(team|user|workout|competition|earnings)\s+(.*?)(?:$|\s+-)"
+            r"(?i)(implementing|building|creating|adding)\s+([^\n]{1,160}?)(?:$|\s+-)",
+            r"(?i)(for|in|on)\s+([^\n]{0,120}?(?:page|view|component|feature|wizard))(?:$|\s+-)",
+            r"(?i)(team|user|workout|competition|earnings)\s+([^\n]{0,160}?)(?:$|\s+-)"
+        ]
+        
+        self.error_descriptions = [
+            r"(?i)(blank page|nothing shows|not appearing)",
+            r"(?i)(build error|compilation error|syntax error)",
+            r"(?i)(constraint error|autolayout issue|layout problem)",
+            r"(?i)(navigation[^\n]{0,120}?(?:not working|broken|failed))",
+            r"(?i)(missing|undefined|not found)"
+        ]
+        
+        self.solution_patterns = [
+            r"(?i)(added|implemented|created|updated)\s+(.+)",
+            r"(?i)(changed|modified|fixed)\s+([^\n]{1,120}?)\s+to\s+(.+)",
+            r"(?i)(now\s+using|switched\s+to|replaced\s+with)\s+(.+)"
         ]
         
         self.technical_keywords = {
@@ -48,18 +94,22 @@ class CommitAnalyzer:
             "Swift": ["syntax", "property", "method", "class", "struct", "protocol"],
             "UI": ["view", "button", "label", "scroll", "collection", "table"]
         }
+        
+        # Message keywords checked in priority order by _categorize_commit
+        self.category_keywords = {
+            "UI/Layout": ["constraint", "layout", "autolayout"],
+            "Navigation": ["navigation", "push", "present"],
+            "Build/Compilation": ["build", "compile", "xcode"],
+            "API Integration": ["api", "supabase", "network"]
+        }
+        
+        # Optional vectorized scorer used for batches (see batch-categorizer.py)
+        self.batch_categorizer = categorizer_class(self.category_keywords, first_match=True) if categorizer_class else None
     
     def analyze_recent_commits(self, limit: int = 20) -> List[CommitLesson]:
         """Analyze recent commits for learning opportunities."""
         commits = self._get_recent_commits(limit)
-        lessons = []
-        
-        for commit in commits:
-            lesson = self._extract_lesson_from_commit(commit)
-            if lesson:
-                lessons.append(lesson)
-        
-        return lessons
+        return self._extract_lessons_from_commits(commits)
     
     def analyze_commit_by_hash(self, commit_hash: str) -> Optional[CommitLesson]:
         """Analyze a specific commit for lessons."""
@@ -68,94 +118,226 @@ class CommitAnalyzer:
             return self._extract_lesson_from_commit(commit_info)
         return None
     
+    def analyze_commits(self, commit_hashes: List[str]) -> List[CommitLesson]:
+        """Analyze a batch of commits, fetching all metadata with one git call."""
+        return self._extract_lessons_from_commits(self._get_commits_info(self._screen_commits(commit_hashes)))
+    
+    def iter_commit_lessons(self, commit_hashes: List[str], batch_size: int = 8) -> Iterator[Tuple[str, Optional[CommitLesson]]]:
+        """Yield (commit hash, lesson or None) in the given order.
+        
+        Metadata is fetched a small batch at a time, so a caller working to a
+        deadline can stop between commits and knows exactly which remain.
+        """
+        for start in range(0, len(commit_hashes), batch_size):
+            batch = commit_hashes[start:start + batch_size]
+            commits = self._get_commits_info(self._screen_commits(batch))
+            lessons = {lesson.commit_hash: lesson for lesson in self._extract_lessons_from_commits(commits)}
+            for commit_hash in batch:
+                yield commit_hash, lessons.get(commit_hash[:8])
+    
+    def categorize_batch(self, messages: List[str], files_changed: Optional[List[List[str]]] = None) -> List[Tuple[str, float]]:
+        """Categorize many commits at once, returning (category, confidence) per commit."""
+        files_changed = files_changed or [[] for _ in messages]
+        
+        if not self.batch_categorizer:
+            return [(self._categorize_commit(message, files), 1.0) for message, files in zip(messages, files_changed)]
+        
+        results = []
+        for (category, confidence), files in zip(self.batch_categorizer.categorize(messages), files_changed):
+            if category is None:
+                category, confidence = self._categorize_by_files(files), 0.0
+            results.append((category, confidence))
+        return results
+    
+    def _extract_lessons_from_commits(self, commits: List[Dict]) -> List[CommitLesson]:
+        """Extract lessons from a list of commits, categorizing the fix commits as one batch."""
+        fix_commits = [commit for commit in commits if commit.get('fields') or self._is_fix_commit(commit['message'])]
+        categories = self.categorize_batch(
+            [commit['message'] for commit in fix_commits],
+            [commit.get('files_changed', []) for commit in fix_commits]
+        )
+        
+        if self.diff_scanner and fix_commits:
+            # One streamed `git log -p` covers every fix commit in the batch
+            with self._git_timer():
+                signatures = self.diff_scanner.scan([commit['hash'] for commit in fix_commits])
+            for commit in fix_commits:
+                commit['fix_signatures'] = signatures.get(commit['hash'], [])
+        
+        lessons = []
+        for commit, (category, _) in zip(fix_commits, categories):
+            lesson = self._extract_lesson_from_commit(commit, category)
+            if lesson:
+                lessons.append(lesson)
+        
+        return lessons
+    
+    def _screen_commits(self, commit_hashes: List[str]) -> List[str]:
+        """Drop commits whose message rules out a lesson, reading messages in-process.
+        
+        Only the rest need `git log --numstat`, so a batch with no fix commits
+        costs no subprocess at all. Commits the reader cannot read are kept.
+        """
+        if not self.git_reader:
+            return commit_hashes
+        
+        candidates = []
+        for commit_hash in commit_hashes:
+            commit = self.git_reader.read_commit(commit_hash)
+            if commit is not None:
+                subject, fields = self.parse_commit_body(commit.message)
+                if not fields and not self._is_fix_commit(subject):
+                    continue
+            candidates.append(commit_hash)
+        return candidates
+    
+    def _get_commits_info(self, commit_hashes: List[str]) -> List[Dict]:
+        """Get commit details for many commits in a single `git log --stdin` run."""
+        if not commit_hashes:
+            return []
+        
+        try:
+            with self._git_timer():
+                result = subprocess.run([
+                    'git', 'log', '--no-walk=unsorted', '--stdin', *LOG_ARGS
+                ], input='\n'.join(commit_hashes) + '\n', capture_output=True, text=True, cwd=self.repo_path)
+            
+            if result.returncode != 0:
+                return []
+            
+        except OSError:
+            return []
+        
+        return self._parse_log_records(result.stdout)
+    
     def _get_recent_commits(self, limit: int) -> List[Dict]:
         """Get recent commit information."""
         try:
-            # Get commit hashes and messages
-            result = subprocess.run([
-                'git', 'log', f'-{limit}', '--pretty=format:%H|%s|%ad|%an',
-                '--date=iso'
-            ], capture_output=True, text=True, cwd='.')
+            with self._git_timer():
+                result = subprocess.run([
+                    'git', 'log', f'-{limit}', *LOG_ARGS
+                ], capture_output=True, text=True, cwd=self.repo_path)
             
-            commits = []
-            for line in result.stdout.strip().split('\n'):
-                if '|' in line:
-                    parts = line.split('|')
-                    if len(parts) >= 4:
-                        commits.append({
-                            'hash': parts[0],
-                            'message': parts[1],
-                            'date': parts[2],
-                            'author': parts[3]
-                        })
-            
-            return commits
+            if result.returncode != 0:
+                return []
             
-        except subprocess.CalledProcessError:
+        except OSError:
             return []
+        
+        return self._parse_log_records(result.stdout)
     
     def _get_commit_info(self, commit_hash: str) -> Optional[Dict]:
         """Get detailed information for a specific commit."""
-        try:
-            # Get commit details
-            result = subprocess.run([
-                'git', 'show', '--stat', '--format=%H|%s|%ad|%an',
-                commit_hash
-            ], capture_output=True, text=True, cwd='.')
+        commits = self._get_commits_info([commit_hash])
+        return commits[0] if commits else None
+    
+    def _git_timer(self):
+        return self.metrics.stage("git") if self.metrics else nullcontext()
+    
+    def _parse_log_records(self, output: str) -> List[Dict]:
+        """Parse `git log` output produced with LOG_ARGS.
+        
+        Every field is NUL-terminated: hash, date, author and body, an empty
+        field, then one "added<TAB>deleted<TAB>path" field per file and an
+        empty field closing the commit. A rename leaves the path empty and
+        follows with its old and new path as two more fields; the new path
+        is the one recorded. Files of every type are kept.
+        """
+        tokens = output.split('\x00')
+        
+        commits = []
+        position = 1
+        while position + 3 < len(tokens):
+            commit_hash, date, author, body = tokens[position:position + 4]
+            position += 5
             
-            if result.returncode != 0:
-                return None
+            files_changed = []
+            lines_changed = 0
+            while position < len(tokens) and tokens[position]:
+                stat = tokens[position].lstrip('\n').split('\t', 2)
+                position += 1
+                if len(stat) != 3:
+                    continue
                 
-            lines = result.stdout.strip().split('\n')
-            header = lines[0]
-            
-            if '|' in header:
-                parts = header.split('|')
-                if len(parts) >= 4:
-                    # Extract file changes
-                    files_changed = []
-                    lines_changed = 0
-                    
-                    for line in lines[1:]:
-                        if '.swift' in line and '|' in line:
-                            file_match = re.search(r'(\S+\.swift)', line)
-                            if file_match:
-                                files_changed.append(file_match.group(1))
-                            
-                            # Extract line count changes
-                            line_match = re.search(r'\|\s*(\d+)', line)
-                            if line_match:
-                                lines_changed += int(line_match.group(1))
-                    
-                    return {
-                        'hash': parts[0],
-                        'message': parts[1],
-                        'date': parts[2],
-                        'author': parts[3],
-                        'files_changed': files_changed,
-                        'lines_changed': lines_changed
-                    }
-            
-        except subprocess.CalledProcessError:
-            pass
+                path = stat[2]
+                if not path:
+                    path = tokens[position + 1] if position + 1 < len(tokens) else ''
+                    position += 2
+                if path:
+                    files_changed.append(path)
+                if stat[0].isdigit() and stat[1].isdigit():
+                    lines_changed += int(stat[0]) + int(stat[1])
+            position += 1
             
-        return None
+            subject, fields = self.parse_commit_body(body)
+            commits.append({
+                'hash': commit_hash.strip(),
+                'message': subject,
+                'body': body,
+                'date': date,
+                'author': author,
+                'files_changed': files_changed,
+                'lines_changed': lines_changed,
+                'fields': fields
+            })
+        
+        return commits
+    
+    @staticmethod
+    def parse_commit_body(body: str) -> Tuple[str, Dict[str, str]]:
+        """Split a raw message into its subject and the CONTEXT/PROBLEM/SOLUTION/LESSON/TIME fields.
+        
+        Single pass over the lines: a line starting with a field name and a
+        colon opens that field, following non-blank lines continue it, and a
+        blank line closes it. Field names are returned lowercased.
+        """
+        lines = body.strip('\n').split('\n')
+        subject = lines[0].strip() if lines else ''
+        
+        fields = {}
+        current = None
+        for line in lines[1:]:
+            name, colon, value = line.partition(':')
+            name = name.strip().upper()
+            if colon and name in STRUCTURED_FIELDS:
+                current = name.lower()
+                fields[current] = value.strip()
+            elif not line.strip():
+                current = None
+            elif current:
+                fields[current] = f"{fields[current]} {line.strip()}".strip()
+        
+        return subject, {name: value for name, value in fields.items() if value}
     
-    def _extract_lesson_from_commit(self, commit_info: Dict) -> Optional[CommitLesson]:
+    def _search(self, pattern: str, text: str) -> Optional[re.Match]:
+        """Search through the bounded matcher when one is configured."""
+        if self.matcher:
+            return self.matcher.search(pattern, text)
+        return re.search(pattern, text)
+    
+    def _is_fix_commit(self, message: str) -> bool:
+        """Check whether a commit message matches any fix pattern."""
+        return any(self._search(pattern, message) for pattern in self.fix_patterns)
+    
+    def _extract_lesson_from_commit(self, commit_info: Dict, category: Optional[str] = None) -> Optional[CommitLesson]:
         """Extract lesson from commit information."""
         message = commit_info['message']
+        fields = commit_info.get('fields') or {}
         
         # Check if this is a fix commit
-        is_fix = any(re.search(pattern, message) for pattern in self.fix_patterns)
-        
-        if not is_fix:
+        if not fields and not self._is_fix_commit(message):
             return None
         
-        # Extract lesson components
-        context = self._extract_commit_context(message)
-        problem = self._extract_commit_problem(message)
-        solution = self._extract_commit_solution(message, commit_info.get('files_changed', []))
-        category = self._categorize_commit(message, commit_info.get('files_changed', []))
+        # Extract lesson components; structured body fields win over heuristics
+        if 'problem' in fields and 'solution' in fields:
+            context = fields.get('context') or message.split(':', 1)[-1].strip()
+            problem = fields['problem']
+            solution = fields['solution']
+        else:
+            context = fields.get('context') or self._extract_commit_context(message)
+            problem = fields.get('problem') or self._extract_commit_problem(message)
+            solution = fields.get('solution') or self._extract_commit_solution(message, commit_info.get('files_changed', []), commit_info.get('fix_signatures'))
+        category = category or self._categorize_commit(message, commit_info.get('files_changed', []))
         
         return CommitLesson(
             commit_hash=commit_info['hash'][:8],
@@ -166,13 +348,16 @@ class CommitAnalyzer:
             category=category,
             files_changed=commit_info.get('files_changed', []),
             lines_changed=commit_info.get('lines_changed', 0),
-            timestamp=commit_info['date']
+            timestamp=commit_info['date'],
+            fix_signatures=commit_info.get('fix_signatures', []),
+            lesson=fields.get('lesson'),
+            time_spent=fields.get('time')
         )
     
     def _extract_commit_context(self, message: str) -> str:
         """Extract context from commit message."""
         for pattern in self.context_patterns:
-            match = re.search(pattern, message)
+            match = self._search(pattern, message)
             if match:
                 return match.group(2).strip()
         
@@ -185,41 +370,31 @@ class CommitAnalyzer:
     def _extract_commit_problem(self, message: str) -> str:
         """Extract problem description from commit message."""
         # Look for specific error descriptions
-        error_descriptions = [
-            r"(?i)(blank page|nothing shows|not appearing)",
-            r"(?i)(build error|compilation error|syntax error)",
-            r"(?i)(constraint error|autolayout issue|layout problem)",
-            r"(?i)(navigation.*?(?:not working|broken|failed))",
-            r"(?i)(missing|undefined|not found)"
-        ]
-        
-        for pattern in error_descriptions:
-            match = re.search(pattern, message)
+        for pattern in self.error_descriptions:
+            match = self._search(pattern, message)
             if match:
                 return match.group(0)
         
         # Extract from fix patterns
         for pattern in self.fix_patterns:
-            match = re.search(pattern, message)
+            match = self._search(pattern, message)
             if match and len(match.groups()) > 1:
                 return f"Issue with {match.group(2)}"
         
         return "Development issue encountered"
     
-    def _extract_commit_solution(self, message: str, files_changed: List[str]) -> str:
-        """Extract solution from commit message and file changes."""
+    def _extract_commit_solution(self, message: str, files_changed: List[str], fix_signatures: Optional[List[str]] = None) -> str:
+        """Extract solution from commit message, diff signatures and file changes."""
         # Look for solution descriptions in message
-        solution_patterns = [
-            r"(?i)(added|implemented|created|updated)\s+(.+)",
-            r"(?i)(changed|modified|fixed)\s+(.+?)\s+to\s+(.+)",
-            r"(?i)(now\s+using|switched\s+to|replaced\s+with)\s+(.+)"
-        ]
-        
-        for pattern in solution_patterns:
-            match = re.search(pattern, message)
+        for pattern in self.solution_patterns:
+            match = self._search(pattern, message)
             if match:
                 return match.group(0)
         
+        # What the diff actually added beats guessing from file names
+        if fix_signatures:
+            return "; ".join(fix_signatures[:3])
+        
         # Infer from file changes
         if files_changed:
             if any('View' in f for f in files_changed):
@@ -236,15 +411,14 @@ class CommitAnalyzer:
         message_lower = message.lower()
         
         # Check message content
-        if any(keyword in message_lower for keyword in ["constraint", "layout", "autolayout"]):
-            return "UI/Layout"
-        elif any(keyword in message_lower for keyword in ["navigation", "push", "present"]):
-            return "Navigation"
-        elif any(keyword in message_lower for keyword in ["build", "compile", "xcode"]):
-            return "Build/Compilation"
-        elif any(keyword in message_lower for keyword in ["api", "supabase", "network"]):
-            return "API Integration"
+        for category, keywords in self.category_keywords.items():
+            if any(keyword in message_lower for keyword in keywords):
+                return category
         
+        return self._categorize_by_files(files_changed)
+    
+    def _categorize_by_files(self, files_changed: List[str]) -> str:
+        """Fallback categorization from changed file names."""
         # Check file patterns
         if files_changed:
             if any('View' in f or 'UI' in f for f in files_changed):
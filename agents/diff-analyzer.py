@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Diff Analyzer for Lessons Learned Tracker
+Streams `git log -p` output hunk by hunk and detects concrete fix signatures in the added lines.
+"""
+
+import re
+import sys
+import subprocess
+from typing import Dict, List, Optional, Set
+
+# (pattern over an added line, description, applies to pbxproj files instead of source files)
+FIX_SIGNATURES = [
+    (r"heightAnchor\.constraint", "Added explicit heightAnchor constraint", False),
+    (r"widthAnchor\.constraint", "Added explicit widthAnchor constraint", False),
+    (r"translatesAutoresizingMaskIntoConstraints\s*=\s*false", "Disabled autoresizing mask translation for AutoLayout", False),
+    (r"NSLayoutConstraint\.activate", "Activated AutoLayout constraints as a group", False),
+    (r"setContentCompressionResistancePriority|setContentHuggingPriority", "Adjusted content hugging/compression priorities", False),
+    (r"UINavigationController\s*\(\s*rootViewController", "Embedded view controller in a UINavigationController", False),
+    (r"\.delegate\s*=\s*self", "Assigned delegate to wire up callbacks", False),
+    (r"DispatchQueue\.main\.async", "Moved UI work onto the main queue", False),
+    (r"\[weak self\]", "Captured self weakly to break a retain cycle", False),
+    (r"\bisa = PBXFileReference\b", "Added file reference", True),
+    (r"\bisa = PBXBuildFile\b", "Added file to a build phase", True),
+]
+
+# Source signatures apply only to code; documentation such as CLAUDE.md quotes
+# fix code in lesson text and must not yield signatures of its own
+SOURCE_EXTENSIONS = (".swift", ".m", ".mm", ".h", ".c", ".cc", ".cpp", ".py", ".js", ".ts", ".kt", ".java")
+
+class DiffSignatureScanner:
+    """Detects fix signatures in commit diffs with bounded memory.
+
+    One `git log -p --numstat` stream covers a whole batch of commits and is
+    read line by line; only added lines are matched and only the set of
+    signatures found per commit is kept. Each commit's numstat block arrives
+    before its patch, so binary files and files with more than
+    max_file_lines changed lines are skipped without inspecting their hunks.
+    """
+
+    def __init__(self, repo_path: str = '.', max_file_lines: int = 2000, max_line_chars: int = 500):
+        self.repo_path = repo_path
+        self.max_file_lines = max_file_lines
+        self.max_line_chars = max_line_chars
+
+        self.source_signatures = [(re.compile(p), d) for p, d, pbx in FIX_SIGNATURES if not pbx]
+        self.pbxproj_signatures = [(re.compile(p), d) for p, d, pbx in FIX_SIGNATURES if pbx]
+
+    def scan(self, commit_hashes: List[str]) -> Dict[str, List[str]]:
+        """Map each full commit hash to its detected fix signatures."""
+        if not commit_hashes:
+            return {}
+
+        try:
+            process = subprocess.Popen([
+                'git', 'log', '--no-walk=unsorted', '--stdin', '-p', '--numstat',
+                '--no-renames', '--no-color', '-U0', '--format=%x00%H'
+            ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+               cwd=self.repo_path, text=True, errors='replace')
+        except OSError:
+            return {}
+
+        process.stdin.write('\n'.join(commit_hashes) + '\n')
+        process.stdin.close()
+
+        try:
+            return self._parse_stream(process.stdout)
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    def _parse_stream(self, lines) -> Dict[str, List[str]]:
+        results = {}
+        commit_hash = None
+        found = None
+        skipped_paths = set()
+        signatures = None
+        path = None
+
+        for line in lines:
+            if line.startswith('\x00'):
+                commit_hash = line[1:].strip()
+                found = results.setdefault(commit_hash, [])
+                skipped_paths = set()
+                signatures = None
+                path = None
+                continue
+
+            if commit_hash is None:
+                continue
+
+            if line.startswith('diff --git '):
+                path = self._path_from_header(line)
+                signatures = self._signatures_for(path, skipped_paths)
+                continue
+
+            if signatures is None:
+                # Numstat block (before the first diff header) or a skipped file
+                if path is None:
+                    self._note_numstat(line, skipped_paths)
+                continue
+
+            if line.startswith('+') and not line.startswith('+++'):
+                added = line[1:self.max_line_chars + 1]
+                for pattern, description in signatures:
+                    if pattern.search(added):
+                        signature = f"{description} ({path.rsplit('/', 1)[-1]})"
+                        if signature not in found:
+                            found.append(signature)
+
+        return results
+
+    def _note_numstat(self, line: str, skipped_paths: Set[str]) -> None:
+        """Remember files that are binary or too large to scan."""
+        parts = line.rstrip('\n').split('\t')
+        if len(parts) != 3:
+            return
+
+        added, deleted, file_path = parts
+        if added == '-' or deleted == '-':
+            skipped_paths.add(file_path)
+        elif added.isdigit() and deleted.isdigit() and int(added) + int(deleted) > self.max_file_lines:
+            skipped_paths.add(file_path)
+
+    def _signatures_for(self, path: Optional[str], skipped_paths: Set[str]):
+        """Signature set to apply to a file's hunks, or None to skip the file."""
+        if not path or path in skipped_paths:
+            return None
+        if path.endswith('.pbxproj'):
+            return self.pbxproj_signatures
+        if path.endswith(SOURCE_EXTENSIONS):
+            return self.source_signatures
+        return None
+
+    @staticmethod
+    def _path_from_header(line: str) -> Optional[str]:
+        """Extract the new-side path from 'diff --git a/<path> b/<path>'."""
+        marker = line.rfind(' b/')
+        if marker == -1:
+            return None
+        return line[marker + 3:].rstrip('\n').strip('"')
+
+# (file path, added line, expected signature count) for `python diff-analyzer.py`
+SELFCHECK_CASES = [
+    ("App/Views/WizardView.swift", "view.heightAnchor.constraint(equalToConstant: 400).isActive = true", 1),
+    ("App/Legacy/Bridge.m", "self.tableView.delegate = self;", 1),
+    ("CLAUDE.md", "- heightAnchor.constraint(greaterThanOrEqualToConstant: 400) fixed the blank wizard", 0),
+    ("LESSONS_LEARNED.md", "Moved the reload into DispatchQueue.main.async { [weak self] in ... }", 0),
+    ("notes/debugging.txt", "tried .delegate = self first", 0),
+    ("App/Config/flags.json", "\"fix\": \"NSLayoutConstraint.activate\"", 0),
+    ("App.xcodeproj/project.pbxproj", "A1 /* Queue.swift */ = {isa = PBXFileReference; path = Queue.swift; };", 1),
+]
+
+def run_selfcheck() -> bool:
+    """Scan one synthetic commit per case and compare the signature counts."""
+    scanner = DiffSignatureScanner()
+    passed = True
+    for path, added, expected in SELFCHECK_CASES:
+        stream = [
+            "\x00" + "0" * 40 + "\n", "\n", f"1\t0\t{path}\n",
+            f"diff --git a/{path} b/{path}\n", f"--- a/{path}\n", f"+++ b/{path}\n", "@@ -0,0 +1 @@\n", f"+{added}\n",
+        ]
+        found = scanner._parse_stream(stream)["0" * 40]
+        ok = len(found) == expected
+        passed = passed and ok
+        print(f"{'✅' if ok else '❌'} {path}: {len(found)} signature(s), expected {expected}")
+    return passed
+
+if __name__ == "__main__":
+    sys.exit(0 if run_selfcheck() else 1)
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Git Object Reader for Lessons Learned Tracker
+Read-only, subprocess-free access to refs and commit objects for the polling and single-commit hot paths.
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+OBJECT_TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+OFS_DELTA = 6
+REF_DELTA = 7
+
+IDX_V2_MAGIC = b"\377tOc"
+HASH_BYTES = 20
+
+# Symbolic refs are followed at most this deep, as git itself does
+MAX_SYMREF_DEPTH = 5
+
+@dataclass
+class GitCommit:
+    hash: str
+    tree: str
+    parents: List[str] = field(default_factory=list)
+    author: str = ""
+    author_time: int = 0
+    author_tz: str = "+0000"
+    committer_time: int = 0
+    message: str = ""
+
+    def iso_date(self) -> str:
+        """Author date in `git log --date=iso` form, in the author's own timezone."""
+        sign = -1 if self.author_tz.startswith('-') else 1
+        digits = self.author_tz.lstrip('+-').rjust(4, '0')
+        offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:4])) * sign
+        moment = datetime.fromtimestamp(self.author_time, timezone(offset))
+        return moment.strftime('%Y-%m-%d %H:%M:%S ') + self.author_tz
+
+class _PackIndex:
+    """A version-2 pack .idx and its pack, both memory-mapped."""
+
+    def __init__(self, idx_path: str):
+        self.pack_path = idx_path[:-4] + ".pack"
+
+        with open(idx_path, 'rb') as f:
+            self.idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.idx[:4] != IDX_V2_MAGIC or struct.unpack('>I', self.idx[4:8])[0] != 2:
+            self.idx.close()
+            raise ValueError(f"unsupported pack index {idx_path}")
+
+        with open(self.pack_path, 'rb') as f:
+            self.pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.fanout = struct.unpack('>256I', self.idx[8:8 + 1024])
+        self.count = self.fanout[255]
+        self.hashes_at = 8 + 1024
+        self.offsets_at = self.hashes_at + self.count * (HASH_BYTES + 4)
+        self.large_offsets_at = self.offsets_at + self.count * 4
+
+    def find(self, binary_hash: bytes) -> Optional[int]:
+        """Pack offset of an object, via the fanout table and a binary search of its slice."""
+        first = binary_hash[0]
+        low = self.fanout[first - 1] if first else 0
+        high = self.fanout[first]
+
+        while low < high:
+            middle = (low + high) // 2
+            position = self.hashes_at + middle * HASH_BYTES
+            candidate = self.idx[position:position + HASH_BYTES]
+            if candidate < binary_hash:
+                low = middle + 1
+            elif candidate > binary_hash:
+                high = middle
+            else:
+                return self._offset(middle)
+        return None
+
+    def _offset(self, index: int) -> int:
+        position = self.offsets_at + index * 4
+        offset = struct.unpack('>I', self.idx[position:position + 4])[0]
+        if offset & 0x80000000:
+            position = self.large_offsets_at + (offset & 0x7fffffff) * 8
+            offset = struct.unpack('>Q', self.idx[position:position + 8])[0]
+        return offset
+
+    def close(self) -> None:
+        self.idx.close()
+        self.pack.close()
+
+class GitObjectReader:
+    """Resolves refs and reads commits straight from the .git directory.
+
+    Handles loose and packed refs, loose objects, v2 pack indexes (with
+    OFS/REF delta chains) and alternates, for SHA-1 repositories. Anything
+    else (reftable, SHA-256, a missing object) makes the lookup return None
+    so callers can fall back to the git binary. Parsed commits are kept in a
+    small LRU, and pack mmaps are reopened only when objects/pack changes.
+    """
+
+    def __init__(self, repo_path: str = '.', commit_cache_size: int = 1024):
+        self.repo_path = repo_path
+        self.commit_cache_size = commit_cache_size
+
+        self.git_dir, self.common_dir = self._find_git_dirs(repo_path)
+        self.object_dirs = self._object_dirs() if self.common_dir else []
+
+        self.commits: "OrderedDict[str, GitCommit]" = OrderedDict()
+        self.packs: List[_PackIndex] = []
+        self.packs_stamp = None
+        self.packed_refs: Dict[str, str] = {}
+        self.packed_refs_stamp = None
+        self.lock = threading.RLock()
+
+    @property
+    def available(self) -> bool:
+        return self.common_dir is not None
+
+    def head(self) -> Optional[str]:
+        """Full hash HEAD points at, or None if it cannot be resolved here."""
+        return self.resolve_ref("HEAD")
+
+    def resolve_ref(self, name: str) -> Optional[str]:
+        """Resolve a ref name ("HEAD", "refs/heads/main") to a full hash."""
+        if not self.available:
+            return None
+
+        for _ in range(MAX_SYMREF_DEPTH):
+            value = self._read_loose_ref(name)
+            if value is None:
+                value = self._load_packed_refs().get(name)
+            if value is None:
+                return None
+
+            if value.startswith("ref: "):
+                name = value[5:].strip()
+                continue
+            return value if _is_hex_hash(value) else None
+        return None
+
+    def read_commit(self, commit_hash: str) -> Optional[GitCommit]:
+        """Parsed commit for a full hash, or None if it is not a commit readable here."""
+        with self.lock:
+            commit = self.commits.get(commit_hash)
+            if commit is not None:
+                self.commits.move_to_end(commit_hash)
+                return commit
+
+        found = self.read_object(commit_hash)
+        if not found or found[0] != "commit":
+            return None
+
+        commit = _parse_commit(commit_hash, found[1])
+        with self.lock:
+            self.commits[commit_hash] = commit
+            if len(self.commits) > self.commit_cache_size:
+                self.commits.popitem(last=False)
+        return commit
+
+    def read_object(self, object_hash: str) -> Optional[Tuple[str, bytes]]:
+        """(type, content) of an object from the loose store or any pack."""
+        if not self.available or not _is_hex_hash(object_hash):
+            return None
+
+        for objects_dir in self.object_dirs:
+            path = os.path.join(objects_dir, object_hash[:2], object_hash[2:])
+            try:
+                with open(path, 'rb') as f:
+                    raw = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                continue
+
+            header, _, content = raw.partition(b'\x00')
+            object_type = header.split(b' ', 1)[0].decode('ascii')
+            return object_type, content
+
+        binary_hash = bytes.fromhex(object_hash)
+        with self.lock:
+            for pack in self._load_packs():
+                offset = pack.find(binary_hash)
+                if offset is not None:
+                    try:
+                        return self._read_packed(pack, offset)
+                    except (ValueError, IndexError, zlib.error):
+                        return None
+        return None
+
+    def commits_between(self, old_commit: str, new_commit: str, limit: int = 1000) -> Optional[List[str]]:
+        """old..new oldest first, for linear history only.
+
+        Walks first parents from new_commit back to old_commit. Returns None
+        (meaning: ask git) when a merge, a missing object or the limit is hit
+        before reaching old_commit, since the answer would then need a full
+        ancestry walk.
+        """
+        walked = []
+        current = new_commit
+        while current != old_commit:
+            if len(walked) >= limit:
+                return None
+
+            commit = self.read_commit(current)
+            if commit is None or len(commit.parents) != 1:
+                return None
+
+            walked.append(current)
+            current = commit.parents[0]
+
+        walked.reverse()
+        return walked
+
+    def _read_packed(self, pack: _PackIndex, offset: int) -> Optional[Tuple[str, bytes]]:
+        """Object at a pack offset, applying its delta chain."""
+        deltas = []
+        while True:
+            object_type, size, position = _pack_entry_header(pack.pack, offset)
+
+            if object_type == OFS_DELTA:
+                distance, position = _ofs_delta_distance(pack.pack, position)
+                deltas.append(_inflate(pack.pack, position, size))
+                offset -= distance
+            elif object_type == REF_DELTA:
+                base_hash = pack.pack[position:position + HASH_BYTES]
+                deltas.append(_inflate(pack.pack, position + HASH_BYTES, size))
+                base_offset = pack.find(base_hash)
+                if base_offset is None:
+                    base = self.read_object(base_hash.hex())
+                    if base is None:
+                        return None
+                    object_type_name, content = base
+                    break
+                offset = base_offset
+            elif object_type in OBJECT_TYPES:
+                object_type_name = OBJECT_TYPES[object_type]
+                content = _inflate(pack.pack, position, size)
+                break
+            else:
+                return None
+
+        for delta in reversed(deltas):
+            content = _apply_delta(content, delta)
+        return object_type_name, content
+
+    def _load_packs(self) -> List[_PackIndex]:
+        """Open every pack index, again only when a pack directory's mtime changed."""
+        pack_dirs = [os.path.join(objects_dir, "pack") for objects_dir in self.object_dirs]
+        stamp = tuple(_mtime_ns(pack_dir) for pack_dir in pack_dirs)
+        if stamp == self.packs_stamp:
+            return self.packs
+
+        for pack in self.packs:
+            pack.close()
+
+        self.packs = []
+        for pack_dir in pack_dirs:
+            try:
+                names = sorted(os.listdir(pack_dir))
+            except OSError:
+                continue
+            for name in names:
+                if name.endswith(".idx"):
+                    try:
+                        self.packs.append(_PackIndex(os.path.join(pack_dir, name)))
+                    except (OSError, ValueError):
+                        continue
+
+        self.packs_stamp = stamp
+        return self.packs
+
+    def _read_loose_ref(self, name: str) -> Optional[str]:
+        # HEAD and other root refs are per-worktree; refs/ live in the common dir
+        directories = [self.git_dir] if "/" not in name else [self.git_dir, self.common_dir]
+        for directory in directories:
+            try:
+                with open(os.path.join(directory, name), 'r') as f:
+                    return f.read().strip()
+            except (OSError, UnicodeDecodeError):
+                continue
+        return None
+
+    def _load_packed_refs(self) -> Dict[str, str]:
+        path = os.path.join(self.common_dir, "packed-refs")
+        stamp = _mtime_ns(path)
+        with self.lock:
+            if stamp != self.packed_refs_stamp:
+                refs = {}
+                try:
+                    with open(path, 'r') as f:
+                        for line in f:
+                            if line.startswith(('#', '^')):
+                                continue
+                            parts = line.split()
+                            if len(parts) == 2:
+                                refs[parts[1]] = parts[0]
+                except OSError:
+                    pass
+                self.packed_refs = refs
+                self.packed_refs_stamp = stamp
+            return self.packed_refs
+
+    def _object_dirs(self) -> List[str]:
+        """The repository's object directory followed by its alternates."""
+        primary = os.path.join(self.common_dir, "objects")
+        directories = [primary]
+        try:
+            with open(os.path.join(primary, "info", "alternates"), 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        directories.append(os.path.normpath(os.path.join(primary, line)))
+        except OSError:
+            pass
+        return directories
+
+    @staticmethod
+    def _find_git_dirs(repo_path: str) -> Tuple[Optional[str], Optional[str]]:
+        """(git dir, common dir) for a work tree, following `.git` files and commondir."""
+        dot_git = os.path.join(repo_path, ".git")
+        if os.path.isdir(dot_git):
+            git_dir = dot_git
+        elif os.path.isfile(dot_git):
+            try:
+                with open(dot_git, 'r') as f:
+                    pointer = f.read().strip()
+            except OSError:
+                return None, None
+            if not pointer.startswith("gitdir: "):
+                return None, None
+            git_dir = os.path.normpath(os.path.join(repo_path, pointer[8:]))
+        else:
+            return None, None
+
+        common_dir = git_dir
+        try:
+            with open(os.path.join(git_dir, "commondir"), 'r') as f:
+                common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+        except OSError:
+            pass
+
+        # Layouts this reader does not understand are left to the git binary
+        if os.path.exists(os.path.join(common_dir, "reftable")) or not os.path.isdir(os.path.join(common_dir, "objects")):
+            return None, None
+        return git_dir, common_dir
+
+def _parse_commit(commit_hash: str, content: bytes) -> GitCommit:
+    headers, _, message = content.partition(b'\n\n')
+    commit = GitCommit(hash=commit_hash, tree="", message=message.decode('utf-8', errors='replace'))
+
+    for line in headers.split(b'\n'):
+        if line.startswith(b' '):
+            continue  # continuation of a multi-line header such as gpgsig
+        key, _, value = line.partition(b' ')
+        if key == b'tree':
+            commit.tree = value.decode('ascii')
+        elif key == b'parent':
+            commit.parents.append(value.decode('ascii'))
+        elif key == b'author':
+            commit.author, commit.author_time, commit.author_tz = _parse_identity(value)
+        elif key == b'committer':
+            _, commit.committer_time, _ = _parse_identity(value)
+    return commit
+
+def _parse_identity(value: bytes) -> Tuple[str, int, str]:
+    """'Name <email> 1700000000 +0100' -> ('Name', 1700000000, '+0100')."""
+    person, _, when = value.rpartition(b'> ')
+    name = person.split(b' <', 1)[0].decode('utf-8', errors='replace')
+    parts = when.split()
+    timestamp = int(parts[0]) if parts and parts[0].isdigit() else 0
+    tz = parts[1].decode('ascii') if len(parts) > 1 else "+0000"
+    return name, timestamp, tz
+
+def _pack_entry_header(pack: mmap.mmap, offset: int) -> Tuple[int, int, int]:
+    """(type, inflated size, data position) of the pack entry at offset."""
+    byte = pack[offset]
+    object_type = (byte >> 4) & 7
+    size = byte & 0x0f
+    shift = 4
+    offset += 1
+    while byte & 0x80:
+        byte = pack[offset]
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        offset += 1
+    return object_type, size, offset
+
+def _ofs_delta_distance(pack: mmap.mmap, offset: int) -> Tuple[int, int]:
+    """Backwards distance to an OFS_DELTA base (git's offset-plus-one varint)."""
+    byte = pack[offset]
+    distance = byte & 0x7f
+    offset += 1
+    while byte & 0x80:
+        byte = pack[offset]
+        distance = ((distance + 1) << 7) | (byte & 0x7f)
+        offset += 1
+    return distance, offset
+
+def _inflate(pack: mmap.mmap, position: int, size: int, chunk: int = 64 * 1024) -> bytes:
+    """Inflate one zlib stream from the pack without knowing its compressed length."""
+    decompressor = zlib.decompressobj()
+    parts = []
+    while not decompressor.eof and position < len(pack):
+        parts.append(decompressor.decompress(pack[position:position + chunk]))
+        position += chunk
+    data = b''.join(parts)
+    if len(data) != size:
+        raise ValueError("corrupt pack entry")
+    return data
+
+def _delta_size(delta: bytes, position: int) -> Tuple[int, int]:
+    size = shift = 0
+    while True:
+        byte = delta[position]
+        position += 1
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, position
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Apply a git delta: copy ranges of base and insert literal bytes."""
+    _, position = _delta_size(delta, 0)
+    result_size, position = _delta_size(delta, position)
+
+    result = bytearray()
+    while position < len(delta):
+        opcode = delta[position]
+        position += 1
+        if opcode & 0x80:
+            copy_offset = copy_size = 0
+            for bit in range(4):
+                if opcode & (1 << bit):
+                    copy_offset |= delta[position] << (8 * bit)
+                    position += 1
+            for bit in range(3):
+                if opcode & (0x10 << bit):
+                    copy_size |= delta[position] << (8 * bit)
+                    position += 1
+            result += base[copy_offset:copy_offset + (copy_size or 0x10000)]
+        elif opcode:
+            result += delta[position:position + opcode]
+            position += opcode
+        else:
+            raise ValueError("invalid delta opcode 0")
+
+    if len(result) != result_size:
+        raise ValueError("delta produced the wrong size")
+    return bytes(result)
+
+def _is_hex_hash(value: str) -> bool:
+    return len(value) == 2 * HASH_BYTES and all(c in "0123456789abcdef" for c in value)
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
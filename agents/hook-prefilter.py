@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Hook Prefilter for Lessons Learned Tracker
+Entry point for post-tool hook events: a cheap trigger-phrase check on the raw event, with only hits handed to the full agent.
+"""
+
+import os
+import re
+import sys
+import time
+
+# Budget for the full pipeline, measured from hook start; unfinished work is resumed by later runs
+DEFAULT_DEADLINE_MS = 1500
+
+# Lowercase trigger phrases. "fix:" also covers "BUILD FIX:" once the event is lowercased.
+TRIGGER_PHRASES = (
+    b"fix:",
+    b"fixed by",
+    b"root cause",
+    b"resolve:",
+    b"turns out",
+    b"the issue was",
+)
+
+# A phrase only counts at the start of a word, so "prefix:" and "suffix:" are not a "fix:". The scan
+# runs on raw JSON, where a line break is the escape \n: an escape counts as a word boundary too.
+TRIGGER_PATTERN = re.compile(
+    rb'(?:(?<![a-z])|(?<=\\[ntr"])|(?<=\\u[0-9a-f]{4}))(?:'
+    + b"|".join(re.escape(phrase) for phrase in TRIGGER_PHRASES) + rb")"
+)
+
+# (event text, expected has_trigger) for `python hook-prefilter.py selfcheck`
+SELFCHECK_CASES = (
+    ("Fixed by adding a guard", True),
+    ("Build failed\nFixed by adding a guard", True),
+    ("error: nil session\nFix: unwrap it", True),
+    ("step 1\n\tthe issue was a stale cache", True),
+    ("crash\r\nRoot cause: race", True),
+    ('she said "turns out it was the cache"', True),
+    ("\u201cfixed by\u201d a retry", True),
+    ("BUILD FIX: relink", True),
+    ("prefix: suffix: nothing here", False),
+    ("unfixed by design", False),
+    ("all tests passed", False),
+)
+
+def has_trigger(raw_event: bytes) -> bool:
+    """Check the raw event bytes for any trigger phrase (case-insensitive).
+
+    One C-level lowercase pass plus one precompiled alternation scan; no
+    JSON decoding happens on a miss.
+    """
+    return TRIGGER_PATTERN.search(raw_event.lower()) is not None
+
+def run_selfcheck() -> bool:
+    """Encode each case as a hook event and check the prefilter's verdict."""
+    import json
+
+    passed = True
+    for text, expected in SELFCHECK_CASES:
+        raw_event = json.dumps({"tool_name": "Bash", "tool_response": {"stdout": text}}).encode("utf-8")
+        ok = has_trigger(raw_event) == expected
+        passed = passed and ok
+        print(f"{'✅' if ok else '❌'} {text!r}: expected {expected}")
+    return passed
+
+def run_full_pipeline(raw_event: bytes, started: float) -> None:
+    """Decode the event and pass it to the lessons-learned agent within the hook deadline."""
+    import json
+    import contextlib
+    import importlib.util
+
+    event = json.loads(raw_event)
+    project_path = os.environ.get("LESSONS_PROJECT_PATH") or event.get("cwd") or os.getcwd()
+
+    agent_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lessons-learned-agent.py")
+    spec = importlib.util.spec_from_file_location("lessons_learned_agent", agent_path)
+    agent_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent_module)
+
+    deadline_ms = float(os.environ.get("LESSONS_HOOK_DEADLINE_MS", DEFAULT_DEADLINE_MS))
+    remaining_ms = max(0.0, deadline_ms - (time.monotonic() - started) * 1000.0)
+    
+    agent = agent_module.LessonsLearnedAgent(project_path)
+    # The hook stays silent unless it captures a lesson; the agent's progress lines are dropped
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = agent.process_hook_event(event, deadline_ms=remaining_ms)
+    
+    captured = sum(len(result.get('lessons') or []) for result in results.values())
+    if captured:
+        print(f"📚 Captured {captured} lesson(s) in {os.path.basename(agent.claude_md_path)}")
+
+def enqueue_event(raw_event: bytes, queue_db: str) -> None:
+    """Hand the event to the background job queue instead of analyzing it in the hook."""
+    import json
+    import hashlib
+    import importlib.util
+
+    event = json.loads(raw_event)
+    project_path = os.environ.get("LESSONS_PROJECT_PATH") or event.get("cwd") or os.getcwd()
+
+    queue_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job-queue.py")
+    spec = importlib.util.spec_from_file_location("job_queue", queue_path)
+    job_queue = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(job_queue)
+
+    queue = job_queue.JobQueue(queue_db)
+    transcript_path = event.get("transcript_path")
+    if transcript_path and os.path.exists(transcript_path):
+        job_queue.enqueue_transcript(queue, project_path, transcript_path)
+    else:
+        queue.enqueue(
+            "hook-event", {"repo": os.path.abspath(project_path), "event": event},
+            key=f"hook-event:{hashlib.sha1(raw_event).hexdigest()}"
+        )
+
+def record_event(raw_event: bytes, trace_path: str) -> None:
+    """Append the event, triggered or not, to a replay trace (see replay-load.py)."""
+    import json
+
+    line = json.dumps({"time": time.time(), "kind": "hook-event", "event": json.loads(raw_event)}) + "\n"
+    # One O_APPEND write per event, so concurrent hooks do not interleave lines
+    fd = os.open(trace_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+def main() -> int:
+    if sys.argv[1:] == ["selfcheck"]:
+        return 0 if run_selfcheck() else 1
+    
+    started = time.monotonic()
+    raw_event = sys.stdin.buffer.read()
+    
+    trace_path = os.environ.get("LESSONS_RECORD_EVENTS")
+    if raw_event and trace_path:
+        try:
+            record_event(raw_event, trace_path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not record hook event: {e}", file=sys.stderr)
+    
+    if not raw_event or not has_trigger(raw_event):
+        return 0
+
+    try:
+        queue_db = os.environ.get("LESSONS_QUEUE_DB")
+        if queue_db:
+            enqueue_event(raw_event, queue_db)
+        else:
+            run_full_pipeline(raw_event, started)
+    except Exception as e:
+        # Never fail the tool call because lesson capture broke
+        print(f"❌ Lessons hook error: {e}", file=sys.stderr)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
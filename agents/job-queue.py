@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Job Queue for Lessons Learned Tracker
+Durable SQLite-backed queue so hooks and the commit monitor can hand off analysis work to background workers.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_QUEUE_DB = os.path.expanduser("~/.lessons-learned/jobs.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    lease_expires REAL,
+    worker TEXT,
+    last_error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, priority DESC, run_at, id);
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+"""
+
+# WHERE clause for updates only the current lease holder may make: (id, worker, attempts)
+LEASE_HELD = "id = ? AND state = 'running' AND worker = ? AND attempts = ?"
+
+@dataclass
+class Job:
+    id: int
+    key: str
+    kind: str
+    payload: Dict[str, any]
+    attempts: int
+    worker: Optional[str] = None
+
+class JobQueue:
+    """At-least-once job queue in a SQLite database (WAL mode).
+
+    Jobs are deduplicated by key: enqueueing a key that already exists, in
+    any state, is a no-op. A worker claims a job under a lease and renews it
+    while the job runs; if the worker dies, the lease runs out and the job
+    becomes claimable again, so a killed process never loses work. A lease
+    that runs out on the last attempt fails the job instead, so a job that
+    keeps killing its worker does not loop forever. Failures are retried with exponential
+    backoff until max_attempts, after which the job stays 'failed' for
+    inspection. Each thread uses its own connection.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_QUEUE_DB, lease_seconds: float = 300.0,
+                 max_attempts: int = 5, retry_base_seconds: float = 5.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+        self._local = threading.local()
+
+    def enqueue(self, kind: str, payload: Dict[str, any], key: Optional[str] = None, priority: int = 0) -> bool:
+        """Add a job; returns False if a job with the same key already exists."""
+        now = time.time()
+        key = key or f"{kind}:{json.dumps(payload, sort_keys=True)}"
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO jobs (key, kind, payload, priority, run_at, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, kind, json.dumps(payload), priority, now, now, now)
+        )
+        return cursor.rowcount == 1
+
+    def advance_cursor(self, name: str, position: int) -> Optional[int]:
+        """Move a named cursor forward; returns its previous position, or None if it did not move."""
+        connection = self._connection()
+        with self._transaction(connection):
+            row = connection.execute("SELECT position FROM cursors WHERE name = ?", (name,)).fetchone()
+            previous = row[0] if row else 0
+            if position <= previous:
+                return None
+            connection.execute("INSERT OR REPLACE INTO cursors (name, position) VALUES (?, ?)", (name, position))
+            return previous
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Lease the next runnable job: highest priority, then oldest."""
+        now = time.time()
+        connection = self._connection()
+        with self._transaction(connection):
+            connection.execute(
+                "UPDATE jobs SET state = 'failed', lease_expires = NULL, updated = ?, "
+                "last_error = 'lease expired on attempt ' || attempts || ' (worker ' || COALESCE(worker, '?') || ' died or hung)' "
+                "WHERE state = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = connection.execute(
+                "SELECT id, key, kind, payload, attempts FROM jobs "
+                "WHERE (state = 'queued' AND run_at <= ?) OR (state = 'running' AND lease_expires < ?) "
+                "ORDER BY priority DESC, run_at, id LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if not row:
+                return None
+
+            connection.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_expires = ?, worker = ?, updated = ? "
+                "WHERE id = ?",
+                (now + self.lease_seconds, worker, now, row[0])
+            )
+
+        return Job(id=row[0], key=row[1], kind=row[2], payload=json.loads(row[3]), attempts=row[4] + 1, worker=worker)
+
+    def renew(self, job: Job) -> bool:
+        """Extend a running job's lease; returns False if its worker no longer holds it."""
+        now = time.time()
+        cursor = self._connection().execute(
+            f"UPDATE jobs SET lease_expires = ?, updated = ? WHERE {LEASE_HELD}",
+            (now + self.lease_seconds, now, job.id, job.worker, job.attempts)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job: Job) -> bool:
+        """Mark the job done; returns False if its worker no longer holds the lease."""
+        cursor = self._connection().execute(
+            f"UPDATE jobs SET state = 'done', lease_expires = NULL, last_error = NULL, updated = ? WHERE {LEASE_HELD}",
+            (time.time(), job.id, job.worker, job.attempts)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job: Job, error: str) -> Optional[bool]:
+        """Record a failure; returns True if the job will be retried, None if the lease was lost."""
+        now = time.time()
+        retry = job.attempts < self.max_attempts
+        cursor = self._connection().execute(
+            f"UPDATE jobs SET state = ?, run_at = ?, lease_expires = NULL, last_error = ?, updated = ? WHERE {LEASE_HELD}",
+            (
+                'queued' if retry else 'failed',
+                now + self.retry_base_seconds * (2 ** (job.attempts - 1)) if retry else now,
+                error[:2000], now, job.id, job.worker, job.attempts
+            )
+        )
+        return retry if cursor.rowcount == 1 else None
+
+    def retry_failed(self) -> int:
+        """Put every permanently failed job back in the queue with a fresh attempt count."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET state = 'queued', attempts = 0, run_at = ?, updated = ? WHERE state = 'failed'",
+            (now, now)
+        )
+        return cursor.rowcount
+
+    def prune_done(self, older_than_seconds: float = 30 * 24 * 3600) -> int:
+        """Delete finished jobs older than the cutoff (their keys stop deduplicating)."""
+        cursor = self._connection().execute(
+            "DELETE FROM jobs WHERE state = 'done' AND updated < ?", (time.time() - older_than_seconds,)
+        )
+        return cursor.rowcount
+
+    def is_idle(self) -> bool:
+        """True when nothing is runnable now and no live lease is outstanding."""
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT 1 FROM jobs WHERE (state = 'queued' AND run_at <= ?) OR state = 'running' LIMIT 1", (now,)
+        ).fetchone()
+        return row is None
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts by state."""
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def failed_jobs(self, limit: int = 20) -> List[Dict[str, any]]:
+        rows = self._connection().execute(
+            "SELECT key, attempts, last_error FROM jobs WHERE state = 'failed' ORDER BY updated DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [{"key": key, "attempts": attempts, "error": error} for key, attempts, error in rows]
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    @contextmanager
+    def _transaction(connection: sqlite3.Connection):
+        """BEGIN IMMEDIATE ... COMMIT, so concurrent claimers serialize on the write lock."""
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+def enqueue_commits(queue: JobQueue, repo: str, commit_hashes: List[str]) -> int:
+    """Queue one 'commit' job per hash; returns how many were new."""
+    repo = os.path.abspath(repo)
+    return sum(
+        queue.enqueue("commit", {"repo": repo, "commit": commit_hash}, key=f"commit:{repo}:{commit_hash}")
+        for commit_hash in commit_hashes
+    )
+
+def enqueue_transcript(queue: JobQueue, repo: str, transcript_path: str, start: Optional[int] = None) -> bool:
+    """Queue the not-yet-queued part of a JSONL transcript as one 'transcript' job.
+
+    A per-transcript cursor remembers how far earlier jobs reach, so repeated
+    calls (one per hook event) enqueue consecutive, non-overlapping ranges.
+    Ranges end at the last complete line; a record still being written is
+    left for the next call. With start, that offset is queued explicitly.
+    """
+    transcript_path = os.path.abspath(transcript_path)
+    end = _complete_lines_end(transcript_path)
+
+    if start is None:
+        start = queue.advance_cursor(f"transcript:{transcript_path}", end)
+        if start is None:
+            return False
+    elif start >= end:
+        return False
+
+    return queue.enqueue(
+        "transcript",
+        {"repo": os.path.abspath(repo), "path": transcript_path, "start": start, "end": end},
+        key=f"transcript:{transcript_path}:{start}:{end}"
+    )
+
+def _complete_lines_end(path: str, tail_bytes: int = 64 * 1024) -> int:
+    """Offset just past the last newline in the file, found by reading backwards from the end."""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        while position > 0:
+            chunk_start = max(0, position - tail_bytes)
+            f.seek(chunk_start)
+            newline = f.read(position - chunk_start).rfind(b'\n')
+            if newline != -1:
+                return chunk_start + newline + 1
+            position = chunk_start
+    return 0
+
+class JobWorkerPool:
+    """Background threads that claim jobs and dispatch them to handlers by kind.
+
+    handlers maps a job kind to a callable taking the payload; a handler
+    fails a job by raising. Handlers must be idempotent, because a job whose
+    worker died is run again once its lease expires. The agent's handlers
+    use write keys for this (see ClaudeMdUpdater.add_lesson_sections).
+
+    A heartbeat thread renews the lease while a handler runs, so a slow job
+    is not run twice at once. Several worker processes can share one queue
+    database.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Dict[str, any]], object]],
+                 workers: int = 2, idle_sleep: float = 1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.idle_sleep = idle_sleep
+
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.processed = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{os.getpid()}-{index}",),
+                                      name=f"lessons-job-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, wait: bool = True) -> None:
+        self.stop_event.set()
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def run(self, until_idle: bool = False) -> None:
+        """Run workers until interrupted, or until the queue has no runnable jobs."""
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self.threads):
+                if until_idle and self.queue.is_idle():
+                    break
+                time.sleep(self.idle_sleep)
+        except KeyboardInterrupt:
+            print("\n👋 Stopping job workers")
+        finally:
+            self.stop()
+
+    def run_once(self, worker: str = "inline") -> bool:
+        """Claim and process a single job in the calling thread; returns False if none was runnable."""
+        job = self.queue.claim(worker)
+        if not job:
+            return False
+        self._process(job)
+        return True
+
+    def _work(self, worker: str) -> None:
+        while not self.stop_event.is_set():
+            if not self.run_once(worker):
+                self.stop_event.wait(self.idle_sleep)
+
+    @contextmanager
+    def _heartbeat(self, job: Job):
+        """Renew the job's lease every third of the lease time while the block runs."""
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(self.queue.lease_seconds / 3):
+                if not self.queue.renew(job):
+                    return
+
+        thread = threading.Thread(target=renew, name=f"lessons-job-heartbeat-{job.id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _process(self, job: Job) -> None:
+        handler = self.handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise ValueError(f"no handler for job kind '{job.kind}'")
+            with self._heartbeat(job):
+                handler(job.payload)
+        except Exception as e:
+            retry = self.queue.fail(job, f"{type(e).__name__}: {e}")
+            with self.lock:
+                self.failed += 1
+            if retry is None:
+                print(f"⚠️ Job {job.key} failed after its lease was lost; the current holder decides: {e}")
+            else:
+                print(f"❌ Job {job.key} failed (attempt {job.attempts}){', will retry' if retry else ''}: {e}")
+            return
+
+        if not self.queue.complete(job):
+            print(f"⚠️ Job {job.key} finished after its lease was lost; the current holder decides")
+        with self.lock:
+            self.processed += 1
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Lesson Clusterer for Lessons Learned Tracker
+Groups related lessons into feature sections using TF-IDF vectors and sparse cosine similarity.
+"""
+
+import re
+import heapq
+import math
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "was", "were", "are", "not", "but", "from",
+    "into", "have", "has", "had", "when", "then", "than", "after", "before", "issue", "fix",
+    "fixed", "added", "updated", "changed", "now", "out", "turns", "by", "to", "of", "in",
+    "on", "it", "is", "be", "as", "at", "an", "or", "we", "you", "our", "its", "all", "any",
+    "needed", "need", "use", "used", "using", "work", "working", "development", "applied",
+    "solution", "problem", "encountered", "swift",
+    # Speaker labels of transcript exchanges
+    "user", "assistant"
+}
+
+@dataclass
+class LessonCluster:
+    members: List[object] = field(default_factory=list)
+    centroid: Dict[str, float] = field(default_factory=dict)
+    norm_squared: float = 0.0
+    indexed_size: int = 0
+    indexed_terms: List[str] = field(default_factory=list)
+
+    def top_terms(self, limit: int) -> List[str]:
+        return [term for term, _ in sorted(self.centroid.items(), key=lambda item: -item[1])[:limit]]
+
+class LessonClusterer:
+    """Single-pass TF-IDF clustering with an inverted index over cluster centroids.
+
+    Each lesson becomes a sparse, L2-normalized TF-IDF vector of its top terms.
+    A lesson joins the most similar existing cluster (cosine against the
+    centroid) when similarity reaches the threshold, otherwise it seeds a new
+    cluster. Candidate clusters come from an inverted index keyed by each
+    centroid's strongest terms, and only the max_candidates clusters sharing
+    the most terms with a lesson are scored, so the cost grows with the
+    number of lessons rather than with lessons × clusters. Clusters smaller than
+    min_cluster_size are folded into their nearest neighbour or a shared
+    remainder cluster, which keeps CLAUDE.md from filling up with one-point
+    sections.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.25, min_cluster_size: int = 2,
+                 terms_per_lesson: int = 12, index_terms_per_cluster: int = 8, max_df_ratio: float = 0.5,
+                 max_candidates: int = 4):
+        self.similarity_threshold = similarity_threshold
+        self.min_cluster_size = min_cluster_size
+        self.terms_per_lesson = terms_per_lesson
+        self.index_terms_per_cluster = index_terms_per_cluster
+        self.max_df_ratio = max_df_ratio
+        self.max_candidates = max_candidates
+
+        self.token_pattern = re.compile(r"[A-Za-z][a-z0-9]+|[A-Z]+(?![a-z])")
+
+    def cluster(self, lessons: List[object], text_of: Callable[[object], str]) -> List[LessonCluster]:
+        """Cluster lessons; returns clusters largest first."""
+        if not lessons:
+            return []
+
+        documents = [self._tokenize(text_of(lesson)) for lesson in lessons]
+        vectors = self._tfidf(documents)
+
+        clusters = []
+        index = {}
+        for lesson, vector in zip(lessons, vectors):
+            best, best_similarity = self._nearest(vector, clusters, index)
+
+            if best is None or best_similarity < self.similarity_threshold:
+                best = len(clusters)
+                clusters.append(LessonCluster())
+
+            self._add_to_cluster(clusters[best], best, lesson, vector, index)
+
+        return self._fold_small_clusters(clusters)
+
+    def name_cluster(self, cluster: LessonCluster, feature_keywords: Dict[str, str], default: str) -> str:
+        """Name a cluster from its strongest terms, preferring known feature keywords."""
+        top_terms = cluster.top_terms(self.index_terms_per_cluster)
+
+        for term in top_terms:
+            for keyword, feature in feature_keywords.items():
+                if term == keyword or term.startswith(keyword):
+                    return feature
+
+        if len(cluster.members) >= self.min_cluster_size and top_terms:
+            return " ".join(term.title() for term in top_terms[:2])
+
+        return default
+
+    def _tokenize(self, text: str) -> List[str]:
+        """Lowercased word tokens, splitting camelCase identifiers such as heightAnchor."""
+        return [
+            token for token in (match.lower() for match in self.token_pattern.findall(text))
+            if len(token) > 2 and token not in STOP_WORDS
+        ]
+
+    def _tfidf(self, documents: List[List[str]]) -> List[Dict[str, float]]:
+        """Sparse, L2-normalized TF-IDF vectors keeping each document's strongest terms."""
+        document_frequency = {}
+        for tokens in documents:
+            for token in set(tokens):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+
+        total = len(documents)
+        # Near-universal terms carry no signal once the batch is large enough to judge
+        max_df = max(2, int(total * self.max_df_ratio)) if total >= 10 else total
+        idf = {
+            token: math.log((1 + total) / (1 + df)) + 1.0
+            for token, df in document_frequency.items() if df <= max_df
+        }
+
+        vectors = []
+        for tokens in documents:
+            counts = {}
+            for token in tokens:
+                if token in idf:
+                    counts[token] = counts.get(token, 0) + 1
+
+            weights = sorted(((count * idf[token], token) for token, count in counts.items()), reverse=True)
+            weights = weights[:self.terms_per_lesson]
+            norm = math.sqrt(sum(weight * weight for weight, _ in weights)) or 1.0
+            vectors.append({token: weight / norm for weight, token in weights})
+
+        return vectors
+
+    def _nearest(self, vector: Dict[str, float], clusters: List[LessonCluster],
+                 index: Dict[str, Dict[int, float]]) -> Tuple[Optional[int], float]:
+        """Most similar cluster, scoring only the best candidates from the index.
+
+        Candidates are ranked by their cosine over the indexed terms alone,
+        using the centroid weights stored in the index when the cluster was
+        last indexed; only the top max_candidates get the full cosine.
+        """
+        partial = {}
+        for term, weight in vector.items():
+            for cluster_id, indexed_weight in index.get(term, {}).items():
+                partial[cluster_id] = partial.get(cluster_id, 0.0) + weight * indexed_weight
+
+        candidates = partial
+        if len(partial) > self.max_candidates:
+            candidates = heapq.nlargest(self.max_candidates, partial, key=partial.get)
+
+        best, best_similarity = None, 0.0
+        for cluster_id in candidates:
+            cluster = clusters[cluster_id]
+            if cluster.norm_squared <= 0:
+                continue
+
+            centroid = cluster.centroid
+            dot = sum(weight * centroid.get(term, 0.0) for term, weight in vector.items())
+            similarity = dot / math.sqrt(cluster.norm_squared)
+            if similarity > best_similarity:
+                best, best_similarity = cluster_id, similarity
+
+        return best, best_similarity
+
+    def _add_to_cluster(self, cluster: LessonCluster, cluster_id: int, lesson: object,
+                        vector: Dict[str, float], index: Dict[str, Dict[int, float]]) -> None:
+        """Add a member, updating the centroid and its norm incrementally."""
+        cluster.members.append(lesson)
+
+        centroid = cluster.centroid
+        for term, weight in vector.items():
+            previous = centroid.get(term, 0.0)
+            centroid[term] = previous + weight
+            cluster.norm_squared += 2 * previous * weight + weight * weight
+
+        # Re-index on the cluster's strongest terms whenever its size doubles,
+        # dropping the terms that are no longer among them
+        if len(cluster.members) >= 2 * cluster.indexed_size:
+            terms = cluster.top_terms(self.index_terms_per_cluster)
+            for term in set(cluster.indexed_terms).difference(terms):
+                del index[term][cluster_id]
+            self._index_cluster(cluster, cluster_id, terms, index)
+            cluster.indexed_terms = terms
+            cluster.indexed_size = len(cluster.members)
+
+    @staticmethod
+    def _index_cluster(cluster: LessonCluster, cluster_id: int, terms: List[str],
+                       index: Dict[str, Dict[int, float]]) -> None:
+        """Post the cluster under each term with its normalized centroid weight."""
+        norm = math.sqrt(cluster.norm_squared) or 1.0
+        for term in terms:
+            index.setdefault(term, {})[cluster_id] = cluster.centroid[term] / norm
+
+    def _fold_small_clusters(self, clusters: List[LessonCluster]) -> List[LessonCluster]:
+        """Merge undersized clusters into their nearest large cluster or one remainder cluster."""
+        large = [cluster for cluster in clusters if len(cluster.members) >= self.min_cluster_size]
+        small = [cluster for cluster in clusters if len(cluster.members) < self.min_cluster_size]
+
+        if not large:
+            # Nothing is big enough to stand alone: everything becomes one section
+            merged = LessonCluster()
+            for cluster in small:
+                self._absorb(merged, cluster)
+            return [merged]
+
+        index = {}
+        for cluster_id, cluster in enumerate(large):
+            self._index_cluster(cluster, cluster_id, cluster.top_terms(self.index_terms_per_cluster), index)
+
+        remainder = LessonCluster()
+        for cluster in small:
+            norm = math.sqrt(cluster.norm_squared) or 1.0
+            direction = {term: weight / norm for term, weight in cluster.centroid.items()}
+            best, similarity = self._nearest(direction, large, index)
+            if best is not None and similarity >= self.similarity_threshold / 2:
+                self._absorb(large[best], cluster)
+            else:
+                self._absorb(remainder, cluster)
+
+        if remainder.members:
+            large.append(remainder)
+
+        return sorted(large, key=lambda cluster: -len(cluster.members))
+
+    @staticmethod
+    def _absorb(target: LessonCluster, source: LessonCluster) -> None:
+        target.members.extend(source.members)
+        for term, weight in source.centroid.items():
+            previous = target.centroid.get(term, 0.0)
+            target.centroid[term] = previous + weight
+            target.norm_squared += 2 * previous * weight + weight * weight
+
+def synthetic_lessons(count: int, topics: int = 300, seed: int = 7) -> List[str]:
+    """Lesson texts drawn from `topics` vocabularies plus unrelated noise words."""
+    import random
+
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = list({"".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(20000)})
+    topic_words = [rng.sample(vocabulary, 15) for _ in range(topics)]
+
+    lessons = []
+    for _ in range(count):
+        words = rng.sample(topic_words[rng.randrange(topics)], 6)
+        noise = rng.sample(vocabulary, 6)
+        lessons.append(f"User: the {' '.join(words)} view broke. Assistant: fixed by adding {' '.join(noise)}")
+    return lessons
+
+def run_benchmark(count: int = 50000, max_seconds: float = 10.0, max_ratio: float = 6.0) -> bool:
+    """Cluster count/4 and count synthetic lessons; fail if slower than max_seconds or super-linear."""
+    import time
+
+    timings = []
+    for size in (count // 4, count):
+        lessons = synthetic_lessons(size)
+        start = time.perf_counter()
+        clusters = LessonClusterer().cluster(lessons, lambda text: text)
+        timings.append(time.perf_counter() - start)
+        print(f"   {size} lessons: {timings[-1]:.2f}s, {len(clusters)} clusters")
+
+    ratio = timings[1] / max(timings[0], 1e-6)
+    passed = timings[1] <= max_seconds and ratio <= max_ratio
+    print(f"{'✅' if passed else '❌'} {count} lessons in {timings[1]:.2f}s (limit {max_seconds:.0f}s), 4n/n = {ratio:.1f}")
+    return passed
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Lesson Correlator for Lessons Learned Tracker
+Joins chat lessons to the commit lessons that shipped the same fix, by shared files within a time window.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# A fix is usually discussed in the hours before it is committed
+DEFAULT_WINDOW_SECONDS = 4 * 3600
+
+# What CommitAnalyzer falls back to when the message names no context, problem or solution,
+# including the solutions it guesses from file names
+COMMIT_PLACEHOLDERS = {
+    "Development work", "Development issue encountered", "Applied technical fix",
+    "Updated UI components and layout constraints", "Modified service layer implementation",
+    "Fixed view controller logic and navigation"
+}
+
+@dataclass
+class CorrelationResult:
+    # Every commit lesson in input order, the paired ones replaced by their merged lesson
+    commit_lessons: List[object] = field(default_factory=list)
+    # Chat lessons no commit claimed, in input order
+    chat_lessons: List[object] = field(default_factory=list)
+    merged: int = 0
+
+class LessonCorrelator:
+    """Pairs each commit lesson with at most one chat lesson about the same fix.
+
+    A chat lesson and a commit lesson are candidates when the chat mentions
+    a file the commit changed (compared by file name) and their timestamps
+    are at most window_seconds apart. Both sides are indexed by file name
+    and sorted by time, and each file's two lists are merged with a sliding
+    window, so the join costs O(n log n) plus the candidate pairs. Pairs
+    sharing more files win, then the closest in time. Chat lessons without
+    a timestamp are placed at default_chat_time; without that, or without
+    files, they are never paired.
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+
+    def correlate(self, chat_lessons: List, commit_lessons: List,
+                  default_chat_time: Optional[float] = None) -> CorrelationResult:
+        chat_index = self._index(
+            chat_lessons, lambda lesson: lesson.files_involved,
+            lambda lesson: parse_timestamp(getattr(lesson, 'timestamp', None)) or default_chat_time
+        )
+        commit_index = self._index(
+            commit_lessons, lambda lesson: lesson.files_changed, lambda lesson: parse_timestamp(lesson.timestamp)
+        )
+
+        # (chat position, commit position) -> [shared files, smallest time gap]
+        candidates: Dict[Tuple[int, int], List[float]] = {}
+        for key, commit_entries in commit_index.items():
+            chat_entries = chat_index.get(key)
+            if not chat_entries:
+                continue
+
+            chat_entries.sort()
+            commit_entries.sort()
+            low = 0
+            for commit_time, commit_position in commit_entries:
+                while low < len(chat_entries) and chat_entries[low][0] < commit_time - self.window_seconds:
+                    low += 1
+
+                position = low
+                while position < len(chat_entries) and chat_entries[position][0] <= commit_time + self.window_seconds:
+                    chat_time, chat_position = chat_entries[position]
+                    candidate = candidates.setdefault((chat_position, commit_position), [0, float("inf")])
+                    candidate[0] += 1
+                    candidate[1] = min(candidate[1], abs(chat_time - commit_time))
+                    position += 1
+
+        pairs = {}
+        used_chat = set()
+        for (chat_position, commit_position), _ in sorted(candidates.items(), key=lambda item: (-item[1][0], item[1][1])):
+            if chat_position in used_chat or commit_position in pairs:
+                continue
+            used_chat.add(chat_position)
+            pairs[commit_position] = chat_position
+
+        return CorrelationResult(
+            commit_lessons=[
+                merge_lessons(chat_lessons[pairs[position]], lesson) if position in pairs else lesson
+                for position, lesson in enumerate(commit_lessons)
+            ],
+            chat_lessons=[lesson for position, lesson in enumerate(chat_lessons) if position not in used_chat],
+            merged=len(pairs)
+        )
+
+    @staticmethod
+    def _index(lessons: List, files_of, time_of) -> Dict[str, List[Tuple[float, int]]]:
+        """File name -> [(timestamp, position)], unsorted."""
+        index: Dict[str, List[Tuple[float, int]]] = {}
+        for position, lesson in enumerate(lessons):
+            timestamp = time_of(lesson)
+            if timestamp is None:
+                continue
+            for key in {file_key(path) for path in files_of(lesson) or []}:
+                index.setdefault(key, []).append((timestamp, position))
+        return index
+
+def merge_lessons(chat_lesson, commit_lesson):
+    """One lesson from both sides: the commit's record, with the session's wording where the commit has none."""
+    def pick(commit_value: str, chat_value: str) -> str:
+        return chat_value if commit_value in COMMIT_PLACEHOLDERS and chat_value else commit_value
+
+    return replace(
+        commit_lesson,
+        context=pick(commit_lesson.context, chat_lesson.context),
+        problem=pick(commit_lesson.problem, chat_lesson.problem),
+        solution=pick(commit_lesson.solution, chat_lesson.solution),
+        time_spent=commit_lesson.time_spent or chat_lesson.time_spent,
+        chat_excerpt=f"{chat_lesson.problem} → {chat_lesson.solution}"
+    )
+
+def file_key(path: str) -> str:
+    """Chat mentions are mostly bare file names, so files are compared by name."""
+    return os.path.basename(path.rstrip('/')).lower()
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Unix time of a git --date=iso or ISO 8601 timestamp; naive times are taken as local time."""
+    if not value:
+        return None
+
+    value = value.strip()
+    for parse in (
+        lambda text: datetime.strptime(text, "%Y-%m-%d %H:%M:%S %z"),
+        lambda text: datetime.fromisoformat(text.replace('Z', '+00:00'))
+    ):
+        try:
+            return parse(value).timestamp()
+        except ValueError:
+            continue
+    return None
+
+def file_time(path: Optional[str]) -> float:
+    """Modification time of a conversation file, or now when there is none."""
+    try:
+        return os.path.getmtime(path) if path else time.time()
+    except OSError:
+        return time.time()
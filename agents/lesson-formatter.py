@@ -93,6 +93,8 @@ class LessonFormatter:
         # Add technical details if available
         if hasattr(lesson, 'files_involved') and lesson.files_involved:
             points.append(f"Files involved: {', '.join(lesson.files_involved)}")
+        if getattr(lesson, 'chat_excerpt', None):
+            points.append(f"From the session: {lesson.chat_excerpt}")
         
         # Add prevention/best practice
         prevention = self._generate_prevention_tip(lesson)
@@ -150,6 +152,10 @@ class LessonFormatter:
     def _generate_prevention_tip(self, lesson) -> str:
         """Generate prevention tip based on lesson category and content."""
         
+        # A takeaway written by the developer (LESSON: in a commit body) beats a generic tip
+        if getattr(lesson, 'lesson', None):
+            return lesson.lesson
+        
         category = getattr(lesson, 'category', 'General')
         
         category_tips = {
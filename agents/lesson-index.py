@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Lesson Index for Lessons Learned Tracker
+Persistent reverse index from repository paths to the lessons that touched them, following renames.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lessons (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    category TEXT NOT NULL,
+    section TEXT,
+    title TEXT NOT NULL,
+    commit_hash TEXT,
+    timestamp TEXT,
+    indexed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lesson_paths (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    lesson_id TEXT NOT NULL,
+    PRIMARY KEY (path, lesson_id)
+);
+CREATE INDEX IF NOT EXISTS lesson_paths_name ON lesson_paths (name);
+CREATE TABLE IF NOT EXISTS renames (
+    old_path TEXT NOT NULL,
+    new_path TEXT NOT NULL,
+    commit_hash TEXT,
+    PRIMARY KEY (old_path, new_path)
+);
+CREATE INDEX IF NOT EXISTS renames_new ON renames (new_path);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+class LessonIndex:
+    """SQLite index: path -> lesson ids, plus every rename seen in the history.
+
+    Commit lessons are indexed under the full paths they changed. Chat
+    lessons are indexed under whatever the conversation mentioned, often a
+    bare file name or a partial path; such an entry matches any path it is
+    a suffix of. A lookup first expands the path to every name the file has
+    had, walking renames in both directions, so a lesson recorded under an
+    old name is still found. A path reused by an unrelated file after a
+    rename is treated as the same file.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def add_lesson(self, lesson_id: str, paths: Iterable[str], source: str, category: str, title: str,
+                   section: Optional[str] = None, commit_hash: Optional[str] = None,
+                   timestamp: Optional[str] = None) -> bool:
+        """Index a lesson under its paths; returns False if it was already indexed."""
+        with self.lock, self._connection() as connection:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO lessons (id, source, category, section, title, commit_hash, timestamp, indexed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (lesson_id, source, category, section, title, commit_hash, timestamp, time.time())
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO lesson_paths (path, name, lesson_id) VALUES (?, ?, ?)",
+                [(path, _name(path), lesson_id) for path in {_normalize(path) for path in paths} if path]
+            )
+            return cursor.rowcount == 1
+
+    def add_renames(self, renames: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """Record (old path, new path, commit) renames; returns how many were new."""
+        with self.lock, self._connection() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO renames (old_path, new_path, commit_hash) VALUES (?, ?, ?)", renames
+            )
+            return connection.total_changes - before
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self.lock, self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def aliases(self, path: str) -> List[str]:
+        """The path and every name it was renamed from or to, transitively."""
+        path = _normalize(path)
+        with self.lock:
+            connection = self._connection()
+            seen = {path}
+            frontier = [path]
+            while frontier:
+                placeholders = ",".join("?" * len(frontier))
+                rows = connection.execute(
+                    f"SELECT old_path, new_path FROM renames WHERE old_path IN ({placeholders}) OR new_path IN ({placeholders})",
+                    frontier + frontier
+                ).fetchall()
+                frontier = [name for row in rows for name in row if name not in seen]
+                seen.update(frontier)
+        return sorted(seen)
+
+    def lessons_for(self, path: str) -> List[Dict[str, any]]:
+        """Lessons indexed under the path or any of its former names, newest first."""
+        aliases = self.aliases(path)
+        names = sorted({_name(alias) for alias in aliases})
+
+        with self.lock:
+            placeholders = ",".join("?" * len(names))
+            rows = self._connection().execute(
+                "SELECT p.path, l.id, l.source, l.category, l.section, l.title, l.commit_hash, l.timestamp, l.indexed "
+                f"FROM lesson_paths p JOIN lessons l ON l.id = p.lesson_id WHERE p.name IN ({placeholders})",
+                names
+            ).fetchall()
+
+        lessons = {}
+        for indexed_path, lesson_id, source, category, section, title, commit_hash, timestamp, indexed in rows:
+            matched = next((alias for alias in aliases if alias == indexed_path or alias.endswith('/' + indexed_path)), None)
+            if matched is None or lesson_id in lessons:
+                continue
+            lessons[lesson_id] = {
+                "id": lesson_id,
+                "source": source,
+                "category": category,
+                "section": section,
+                "title": title,
+                "commit": commit_hash,
+                "timestamp": timestamp,
+                "path": matched,
+                "indexed": indexed
+            }
+        return sorted(lessons.values(), key=lambda lesson: lesson["indexed"], reverse=True)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self.connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self.connection = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+def parse_renames(output: str) -> List[Tuple[str, str, str]]:
+    """(old path, new path, commit) from `git log -z -M --diff-filter=R --name-status --format=%x00%H`."""
+    tokens = output.split('\x00')
+
+    renames = []
+    commit_hash = None
+    position = 0
+    while position < len(tokens):
+        token = tokens[position].strip('\n')
+        if token[:1] == 'R' and token[1:].isdigit() and position + 2 < len(tokens):
+            renames.append((tokens[position + 1], tokens[position + 2], commit_hash))
+            position += 3
+            continue
+        if token:
+            commit_hash = token
+        position += 1
+    return renames
+
+def _normalize(path: str) -> str:
+    path = path.strip().replace('\\', '/')
+    while path.startswith('./'):
+        path = path[2:]
+    return path
+
+def _name(path: str) -> str:
+    return path.rsplit('/', 1)[-1]
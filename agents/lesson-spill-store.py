@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Lesson Spill Store for Lessons Learned Tracker
+Buffers extracted lessons under a memory budget, spilling sorted runs to disk and grouping them by category with an external merge.
+"""
+
+import os
+import json
+import heapq
+import shutil
+import tempfile
+from dataclasses import asdict
+from itertools import groupby
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+class SpillingLessonStore:
+    """Holds lessons in memory until a byte budget is crossed, then spills to disk.
+
+    Spilled runs are JSON-lines files sorted by category. iter_groups() merges
+    runs with a bounded fan-in, so grouping a transcript of any size keeps at
+    most one buffered line per open run in memory.
+    """
+
+    def __init__(self, max_buffer_bytes: int, lesson_factory: Callable[..., object],
+                 tmp_dir: Optional[str] = None, max_fan_in: int = 32):
+        self.max_buffer_bytes = max_buffer_bytes
+        self.lesson_factory = lesson_factory
+        self.tmp_dir = tmp_dir
+        self.max_fan_in = max_fan_in
+
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.runs = []
+        self.count = 0
+        self.category_counts = {}
+        self._work_dir = None
+
+    def __enter__(self) -> "SpillingLessonStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, lesson) -> None:
+        """Buffer a lesson, spilling the buffer to a sorted run when over budget."""
+        category = getattr(lesson, 'category', 'General')
+
+        self.buffer.append(lesson)
+        self.buffer_bytes += self._estimate_size(lesson)
+        self.count += 1
+        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+
+        if self.buffer_bytes >= self.max_buffer_bytes:
+            self._spill()
+
+    @property
+    def spilled(self) -> bool:
+        return bool(self.runs)
+
+    def iter_groups(self) -> Iterator[Tuple[str, Iterator[object]]]:
+        """Yield (category, lessons) in category order; each lessons iterator is lazy."""
+        if not self.runs:
+            grouped = {}
+            for lesson in self.buffer:
+                grouped.setdefault(getattr(lesson, 'category', 'General'), []).append(lesson)
+            for category in sorted(grouped):
+                yield category, iter(grouped[category])
+            return
+
+        if self.buffer:
+            self._spill()
+
+        # Reduce to at most max_fan_in runs so the final merge has bounded open files
+        while len(self.runs) > self.max_fan_in:
+            merged_runs = []
+            for start in range(0, len(self.runs), self.max_fan_in):
+                merged_runs.append(self._merge_runs(self.runs[start:start + self.max_fan_in]))
+            self.runs = merged_runs
+
+        files = [open(path, 'r') for path in self.runs]
+        try:
+            records = heapq.merge(*(self._read_run(f) for f in files), key=lambda record: record[0])
+            for category, group in groupby(records, key=lambda record: record[0]):
+                yield category, (self.lesson_factory(**record[1]) for record in group)
+        finally:
+            for f in files:
+                f.close()
+
+    def close(self) -> None:
+        """Delete any spilled runs."""
+        if self._work_dir:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+            self._work_dir = None
+        self.runs = []
+        self.buffer = []
+        self.buffer_bytes = 0
+
+    def _spill(self) -> None:
+        """Write the buffer as a category-sorted run file."""
+        if not self.buffer:
+            return
+
+        if not self._work_dir:
+            self._work_dir = tempfile.mkdtemp(prefix="lessons-spill-", dir=self.tmp_dir)
+
+        run_path = os.path.join(self._work_dir, f"run-{len(self.runs):06d}.jsonl")
+        self.buffer.sort(key=lambda lesson: getattr(lesson, 'category', 'General'))
+        with open(run_path, 'w') as f:
+            for lesson in self.buffer:
+                f.write(json.dumps(asdict(lesson)) + "\n")
+
+        self.runs.append(run_path)
+        self.buffer = []
+        self.buffer_bytes = 0
+
+    def _merge_runs(self, run_paths: List[str]) -> str:
+        """Merge several sorted runs into one and remove the inputs."""
+        merged_path = os.path.join(self._work_dir, f"merged-{os.path.basename(run_paths[0])}-{len(run_paths)}.jsonl")
+        files = [open(path, 'r') for path in run_paths]
+        try:
+            with open(merged_path + ".tmp", 'w') as out:
+                for _, line in heapq.merge(*(self._read_run_lines(f) for f in files), key=lambda item: item[0]):
+                    out.write(line)
+        finally:
+            for f in files:
+                f.close()
+
+        os.replace(merged_path + ".tmp", merged_path)
+        for path in run_paths:
+            os.remove(path)
+        return merged_path
+
+    @staticmethod
+    def _read_run(f) -> Iterator[Tuple[str, Dict]]:
+        for line in f:
+            record = json.loads(line)
+            yield record.get('category', 'General'), record
+
+    @staticmethod
+    def _read_run_lines(f) -> Iterator[Tuple[str, str]]:
+        for line in f:
+            yield json.loads(line).get('category', 'General'), line
+
+    @staticmethod
+    def _estimate_size(lesson) -> int:
+        """Rough in-memory footprint of a lesson: its strings plus object overhead."""
+        size = 200
+        for value in vars(lesson).values():
+            if isinstance(value, str):
+                size += 50 + len(value)
+            elif isinstance(value, list):
+                size += 56 + sum(50 + len(str(item)) for item in value)
+        return size
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Lesson Store for Lessons Learned Tracker
+Canonical SQLite store of lesson sections; CLAUDE.md and LESSONS_LEARNED.md are rendered from it as markdown views.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from types import SimpleNamespace
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    id TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    feature_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    lessons TEXT,
+    markdown TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rendered (
+    view TEXT NOT NULL,
+    section_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (view, section_id)
+);
+CREATE TABLE IF NOT EXISTS views (
+    view TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+REGION_BEGIN = "<!-- lessons:begin -->"
+REGION_END = "<!-- lessons:end -->"
+
+# Views written by hand keep this heading last; generated lessons go above it
+NOTES_HEADING = "## Notes for Development"
+
+def section_markers(section_id: str) -> Tuple[str, str]:
+    return f"<!-- lessons:section {section_id} -->", f"<!-- /lessons:section {section_id} -->"
+
+def category_markers(category: str) -> Tuple[str, str]:
+    return f"<!-- lessons:category {category} -->", f"<!-- /lessons:category {category} -->"
+
+class LessonStore:
+    """Single source of truth for lesson sections, with incrementally rendered views.
+
+    A section is identified by its category and feature name. Adding lessons
+    to a section merges them (duplicates are dropped) and re-renders only
+    that section's markdown. Each view file holds its sections between
+    comment markers, grouped in per-category blocks. render_view() splices
+    in only the sections whose hash differs from what that view last
+    received, so the cost follows the number of changed sections, not the
+    size of the store. A view edited outside the store (its size or mtime
+    no longer matches) is verified section by section on the next render.
+    Text outside the markers is never touched.
+    """
+
+    def __init__(self, db_path: str, formatter=None):
+        self.db_path = db_path
+        self.formatter = formatter
+
+        self.lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def add_lessons(self, category: str, feature_name: str, lessons: Iterable[Dict[str, any]]) -> Tuple[str, bool]:
+        """Merge structured lessons (dicts of lesson fields) into a section; returns (id, changed)."""
+        if self.formatter is None:
+            raise ValueError("rendering structured lessons needs a LessonFormatter")
+
+        section_id = self.section_id(category, feature_name)
+        with self.lock:
+            row = self.connection.execute("SELECT lessons FROM sections WHERE id = ?", (section_id,)).fetchone()
+            merged = json.loads(row[0]) if row and row[0] else []
+
+            known = {self._lesson_key(lesson) for lesson in merged}
+            for lesson in lessons:
+                key = self._lesson_key(lesson)
+                if key not in known:
+                    known.add(key)
+                    merged.append(lesson)
+
+            markdown = self.formatter.format_lesson_section(
+                [SimpleNamespace(**lesson) for lesson in merged], category, feature_name
+            ).strip()
+            return section_id, self._save_section(section_id, category, feature_name, merged, markdown)
+
+    def put_markdown(self, category: str, feature_name: str, markdown: str, section_id: Optional[str] = None) -> Tuple[str, bool]:
+        """Store a section as verbatim markdown; returns (id, changed)."""
+        section_id = section_id or self.section_id(category, feature_name)
+        with self.lock:
+            return section_id, self._save_section(section_id, category, feature_name, None, markdown.strip())
+
+    def remove_section(self, section_id: str) -> bool:
+        with self.lock:
+            return self.connection.execute("DELETE FROM sections WHERE id = ?", (section_id,)).rowcount == 1
+
+    def sections(self) -> List[Dict[str, any]]:
+        """Every section in insertion order, without its lesson list."""
+        rows = self.connection.execute(
+            "SELECT id, category, feature_name, markdown, hash, updated FROM sections ORDER BY position"
+        ).fetchall()
+        return [
+            {"id": row[0], "category": row[1], "feature_name": row[2], "markdown": row[3], "hash": row[4], "updated": row[5]}
+            for row in rows
+        ]
+
+    def iter_lessons(self) -> Iterator[Tuple[str, str, Dict[str, any]]]:
+        """(category, feature_name, lesson fields) for every structured lesson in the store."""
+        rows = self.connection.execute(
+            "SELECT category, feature_name, lessons FROM sections WHERE lessons IS NOT NULL ORDER BY position"
+        ).fetchall()
+        for category, feature_name, lessons in rows:
+            for lesson in json.loads(lessons):
+                yield category, feature_name, lesson
+
+    @staticmethod
+    def section_id(category: str, feature_name: str, namespace: str = "") -> str:
+        return hashlib.sha1(f"{namespace}\x00{category}\x00{feature_name}".encode('utf-8')).hexdigest()[:12]
+
+    def render_view(self, view_path: str, updater, title: str = "Lessons Learned", full: bool = False) -> Optional[int]:
+        """Splice changed sections into a view file; returns how many sections were written or removed.
+
+        updater is the ClaudeMdUpdater for view_path, which supplies the lock,
+        the backup ring and the changed-region write. Returns None if the
+        write failed (the view is restored from its backup).
+        """
+        view_path = os.path.abspath(view_path)
+        with self.lock:
+            verify = full or not self._view_unchanged(view_path)
+            if not verify and not self._dirty_sections(view_path) and not self._removed_sections(view_path):
+                return 0
+
+            written = []
+            recorded = []
+
+            def edit(content: str) -> str:
+                # Recomputed under the view's file lock, in case another process rendered meanwhile
+                if not content:
+                    content = f"# {title}\n"
+                if verify:
+                    sections = self.sections()
+                    recorded.extend((section["id"], section["hash"]) for section in sections)
+                    dirty = [section for section in sections if _block_content(content, section["id"]) != section["markdown"]]
+                else:
+                    dirty = self._dirty_sections(view_path)
+                    recorded.extend((section["id"], section["hash"]) for section in dirty)
+
+                for section in dirty:
+                    content = _splice_section(content, section)
+                    written.append(section["id"])
+                for section_id in self._removed_sections(view_path):
+                    content = _remove_block(content, *section_markers(section_id))
+                    written.append(section_id)
+                return content
+
+            if not updater.update_content(edit):
+                return None
+
+            self._record_view(view_path, recorded)
+            return len(written)
+
+    def import_markdown(self, view_path: str, updater, categories: Iterable[str] = ()) -> int:
+        """Take over the `## <Category> Lessons` / `### <Section>` sections of an existing view.
+
+        Each section is stored verbatim and wrapped in markers where it
+        stands, so the file becomes a view of the store without moving any
+        text. categories lists canonical names ("Build/Compilation") that
+        headings such as "Build & Compilation Lessons" are matched to.
+        Returns the number of sections imported.
+        """
+        view_path = os.path.abspath(view_path)
+        canonical = {_category_key(name): name for name in categories}
+        imported = []
+
+        def edit(content: str) -> str:
+            lines = content.split('\n')
+            output = []
+            category = None
+            section = None
+            last_section_end = None
+            managed = False
+
+            def close_section():
+                nonlocal section, last_section_end
+                if section is None:
+                    return
+                body = list(section["lines"])
+                while body and not body[-1].strip():
+                    body.pop()
+                markdown = '\n'.join(body).strip()
+                section_id = self.section_id(category, section["heading"], namespace="import")
+                self.put_markdown(category, section["heading"], markdown, section_id)
+                start, end = section_markers(section_id)
+                output.extend([start, markdown, end])
+                last_section_end = len(output)
+                output.extend([''] * (len(section["lines"]) - len(body)))
+                imported.append((section_id, self._hash(markdown)))
+                section = None
+
+            def close_category():
+                nonlocal category, last_section_end
+                close_section()
+                if last_section_end is not None:
+                    output.insert(last_section_end, category_markers(category)[1])
+                category = None
+                last_section_end = None
+
+            for index, line in enumerate(lines):
+                if managed or line.startswith("<!-- lessons:category "):
+                    # Blocks already under the store's control pass through untouched
+                    if not managed:
+                        close_category()
+                    managed = not line.startswith("<!-- /lessons:category ")
+                    output.append(line)
+                elif line.startswith('## '):
+                    close_category()
+                    heading = line[3:].strip()
+                    if heading.endswith(" Lessons") and _has_sections_after(lines, index):
+                        name = heading[:-len(" Lessons")]
+                        category = canonical.get(_category_key(name), name)
+                        output.append(category_markers(category)[0])
+                    output.append(line)
+                elif line.startswith('### ') and category:
+                    close_section()
+                    section = {"heading": line[4:].strip(), "lines": [line]}
+                elif line.strip() == '---' and section is not None:
+                    close_section()
+                    output.append(line)
+                elif section is not None:
+                    section["lines"].append(line)
+                else:
+                    output.append(line)
+
+            close_category()
+            return '\n'.join(output)
+
+        if not updater.update_content(edit):
+            return 0
+
+        with self.lock:
+            self._record_view(view_path, imported)
+        return len(imported)
+
+    def _save_section(self, section_id: str, category: str, feature_name: str,
+                      lessons: Optional[List[Dict[str, any]]], markdown: str) -> bool:
+        digest = self._hash(markdown)
+        row = self.connection.execute("SELECT hash, position FROM sections WHERE id = ?", (section_id,)).fetchone()
+        if row and row[0] == digest:
+            return False
+
+        if row:
+            position = row[1]
+        else:
+            position = self.connection.execute("SELECT COALESCE(MAX(position), 0) + 1 FROM sections").fetchone()[0]
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO sections (id, category, feature_name, position, lessons, markdown, hash, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (section_id, category, feature_name, position,
+             json.dumps(lessons, default=str) if lessons is not None else None, markdown, digest, time.time())
+        )
+        return True
+
+    def _dirty_sections(self, view_path: str) -> List[Dict[str, any]]:
+        rows = self.connection.execute(
+            "SELECT s.id, s.category, s.feature_name, s.markdown, s.hash FROM sections s "
+            "LEFT JOIN rendered r ON r.view = ? AND r.section_id = s.id "
+            "WHERE r.hash IS NULL OR r.hash != s.hash ORDER BY s.position",
+            (view_path,)
+        ).fetchall()
+        return [{"id": row[0], "category": row[1], "feature_name": row[2], "markdown": row[3], "hash": row[4]} for row in rows]
+
+    def _removed_sections(self, view_path: str) -> List[str]:
+        rows = self.connection.execute(
+            "SELECT section_id FROM rendered WHERE view = ? AND section_id NOT IN (SELECT id FROM sections)",
+            (view_path,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _view_unchanged(self, view_path: str) -> bool:
+        """True if the view file still has the size and mtime recorded after the last render."""
+        row = self.connection.execute("SELECT size, mtime_ns FROM views WHERE view = ?", (view_path,)).fetchone()
+        try:
+            file_stat = os.stat(view_path)
+        except OSError:
+            return False
+        return row is not None and row == (file_stat.st_size, file_stat.st_mtime_ns)
+
+    def _record_view(self, view_path: str, written: List[Tuple[str, str]]):
+        file_stat = os.stat(view_path)
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO rendered (view, section_id, hash) VALUES (?, ?, ?)",
+                [(view_path, section_id, digest) for section_id, digest in written]
+            )
+            self.connection.execute(
+                "DELETE FROM rendered WHERE view = ? AND section_id NOT IN (SELECT id FROM sections)", (view_path,)
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO views (view, size, mtime_ns) VALUES (?, ?, ?)",
+                (view_path, file_stat.st_size, file_stat.st_mtime_ns)
+            )
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    @staticmethod
+    def _lesson_key(lesson: Dict[str, any]) -> str:
+        return "\x00".join(str(lesson.get(name) or "") for name in ("context", "problem", "solution"))
+
+    @staticmethod
+    def _hash(markdown: str) -> str:
+        return hashlib.sha1(markdown.encode('utf-8')).hexdigest()
+
+def _block_span(content: str, start_marker: str, end_marker: str) -> Tuple[int, int]:
+    """(start, end) of a marker block including its end marker's newline, or (-1, -1)."""
+    start = content.find(start_marker)
+    if start == -1:
+        return -1, -1
+    end = content.find(end_marker, start)
+    if end == -1:
+        return -1, -1
+    end += len(end_marker)
+    if content.startswith('\n', end):
+        end += 1
+    return start, end
+
+def _block_content(content: str, section_id: str) -> Optional[str]:
+    start_marker, end_marker = section_markers(section_id)
+    start, end = _block_span(content, start_marker, end_marker)
+    if start == -1:
+        return None
+    return content[start + len(start_marker):content.rfind(end_marker, start, end)].strip()
+
+def _splice_section(content: str, section: Dict[str, any]) -> str:
+    """Replace a section's block, or add it at the end of its category block."""
+    start_marker, end_marker = section_markers(section["id"])
+    block = f"{start_marker}\n{section['markdown']}\n{end_marker}\n"
+
+    start, end = _block_span(content, start_marker, end_marker)
+    if start != -1:
+        return content[:start] + block + content[end:]
+
+    category_start, category_end = category_markers(section["category"])
+    category_span = _block_span(content, category_start, category_end)
+    if category_span[0] != -1:
+        insert_at = content.rfind(category_end, category_span[0], category_span[1])
+        return content[:insert_at] + block + "\n" + content[insert_at:]
+
+    category_block = f"{category_start}\n## {section['category']} Lessons\n\n{block}\n{category_end}\n"
+    return _insert_category(content, category_block)
+
+def _insert_category(content: str, category_block: str) -> str:
+    """Put a new category block at the end of the generated region, creating the region if needed."""
+    region_end = content.find(REGION_END)
+    if region_end != -1:
+        return content[:region_end] + category_block + "\n" + content[region_end:]
+
+    region = f"{REGION_BEGIN}\n{category_block}\n{REGION_END}\n"
+    notes = re.search(rf"^{re.escape(NOTES_HEADING)}", content, re.MULTILINE)
+    if notes:
+        return content[:notes.start()] + region + "\n" + content[notes.start():]
+    return content.rstrip('\n') + "\n\n" + region
+
+def _remove_block(content: str, start_marker: str, end_marker: str) -> str:
+    start, end = _block_span(content, start_marker, end_marker)
+    if start == -1:
+        return content
+    if content.startswith('\n', end):
+        end += 1
+    return content[:start] + content[end:]
+
+def _has_sections_after(lines: List[str], index: int) -> bool:
+    """Whether the `## ` heading at lines[index] has a `### ` section before the next `## `."""
+    for line in lines[index + 1:]:
+        if line.startswith('## '):
+            return False
+        if line.startswith('### '):
+            return True
+    return False
+
+def _category_key(name: str) -> str:
+    return re.sub(r'[^a-z]+', ' ', name.lower()).strip()
@@ -7,8 +7,17 @@ Integrates chat monitoring, commit analysis, and CLAUDE.md updating into a compl
 import os
 import sys
 import json
+import atexit
+import time
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
 from datetime import datetime
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
 import subprocess
 
 # Import our components
@@ -27,24 +36,142 @@ chat_detector_module = import_module_from_path("chat_pattern_detector", os.path.
 commit_analyzer_module = import_module_from_path("commit_analyzer", os.path.join(current_dir, "commit-analyzer.py"))
 lesson_formatter_module = import_module_from_path("lesson_formatter", os.path.join(current_dir, "lesson-formatter.py"))
 claude_md_updater_module = import_module_from_path("claude_md_updater", os.path.join(current_dir, "claude-md-updater.py"))
+repo_watcher_module = import_module_from_path("repo_watcher", os.path.join(current_dir, "repo-watcher.py"))
+batch_categorizer_module = import_module_from_path("batch_categorizer", os.path.join(current_dir, "batch-categorizer.py"))
+bounded_matcher_module = import_module_from_path("bounded_matcher", os.path.join(current_dir, "bounded-matcher.py"))
+lesson_clusterer_module = import_module_from_path("lesson_clusterer", os.path.join(current_dir, "lesson-clusterer.py"))
+lesson_spill_store_module = import_module_from_path("lesson_spill_store", os.path.join(current_dir, "lesson-spill-store.py"))
+diff_analyzer_module = import_module_from_path("diff_analyzer", os.path.join(current_dir, "diff-analyzer.py"))
+transcript_reader_module = import_module_from_path("transcript_reader", os.path.join(current_dir, "transcript-reader.py"))
+job_queue_module = import_module_from_path("job_queue", os.path.join(current_dir, "job-queue.py"))
+agent_metrics_module = import_module_from_path("agent_metrics", os.path.join(current_dir, "agent-metrics.py"))
+git_object_reader_module = import_module_from_path("git_object_reader", os.path.join(current_dir, "git-object-reader.py"))
+lesson_store_module = import_module_from_path("lesson_store", os.path.join(current_dir, "lesson-store.py"))
+memory_profiler_module = import_module_from_path("memory_profiler", os.path.join(current_dir, "memory-profiler.py"))
+lesson_correlator_module = import_module_from_path("lesson_correlator", os.path.join(current_dir, "lesson-correlator.py"))
+time_report_module = import_module_from_path("time_report", os.path.join(current_dir, "time-report.py"))
+lesson_index_module = import_module_from_path("lesson_index", os.path.join(current_dir, "lesson-index.py"))
 
 ChatPatternDetector = chat_detector_module.ChatPatternDetector
 CommitAnalyzer = commit_analyzer_module.CommitAnalyzer
 LessonFormatter = lesson_formatter_module.LessonFormatter
 ClaudeMdUpdater = claude_md_updater_module.ClaudeMdUpdater
+MultiRepoWatcher = repo_watcher_module.MultiRepoWatcher
+SpillingLessonStore = lesson_spill_store_module.SpillingLessonStore
+BatchCategorizer = batch_categorizer_module.BatchCategorizer
+LessonClusterer = lesson_clusterer_module.LessonClusterer
+LessonCorrelator = lesson_correlator_module.LessonCorrelator
+BoundedMatcher = bounded_matcher_module.BoundedMatcher
+DiffSignatureScanner = diff_analyzer_module.DiffSignatureScanner
+TranscriptReader = transcript_reader_module.TranscriptReader
+JobQueue = job_queue_module.JobQueue
+JobWorkerPool = job_queue_module.JobWorkerPool
+PipelineMetrics = agent_metrics_module.PipelineMetrics
+GitObjectReader = git_object_reader_module.GitObjectReader
+LessonStore = lesson_store_module.LessonStore
+TimeReport = time_report_module.TimeReport
+TimeRecord = time_report_module.TimeRecord
+LessonIndex = lesson_index_module.LessonIndex
+
+DEFAULT_PROJECT_PATH = "/Users/dakotabrown/LevelFitness-IOS"
+
+# Feature names used for section headings, keyed by the keyword that suggests them
+CHAT_FEATURE_KEYWORDS = {
+    "team": "Team Management",
+    "earnings": "Earnings Page", 
+    "competition": "Competitions Page",
+    "workout": "Workouts Integration",
+    "wallet": "Bitcoin Wallet",
+    "navigation": "Navigation System",
+    "wizard": "Creation Wizard",
+    "leaderboard": "Leaderboard System"
+}
+
+# Transcript files picked up by analyze-chat --dir
+TRANSCRIPT_EXTENSIONS = (".jsonl", ".txt")
+
+# Per-exchange cap in directory sweeps so one pathological file cannot exhaust a worker
+DIR_MAX_EXCHANGE_CHARS = 256 * 1024
+
+COMMIT_FEATURE_KEYWORDS = {
+    "team": "Team System",
+    "build": "Build Configuration",
+    "ui": "UI Implementation", 
+    "navigation": "Navigation System",
+    "wallet": "Bitcoin Wallet",
+    "api": "API Integration",
+    "constraint": "Layout System"
+}
+
+# Unfinished hook text kept in the resume file; older entries are dropped beyond these
+RESUME_MAX_TEXT_ENTRIES = 50
+RESUME_MAX_TEXT_BYTES = 512 * 1024
+
+class LessonWriteError(RuntimeError):
+    """Lessons were extracted but could not be written to CLAUDE.md or the lesson store."""
+
+class Deadline:
+    """Wall-clock budget shared by every stage of one run; None means unlimited."""
+    
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000.0 if budget_ms is not None else None
+    
+    def remaining_ms(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000.0)
+    
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
 
 class LessonsLearnedAgent:
     """Main agent that orchestrates lesson extraction and documentation."""
     
-    def __init__(self, project_path: str):
+    def __init__(self, project_path: str, claude_md_path: Optional[str] = None, analyze_diffs: bool = False,
+                 metrics: Optional[PipelineMetrics] = None, use_store: bool = False):
         self.project_path = project_path
-        self.claude_md_path = os.path.join(project_path, "CLAUDE.md")
+        self.claude_md_path = claude_md_path or os.path.join(project_path, "CLAUDE.md")
+        
+        # Stage timings and counters, in the process-wide registry unless given one
+        self.metrics = metrics or PipelineMetrics()
+        
+        # Reads refs and commits without forking git; lookups it cannot serve fall back to the binary
+        self.git_reader = GitObjectReader(project_path)
         
         # Initialize components
-        self.chat_detector = ChatPatternDetector()
-        self.commit_analyzer = CommitAnalyzer()
+        self.matcher = BoundedMatcher()
+        self.chat_detector = ChatPatternDetector(categorizer_class=BatchCategorizer, matcher=self.matcher,
+                                                 metrics=self.metrics)
+        self.commit_analyzer = CommitAnalyzer(
+            project_path,
+            categorizer_class=BatchCategorizer,
+            matcher=self.matcher,
+            diff_scanner=DiffSignatureScanner(project_path) if analyze_diffs else None,
+            metrics=self.metrics,
+            git_reader=self.git_reader
+        )
         self.formatter = LessonFormatter()
-        self.updater = ClaudeMdUpdater(self.claude_md_path)
+        self.updater = ClaudeMdUpdater(self.claude_md_path, metrics=self.metrics)
+        
+        # Optional canonical lesson store; CLAUDE.md and LESSONS_LEARNED.md become views rendered from it
+        self.store = None
+        self.views = []
+        if use_store:
+            self.store = LessonStore(os.path.join(os.path.dirname(self.claude_md_path), ".lessons-store.db"), self.formatter)
+            lessons_learned_path = os.path.join(project_path, "LESSONS_LEARNED.md")
+            self.views = [(self.claude_md_path, self.updater), (lessons_learned_path, ClaudeMdUpdater(lessons_learned_path, metrics=self.metrics))]
+        self.clusterer = LessonClusterer()
+        self.correlator = LessonCorrelator()
+        
+        # Full path -> lessons, plus the rename history, for 'lessons-for'
+        self.index = LessonIndex(os.path.join(os.path.dirname(self.claude_md_path), ".lessons-index.db"))
+        
+        # Work left over when a deadline cut a run short, picked up by later runs
+        self.resume_path = self.claude_md_path + ".resume.json"
+        
+        # Job handlers set this, so a failed write fails the job and it is retried
+        self.raise_on_write_failure = False
         
         # Session tracking
         self.session_lessons = []
@@ -54,47 +181,207 @@ class LessonsLearnedAgent:
         """Analyze a chat session for lessons learned."""
         print("🔍 Analyzing chat session for lesson patterns...")
         
-        lessons = self.chat_detector.extract_lessons_from_conversation(conversation_text)
-        
-        if lessons:
-            print(f"📚 Found {len(lessons)} potential lessons in conversation")
+        with self.metrics.stage("exchanges"):
+            exchanges = self.chat_detector._split_into_exchanges(conversation_text)
+        with self.metrics.stage("detection"):
+            lessons = list(self.chat_detector.iter_lessons(exchanges))
+        return self._format_chat_lessons(lessons)
+    
+    def analyze_transcript_file(self, transcript_path: str, max_memory_bytes: Optional[int] = None) -> Dict[str, any]:
+        """Analyze a JSONL session log directly, one record at a time."""
+        with open(transcript_path, 'rb') as f:
+            if max_memory_bytes:
+                return self.analyze_chat_stream(f, max_memory_bytes, jsonl=True)
             
-            # Group lessons by category
+            print("🔍 Analyzing session log for lesson patterns...")
+            reader = TranscriptReader()
+            with self.metrics.stage("detection"):
+                lessons = list(self.chat_detector.iter_lessons(reader.iter_exchanges(f)))
+        
+        if reader.records_skipped:
+            print(f"⏭️ Skipped {reader.records_skipped} oversized tool result(s) ({reader.bytes_skipped // 1024} KB)")
+        return self._format_chat_lessons(lessons)
+    
+    def analyze_transcript_range(self, transcript_path: str, start: int, end: int) -> Dict[str, any]:
+        """Analyze the JSONL records between two byte offsets and record any lessons."""
+        with open(transcript_path, 'rb') as f:
+            exchanges = TranscriptReader().iter_exchanges(transcript_reader_module.ByteRange(f, start, end))
+            with self.metrics.stage("detection"):
+                lessons = list(self.chat_detector.iter_lessons(exchanges))
+        
+        results = self._format_chat_lessons(lessons)
+        if results:
+            self.update_claude_md_with_lessons(results, f"{os.path.basename(transcript_path)} [{start}:{end}]",
+                                               write_key=f"transcript:{os.path.abspath(transcript_path)}:{start}:{end}")
+        return results
+    
+    def analyze_transcript_directory(self, directory: str, max_workers: Optional[int] = None,
+                                     cache_path: Optional[str] = None) -> Dict[str, any]:
+        """Analyze every transcript under a directory tree as one aggregated result.
+        
+        Files are handed to a process pool largest first, so the long files
+        start early and do not hold up the end of the sweep. Per-file lessons
+        are cached by path, size, mtime and detector version, and unchanged
+        files are not re-read on the next sweep. Each section lists the
+        source file (and timestamp, for JSONL logs) of every lesson.
+        """
+        cache_path = cache_path or os.path.join(directory, ".lessons-cache.json")
+        cache = _load_transcript_cache(cache_path)
+        version = _detector_version()
+        
+        pending = []
+        file_lessons = {}
+        for path in _find_transcripts(directory, exclude=cache_path):
+            file_stat = os.stat(path)
+            key = os.path.relpath(path, directory)
+            entry = cache.get(key)
+            if entry and entry["size"] == file_stat.st_size and entry["mtime_ns"] == file_stat.st_mtime_ns and entry["version"] == version:
+                file_lessons[key] = entry["lessons"]
+            else:
+                pending.append((file_stat.st_size, key, path, file_stat.st_mtime_ns))
+        
+        print(f"📂 {len(file_lessons) + len(pending)} transcript(s): {len(file_lessons)} cached, {len(pending)} to analyze")
+        
+        # Largest first keeps the slowest files off the tail of the schedule
+        pending.sort(reverse=True)
+        if pending:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(_analyze_transcript_file_worker, path): (size, key, mtime_ns) for size, key, path, mtime_ns in pending}
+                for done, future in enumerate(as_completed(futures), 1):
+                    size, key, mtime_ns = futures[future]
+                    try:
+                        lessons = future.result()
+                    except Exception as e:
+                        print(f"⚠️ Skipping {key}: {e}")
+                        continue
+                    
+                    file_lessons[key] = lessons
+                    cache[key] = {"size": size, "mtime_ns": mtime_ns, "version": version, "lessons": lessons}
+                    
+                    # Checkpoint so an interrupted sweep keeps its progress
+                    if done % 100 == 0:
+                        _save_transcript_cache(cache_path, cache)
+        
+        # Files that disappeared since the last sweep drop out of the cache
+        cache = {key: entry for key, entry in cache.items() if key in file_lessons}
+        _save_transcript_cache(cache_path, cache)
+        
+        lessons = []
+        provenance = {}
+        for key in sorted(file_lessons):
+            for fields in file_lessons[key]:
+                lesson = chat_detector_module.LessonPattern(**fields)
+                lessons.append(lesson)
+                provenance[id(lesson)] = {"file": key, "timestamp": lesson.timestamp}
+        
+        results = self._format_chat_lessons(lessons)
+        for result in results.values():
+            result["sources"] = [provenance[id(lesson)] for lesson in result["lessons"]]
+        return results
+    
+    def _format_chat_lessons(self, lessons: List) -> Dict[str, any]:
+        """Group chat lessons by category, cluster them into sections and format each."""
+        if not lessons:
+            print("ℹ️ No clear lesson patterns found in conversation")
+            return {}
+        
+        print(f"📚 Found {len(lessons)} potential lessons in conversation")
+        self.metrics.lessons.inc(len(lessons), source="chat")
+        
+        with self.metrics.stage("formatting"):
+            # Group lessons by category, then cluster each category into feature sections
             grouped_lessons = self._group_lessons_by_category(lessons)
             
             results = {}
             for category, cat_lessons in grouped_lessons.items():
-                # Generate feature name based on context
-                feature_name = self._infer_feature_name(cat_lessons)
-                
-                # Format for CLAUDE.md
-                formatted_section = self.formatter.format_lesson_section(
-                    cat_lessons, category, feature_name
-                )
-                
-                results[category] = {
-                    "feature_name": feature_name,
-                    "lessons": cat_lessons,
-                    "formatted_section": formatted_section,
-                    "lesson_count": len(cat_lessons)
-                }
+                for feature_name, section_lessons in self._cluster_into_sections(
+                    cat_lessons, self._chat_lesson_text, CHAT_FEATURE_KEYWORDS, self._infer_feature_name
+                ):
+                    # Format for CLAUDE.md
+                    formatted_section = self.formatter.format_lesson_section(
+                        section_lessons, category, feature_name
+                    )
+                    
+                    results[self._section_key(results, category, feature_name)] = {
+                        "category": category,
+                        "feature_name": feature_name,
+                        "lessons": section_lessons,
+                        "formatted_section": formatted_section,
+                        "lesson_count": len(section_lessons)
+                    }
+        
+        return results
+    
+    def analyze_chat_stream(self, lines: Iterable, max_memory_bytes: int,
+                            section_lesson_limit: int = 50, jsonl: bool = False) -> Dict[str, any]:
+        """Analyze a transcript line stream within a fixed memory budget.
+        
+        Lessons are spilled to disk once a quarter of the budget is buffered and
+        grouped by category with an external merge. Exchanges are capped at the
+        same size. Results carry per-category counts and a formatted section
+        built from the first `section_lesson_limit` lessons, not the full lists.
+        With jsonl=True, lines is a binary JSONL session log.
+        """
+        print(f"🔍 Analyzing chat stream for lesson patterns (memory budget {max_memory_bytes // (1024 * 1024)} MB)...")
+        
+        spill_threshold = max(max_memory_bytes // 4, 64 * 1024)
+        if jsonl:
+            exchanges = TranscriptReader(max_exchange_chars=spill_threshold).iter_exchanges(lines)
+        else:
+            if hasattr(lines, 'readline'):
+                lines = chat_detector_module.read_bounded_lines(lines, spill_threshold)
+            exchanges = self.chat_detector.iter_exchanges(lines, max_exchange_chars=spill_threshold)
+        
+        with SpillingLessonStore(spill_threshold, chat_detector_module.LessonPattern) as store:
+            with self.metrics.stage("detection"):
+                for lesson in self.chat_detector.iter_lessons(exchanges):
+                    store.add(lesson)
+            
+            if not store.count:
+                print("ℹ️ No clear lesson patterns found in conversation")
+                return {}
+            
+            spill_note = f", spilled to {len(store.runs)} run(s)" if store.spilled else ""
+            print(f"📚 Found {store.count} potential lessons in conversation{spill_note}")
+            self.metrics.lessons.inc(store.count, source="chat")
+            
+            results = {}
+            with self.metrics.stage("formatting"):
+                for category, cat_lessons in store.iter_groups():
+                    section_lessons = list(islice(cat_lessons, section_lesson_limit))
+                    remaining = sum(1 for _ in cat_lessons)
+                    feature_name = self._infer_feature_name(section_lessons)
+                    
+                    results[category] = {
+                        "feature_name": feature_name,
+                        "formatted_section": self.formatter.format_lesson_section(
+                            section_lessons, category, feature_name
+                        ),
+                        "lesson_count": len(section_lessons) + remaining,
+                        "lessons_in_section": len(section_lessons)
+                    }
             
             return results
-        
-        print("ℹ️ No clear lesson patterns found in conversation")
-        return {}
     
     def analyze_recent_commits(self, limit: int = 10) -> Dict[str, any]:
         """Analyze recent commits for lessons."""
         print(f"🔍 Analyzing last {limit} commits for lesson patterns...")
         
-        os.chdir(self.project_path)
-        commit_lessons = self.commit_analyzer.analyze_recent_commits(limit)
+        with self.metrics.stage("detection"):
+            commit_lessons = self.commit_analyzer.analyze_recent_commits(limit)
         
         if commit_lessons:
             print(f"📚 Found {len(commit_lessons)} lessons from commits")
-            
-            # Group by category
+            return self._format_commit_lessons(commit_lessons)
+        
+        print("ℹ️ No fix commits found in recent history")
+        return {}
+    
+    def _format_commit_lessons(self, commit_lessons: List) -> Dict[str, any]:
+        """Group commit lessons by category and format a section for each."""
+        self.metrics.lessons.inc(len(commit_lessons), source="commits")
+        
+        with self.metrics.stage("formatting"):
             grouped = {}
             for lesson in commit_lessons:
                 if lesson.category not in grouped:
@@ -103,47 +390,204 @@ class LessonsLearnedAgent:
             
             results = {}
             for category, lessons in grouped.items():
-                feature_name = self._infer_feature_name_from_commits(lessons)
-                
-                formatted_section = self.formatter.format_lesson_section(
-                    lessons, category, feature_name
-                )
-                
-                results[category] = {
-                    "feature_name": feature_name,
-                    "lessons": lessons,
-                    "formatted_section": formatted_section,
-                    "commit_count": len(lessons)
-                }
-            
-            return results
+                for feature_name, section_lessons in self._cluster_into_sections(
+                    lessons, self._commit_lesson_text, COMMIT_FEATURE_KEYWORDS, self._infer_feature_name_from_commits
+                ):
+                    formatted_section = self.formatter.format_lesson_section(
+                        section_lessons, category, feature_name
+                    )
+                    
+                    results[self._section_key(results, category, feature_name)] = {
+                        "category": category,
+                        "feature_name": feature_name,
+                        "lessons": section_lessons,
+                        "formatted_section": formatted_section,
+                        "commit_count": len(section_lessons)
+                    }
         
-        print("ℹ️ No fix commits found in recent history")
-        return {}
+        return results
+    
+    def _cluster_into_sections(self, lessons: List, text_of, feature_keywords: Dict[str, str], fallback_namer) -> List:
+        """Split one category's lessons into (feature_name, lessons) sections of related lessons."""
+        if len(lessons) < 2 * self.clusterer.min_cluster_size:
+            return [(fallback_namer(lessons), lessons)]
+        
+        sections = []
+        for cluster in self.clusterer.cluster(lessons, text_of):
+            feature_name = self.clusterer.name_cluster(cluster, feature_keywords, fallback_namer(cluster.members))
+            sections.append((feature_name, cluster.members))
+        return sections
+    
+    @staticmethod
+    def _section_key(results: Dict[str, any], category: str, feature_name: str) -> str:
+        """Result key: the category alone for its first section, qualified by feature after that."""
+        if category not in results:
+            return category
+        
+        key = f"{category} / {feature_name}"
+        suffix = 2
+        while key in results:
+            key = f"{category} / {feature_name} ({suffix})"
+            suffix += 1
+        return key
+    
+    @staticmethod
+    def _chat_lesson_text(lesson) -> str:
+        return f"{lesson.context} {lesson.problem} {lesson.solution} {' '.join(lesson.files_involved or [])}"
+    
+    @staticmethod
+    def _commit_lesson_text(lesson) -> str:
+        return f"{lesson.commit_message} {lesson.context} {' '.join(lesson.files_changed)}"
     
-    def update_claude_md_with_lessons(self, lesson_results: Dict[str, any], source: str = "chat") -> bool:
-        """Update CLAUDE.md with extracted lessons."""
+    def update_claude_md_with_lessons(self, lesson_results: Dict[str, any], source: str = "chat",
+                                      write_key: Optional[str] = None) -> bool:
+        """Update CLAUDE.md with extracted lessons, then index them by the files they touched.
+        
+        write_key identifies the input the lessons came from (a hook event,
+        a transcript range, a commit batch); writing the same key again is a
+        no-op, so a job that runs twice adds its sections once. The lesson
+        store deduplicates lessons itself. With raise_on_write_failure, a
+        failed write raises LessonWriteError instead of returning False.
+        """
+        if self.store:
+            success = self._update_store(lesson_results, source)
+        else:
+            success = self._write_sections(lesson_results, source, write_key)
+        
+        if success:
+            self._index_lessons(lesson_results)
+        elif self.raise_on_write_failure:
+            raise LessonWriteError(f"could not write {len(lesson_results)} lesson section(s) from {source}")
+        return success
+    
+    def _write_sections(self, lesson_results: Dict[str, any], source: str, write_key: Optional[str] = None) -> bool:
+        """Splice the formatted sections straight into CLAUDE.md."""
         print(f"📝 Updating CLAUDE.md with lessons from {source}...")
         
-        success_count = 0
-        total_count = len(lesson_results)
+        sections = [
+            (result['formatted_section'], result.get('category', key), result['feature_name'])
+            for key, result in lesson_results.items()
+        ]
         
-        for category, result in lesson_results.items():
-            success = self.updater.add_lesson_to_section(
-                result['formatted_section'],
-                category,
-                result['feature_name']
-            )
-            
-            if success:
-                success_count += 1
+        with self.metrics.stage("write"):
+            success = self.updater.add_lesson_sections(sections, write_key)
+        
+        if success:
+            self.metrics.sections_written.inc(len(sections))
+            print(f"✅ Successfully updated {len(sections)}/{len(sections)} lesson sections")
+        else:
+            self.metrics.write_failures.inc()
+            print(f"❌ Failed to update {len(sections)} lesson sections")
+        return success
+    
+    def _update_store(self, lesson_results: Dict[str, any], source: str) -> bool:
+        """Merge results into the lesson store, then re-render the sections that changed in every view."""
+        print(f"📝 Updating lesson store with lessons from {source}...")
+        
+        for key, result in lesson_results.items():
+            category = result.get('category', key)
+            if result.get('lessons'):
+                self.store.add_lessons(category, result['feature_name'], [
+                    lesson if isinstance(lesson, dict) else asdict(lesson) for lesson in result['lessons']
+                ])
+            else:
+                # Streamed results carry only the formatted section
+                self.store.put_markdown(category, result['feature_name'], result['formatted_section'])
         
-        print(f"✅ Successfully updated {success_count}/{total_count} lesson sections")
-        return success_count == total_count
+        return self.render_views()
     
-    def run_full_analysis(self, conversation_text: Optional[str] = None, commit_limit: int = 10) -> Dict[str, any]:
-        """Run complete analysis pipeline."""
+    def _index_lessons(self, lesson_results: Dict[str, any]) -> None:
+        """Record every written lesson under each file it names."""
+        for key, result in lesson_results.items():
+            category = result.get('category', key)
+            for lesson in result.get('lessons') or []:
+                fields = lesson if isinstance(lesson, dict) else asdict(lesson)
+                paths = fields.get('files_changed') or fields.get('files_involved')
+                if not paths:
+                    continue
+                
+                commit_hash = fields.get('commit_hash')
+                if commit_hash:
+                    lesson_id = f"commit:{commit_hash}"
+                else:
+                    text = f"{fields.get('context')}\x00{fields.get('problem')}\x00{fields.get('solution')}"
+                    lesson_id = "chat:" + hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+                
+                self.index.add_lesson(
+                    lesson_id, paths,
+                    source="commit" if commit_hash else "chat",
+                    category=category,
+                    title=fields.get('problem') or fields.get('context') or "",
+                    section=result['feature_name'],
+                    commit_hash=commit_hash,
+                    timestamp=fields.get('timestamp')
+                )
+    
+    def sync_path_renames(self) -> int:
+        """Teach the index the renames committed since the last sync; returns how many were new.
+        
+        The first sync walks the whole history once; later ones only the
+        commits since the recorded cursor. A cursor that is no longer in the
+        history (rewritten or rebased away) triggers a full walk again.
+        """
+        head = self._get_last_commit_hash()
+        if not head:
+            return 0
+        
+        cursor = self.index.get_meta("renames_through")
+        if cursor == head:
+            return 0
+        
+        revisions = [head]
+        if cursor and self._git_succeeds('merge-base', '--is-ancestor', cursor, head):
+            revisions = [f"{cursor}..{head}"]
+        
+        output = self._git_output('log', '-z', '-M', '--diff-filter=R', '--name-status', '--format=%x00%H', *revisions)
+        added = self.index.add_renames(lesson_index_module.parse_renames(output))
+        self.index.set_meta("renames_through", head)
+        return added
+    
+    def lessons_for(self, path: str) -> Dict[str, any]:
+        """Lessons recorded against a file under its current or any former path."""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.project_path)
+        
+        self.sync_path_renames()
+        return {
+            "path": path,
+            "aliases": self.index.aliases(path),
+            "lessons": self.index.lessons_for(path)
+        }
+    
+    def render_views(self, full: bool = False) -> bool:
+        """Splice changed store sections into CLAUDE.md and LESSONS_LEARNED.md."""
+        success = True
+        for view_path, updater in self.views:
+            with self.metrics.stage("write"):
+                written = self.store.render_view(view_path, updater, full=full)
+            
+            if written is None:
+                self.metrics.write_failures.inc()
+                print(f"❌ Failed to render {os.path.basename(view_path)}")
+                success = False
+            else:
+                self.metrics.sections_written.inc(written)
+                print(f"✅ Rendered {written} changed section(s) into {os.path.basename(view_path)}")
+        return success
+    
+    def run_full_analysis(self, conversation_text: Optional[str] = None, commit_limit: int = 10,
+                          deadline_ms: Optional[float] = None, conversation_source: Optional[str] = None) -> Dict[str, any]:
+        """Run complete analysis pipeline.
+        
+        With deadline_ms, stages run in priority order (the conversation, then
+        recent commits newest first, then work left over from earlier runs)
+        and the budget is checked between exchanges and between commits.
+        Lessons finished in time are written; the unfinished range is recorded
+        in CLAUDE.md.resume.json for a later run. conversation_source is the
+        file the text came from, recorded instead of the text itself.
+        """
         print("🚀 Starting full lessons learned analysis...")
+        deadline = Deadline(deadline_ms)
         
         results = {
             "timestamp": datetime.now().isoformat(),
@@ -151,36 +595,334 @@ class LessonsLearnedAgent:
             "commit_lessons": {},
             "summary": {}
         }
+        unfinished = {"chat": [], "commits": []}
         
         # Analyze chat if provided
+        chat_lessons = []
+        if conversation_text:
+            with self.metrics.stage("exchanges"):
+                exchanges = self.chat_detector._split_into_exchanges(conversation_text)
+            chat_lessons, done = self._analyze_exchanges_until(exchanges, deadline)
+            if done < len(exchanges):
+                unfinished["chat"].append(self._unfinished_chat_entry(exchanges, done, conversation_source))
+        
+        # Analyze recent commits
+        print(f"🔍 Analyzing last {commit_limit} commits for lesson patterns...")
+        commit_hashes = self._git_output('rev-list', f'-{commit_limit}', 'HEAD').split()
+        commit_lessons, unfinished["commits"] = self._analyze_commits_until(commit_hashes, deadline)
+        
+        # A fix discussed in the session and then committed becomes one lesson, kept with the commit
+        correlated = self.correlator.correlate(
+            chat_lessons, commit_lessons, lesson_correlator_module.file_time(conversation_source)
+        )
+        if correlated.merged:
+            print(f"🔗 Merged {correlated.merged} chat lesson(s) into the commits that shipped them")
+        
         if conversation_text:
-            chat_results = self.analyze_chat_session(conversation_text)
+            chat_results = self._format_chat_lessons(correlated.chat_lessons)
             results["chat_lessons"] = chat_results
             
             if chat_results:
                 self.update_claude_md_with_lessons(chat_results, "chat")
         
-        # Analyze recent commits
-        commit_results = self.analyze_recent_commits(commit_limit)
+        commit_results = self._format_commit_lessons(correlated.commit_lessons) if correlated.commit_lessons else {}
         results["commit_lessons"] = commit_results
         
         if commit_results:
             self.update_claude_md_with_lessons(commit_results, "commits")
         
+        # Spend whatever budget is left on earlier runs' leftovers
+        if deadline_ms is not None and not deadline.expired():
+            resumed = self.resume_unfinished(deadline)
+            results["chat_lessons"].update(self._prefixed("resumed", resumed["chat_lessons"]))
+            results["commit_lessons"].update(self._prefixed("resumed", resumed["commit_lessons"]))
+        
+        self._record_unfinished(unfinished)
+        
         # Generate summary
         total_lessons = len(results["chat_lessons"]) + len(results["commit_lessons"])
         results["summary"] = {
             "total_lessons_extracted": total_lessons,
             "chat_lesson_categories": list(results["chat_lessons"].keys()),
             "commit_lesson_categories": list(results["commit_lessons"].keys()),
-            "claude_md_updated": total_lessons > 0
+            "claude_md_updated": total_lessons > 0,
+            "correlated_lessons": correlated.merged,
+            "partial": bool(unfinished["chat"] or unfinished["commits"])
         }
         
         print(f"🎉 Analysis complete! Extracted {total_lessons} lessons")
         return results
     
-    def monitor_git_commits(self, watch_mode: bool = True) -> None:
-        """Monitor git commits in real-time for lesson extraction."""
+    def process_hook_event(self, event: Dict[str, any], deadline_ms: Optional[float] = None) -> Dict[str, any]:
+        """Analyze the text carried by a post-tool hook event and record any lessons.
+        
+        With deadline_ms, exchanges that do not fit the budget are recorded for
+        a later run, and leftover work is resumed only if time remains.
+        """
+        deadline = Deadline(deadline_ms)
+        text = "\n".join(self._collect_event_text(event.get("tool_input"))
+                         + self._collect_event_text(event.get("tool_response")))
+        if not text.strip():
+            return {}
+        
+        exchanges = self.chat_detector._split_into_exchanges(text)
+        lessons, done = self._analyze_exchanges_until(exchanges, deadline)
+        if done < len(exchanges):
+            self._record_unfinished({"chat": [self._unfinished_chat_entry(exchanges, done)], "commits": []})
+        
+        results = self._format_chat_lessons(lessons)
+        if results:
+            event_hash = hashlib.sha1(json.dumps(event, sort_keys=True).encode('utf-8')).hexdigest()
+            self.update_claude_md_with_lessons(results, "hook", write_key=f"hook-event:{event_hash}")
+        
+        if deadline_ms is not None and not deadline.expired():
+            resumed = self.resume_unfinished(deadline)
+            results.update(self._prefixed("resumed", resumed["chat_lessons"]))
+            results.update(self._prefixed("resumed commits", resumed["commit_lessons"]))
+        return results
+    
+    def resume_unfinished(self, deadline: Optional[Deadline] = None) -> Dict[str, Dict]:
+        """Pick up work that an earlier deadline cut short, recording anything still left.
+        
+        The claimed work stays on disk until its lessons are written: if
+        this run fails, the claim is handed back, and if the process is
+        killed, the next run folds the dead claim back in.
+        """
+        deadline = deadline or Deadline()
+        state, claim_path = self._take_unfinished()
+        try:
+            results = self._resume_claimed(state, deadline)
+        except BaseException:
+            self._return_claim(claim_path)
+            raise
+        
+        if claim_path:
+            os.remove(claim_path)
+        return results
+    
+    def _resume_claimed(self, state: Dict[str, List], deadline: Deadline) -> Dict[str, Dict]:
+        unfinished = {"chat": [], "commits": []}
+        
+        chat_lessons = []
+        for entry in state.get("chat", []):
+            exchanges = self._load_unfinished_exchanges(entry)
+            if exchanges is None:
+                continue
+            lessons, done = self._analyze_exchanges_until(exchanges, deadline)
+            chat_lessons.extend(lessons)
+            if done < len(exchanges):
+                unfinished["chat"].append(self._unfinished_chat_entry(exchanges, done, entry.get("file"), entry.get("start", 0)))
+        
+        commit_lessons, unfinished["commits"] = self._analyze_commits_until(state.get("commits", []), deadline)
+        self._record_unfinished(unfinished)
+        
+        chat_results = self._format_chat_lessons(chat_lessons) if chat_lessons else {}
+        commit_results = self._format_commit_lessons(commit_lessons) if commit_lessons else {}
+        if chat_results:
+            self.update_claude_md_with_lessons(chat_results, "resumed chat")
+        if commit_results:
+            self.update_claude_md_with_lessons(commit_results, "resumed commits")
+        
+        return {"chat_lessons": chat_results, "commit_lessons": commit_results}
+    
+    def _analyze_exchanges_until(self, exchanges: List[str], deadline: Deadline) -> Tuple[List, int]:
+        """Analyze exchanges in order until the deadline; returns lessons and how many were done."""
+        lessons = []
+        window = self.chat_detector.problem_window()
+        with self.metrics.stage("detection"):
+            for index, exchange in enumerate(exchanges):
+                if deadline.expired():
+                    return lessons, index
+                lesson = self.chat_detector._analyze_exchange(exchange, window)
+                if lesson:
+                    lessons.append(lesson)
+        return lessons, len(exchanges)
+    
+    def _analyze_commits_until(self, commit_hashes: List[str], deadline: Deadline) -> Tuple[List, List[str]]:
+        """Analyze commits in order until the deadline; returns lessons and the hashes not reached."""
+        lessons = []
+        done = 0
+        if deadline.expired():
+            return lessons, list(commit_hashes)
+        
+        with self.metrics.stage("detection"):
+            for _, lesson in self.commit_analyzer.iter_commit_lessons(commit_hashes):
+                done += 1
+                if lesson:
+                    lessons.append(lesson)
+                if deadline.expired():
+                    break
+        return lessons, list(commit_hashes[done:])
+    
+    def _unfinished_chat_entry(self, exchanges: List[str], done: int, source: Optional[str] = None, offset: int = 0) -> Dict[str, any]:
+        """Describe the exchanges not reached: a range of a file, or the texts themselves."""
+        if source and os.path.exists(source):
+            file_stat = os.stat(source)
+            return {"file": source, "size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns, "start": offset + done}
+        return {"exchanges": exchanges[done:]}
+    
+    def _load_unfinished_exchanges(self, entry: Dict[str, any]) -> Optional[List[str]]:
+        """Exchanges still to analyze for a recorded entry, or None if its file changed."""
+        if "exchanges" in entry:
+            return entry["exchanges"]
+        
+        try:
+            file_stat = os.stat(entry["file"])
+            if file_stat.st_size != entry["size"] or file_stat.st_mtime_ns != entry["mtime_ns"]:
+                print(f"⚠️ Dropping unfinished range of {entry['file']}: file changed since it was recorded")
+                return None
+            with open(entry["file"], 'r') as f:
+                exchanges = self.chat_detector._split_into_exchanges(f.read())
+        except (OSError, KeyError):
+            return None
+        
+        return exchanges[entry["start"]:]
+    
+    def _take_unfinished(self) -> Tuple[Dict[str, List], Optional[str]]:
+        """Claim all recorded leftover work by moving the resume file to a claim file.
+        
+        Returns the work and the claim file, which the caller deletes once
+        the work is done. Claims left by processes that no longer run are
+        folded back into the resume file first.
+        """
+        with self._resume_lock():
+            self._fold_dead_claims()
+            
+            claim_path = f"{self.resume_path}.claimed-{os.getpid()}-{threading.get_ident()}"
+            try:
+                os.replace(self.resume_path, claim_path)
+            except OSError:
+                return {}, None
+            
+            try:
+                with open(claim_path, 'r') as f:
+                    return json.load(f), claim_path
+            except (OSError, ValueError):
+                os.remove(claim_path)
+                return {}, None
+    
+    def _fold_dead_claims(self):
+        """Merge claim files whose process has exited back into the resume file. Caller holds the lock."""
+        directory = os.path.dirname(os.path.abspath(self.resume_path))
+        prefix = os.path.basename(self.resume_path) + ".claimed-"
+        for name in os.listdir(directory):
+            if not name.startswith(prefix):
+                continue
+            try:
+                pid = int(name[len(prefix):].split('-')[0])
+            except ValueError:
+                continue
+            if _process_alive(pid):
+                continue
+            
+            claim_path = os.path.join(directory, name)
+            print(f"♻️ Recovering leftover work claimed by exited process {pid}")
+            self._merge_claim(claim_path)
+    
+    def _return_claim(self, claim_path: Optional[str]):
+        """Hand claimed work back to the resume file after a failed resume."""
+        if claim_path:
+            with self._resume_lock():
+                self._merge_claim(claim_path)
+    
+    def _merge_claim(self, claim_path: str):
+        try:
+            with open(claim_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self._merge_into_resume_file({"chat": state.get("chat", []), "commits": state.get("commits", [])})
+        os.remove(claim_path)
+    
+    def _record_unfinished(self, unfinished: Dict[str, List]):
+        """Append leftover work to the resume file."""
+        if not unfinished["chat"] and not unfinished["commits"]:
+            return
+        
+        with self._resume_lock():
+            self._merge_into_resume_file(unfinished)
+        
+        print(f"⏳ Deadline reached: {len(unfinished['chat'])} chat range(s) and {len(unfinished['commits'])} commit(s) saved for a later run")
+    
+    def _merge_into_resume_file(self, unfinished: Dict[str, List]):
+        """Add work to the resume file, keeping stored hook text within bounds. Caller holds the lock."""
+        try:
+            with open(self.resume_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        
+        state["chat"] = self._bound_text_entries(state.get("chat", []) + unfinished["chat"])
+        state["commits"] = list(dict.fromkeys(state.get("commits", []) + unfinished["commits"]))
+        state["updated"] = datetime.now().isoformat()
+        
+        tmp_path = self.resume_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.resume_path)
+    
+    @staticmethod
+    def _bound_text_entries(entries: List[Dict[str, any]]) -> List[Dict[str, any]]:
+        """Keep the newest stored-text entries within RESUME_MAX_TEXT_ENTRIES and RESUME_MAX_TEXT_BYTES.
+        
+        File ranges are only a path and an offset and are always kept. A
+        single entry larger than the byte budget keeps its leading exchanges.
+        """
+        kept = []
+        count = 0
+        budget = RESUME_MAX_TEXT_BYTES
+        dropped = 0
+        for entry in reversed(entries):
+            if "exchanges" not in entry:
+                kept.append(entry)
+                continue
+            
+            exchanges = []
+            for exchange in entry["exchanges"]:
+                size = len(exchange.encode('utf-8'))
+                if count >= RESUME_MAX_TEXT_ENTRIES or size > budget:
+                    break
+                exchanges.append(exchange)
+                budget -= size
+            
+            dropped += len(entry["exchanges"]) - len(exchanges)
+            if exchanges:
+                kept.append({**entry, "exchanges": exchanges})
+                count += 1
+        
+        if dropped:
+            print(f"⚠️ Resume file full: dropped {dropped} unfinished exchange(s) of older hook events")
+        return kept[::-1]
+    
+    @contextmanager
+    def _resume_lock(self):
+        with open(self.resume_path + ".lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _prefixed(prefix: str, results: Dict[str, any]) -> Dict[str, any]:
+        return {f"{prefix}: {key}": value for key, value in results.items()}
+    
+    def _collect_event_text(self, value) -> List[str]:
+        """Flatten the string leaves of a hook event payload."""
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, dict):
+            return [text for item in value.values() for text in self._collect_event_text(item)]
+        if isinstance(value, list):
+            return [text for item in value for text in self._collect_event_text(item)]
+        return []
+    
+    def monitor_git_commits(self, watch_mode: bool = True, queue: Optional[JobQueue] = None) -> None:
+        """Monitor git commits in real-time for lesson extraction.
+        
+        With a queue, new commits are only enqueued as jobs for background
+        workers ('worker' command) instead of being analyzed in this loop.
+        """
         if not watch_mode:
             return
         
@@ -197,18 +939,14 @@ class LessonsLearnedAgent:
                 time.sleep(5)  # Check every 5 seconds
                 
                 current_commit = self._get_last_commit_hash()
-                if current_commit != last_commit:
-                    print(f"🆕 New commit detected: {current_commit[:8]}")
-                    
-                    # Analyze the new commit
-                    lesson = self.commit_analyzer.analyze_commit_by_hash(current_commit)
-                    if lesson:
-                        print(f"📚 Extracted lesson from commit: {lesson.context}")
-                        
-                        # Add to CLAUDE.md
-                        formatted = self.formatter.format_lesson_section([lesson], lesson.category, lesson.context)
-                        self.updater.add_lesson_to_section(formatted, lesson.category, lesson.context)
-                    
+                if current_commit and current_commit != last_commit:
+                    print(f"🆕 HEAD moved: {last_commit[:8] or '(none)'} → {current_commit[:8]}")
+                    if queue:
+                        commit_hashes = self._get_new_commit_hashes(last_commit, current_commit)
+                        queued = job_queue_module.enqueue_commits(queue, self.project_path, commit_hashes)
+                        print(f"📥 Queued {queued} commit job(s)")
+                    else:
+                        self.process_commit_range(last_commit, current_commit)
                     last_commit = current_commit
                     
         except KeyboardInterrupt:
@@ -229,18 +967,7 @@ class LessonsLearnedAgent:
         contexts = [getattr(lesson, 'context', '') for lesson in lessons]
         
         # Look for common feature keywords
-        feature_keywords = {
-            "team": "Team Management",
-            "earnings": "Earnings Page", 
-            "competition": "Competitions Page",
-            "workout": "Workouts Integration",
-            "wallet": "Bitcoin Wallet",
-            "navigation": "Navigation System",
-            "wizard": "Creation Wizard",
-            "leaderboard": "Leaderboard System"
-        }
-        
-        for keyword, feature in feature_keywords.items():
+        for keyword, feature in CHAT_FEATURE_KEYWORDS.items():
             if any(keyword in context.lower() for context in contexts):
                 return feature
         
@@ -249,30 +976,116 @@ class LessonsLearnedAgent:
     def _infer_feature_name_from_commits(self, commit_lessons: List) -> str:
         """Infer feature name from commit messages."""
         messages = [lesson.commit_message for lesson in commit_lessons]
-        combined_text = " ".join(messages).lower()
-        
-        feature_keywords = {
-            "team": "Team System",
-            "build": "Build Configuration",
-            "ui": "UI Implementation", 
-            "navigation": "Navigation System",
-            "wallet": "Bitcoin Wallet",
-            "api": "API Integration",
-            "constraint": "Layout System"
-        }
+        return self._commit_feature_name(" ".join(messages))
+    
+    @staticmethod
+    def _commit_feature_name(text: str) -> str:
+        combined_text = text.lower()
         
-        for keyword, feature in feature_keywords.items():
+        for keyword, feature in COMMIT_FEATURE_KEYWORDS.items():
             if keyword in combined_text:
                 return feature
         
         return "Development Fixes"
     
+    def process_commit_range(self, old_commit: str, new_commit: str) -> Dict[str, any]:
+        """Analyze every commit that HEAD gained between two positions, with one CLAUDE.md write."""
+        return self.process_commits(self._get_new_commit_hashes(old_commit, new_commit))
+    
+    def process_commits(self, commit_hashes: List[str]) -> Dict[str, any]:
+        """Analyze the given commits and record their lessons with one CLAUDE.md write."""
+        if not commit_hashes:
+            return {}
+        
+        print(f"🔍 Analyzing {len(commit_hashes)} new commit(s)...")
+        with self.metrics.stage("detection"):
+            commit_lessons = self.commit_analyzer.analyze_commits(commit_hashes)
+        
+        results = {}
+        if commit_lessons:
+            for lesson in commit_lessons:
+                print(f"📚 Extracted lesson from commit {lesson.commit_hash}: {lesson.context}")
+            
+            results = self._format_commit_lessons(commit_lessons)
+            self.update_claude_md_with_lessons(
+                results, "commits", write_key="commits:" + hashlib.sha1(" ".join(commit_hashes).encode()).hexdigest()
+            )
+        
+        self._record_commit_progress(commit_hashes[-1], len(commit_hashes))
+        return results
+    
+    def _record_commit_progress(self, newest_commit: str, count: int) -> None:
+        """Update the processed-commit counter and the lag behind the newest commit's commit time."""
+        now = time.time()
+        self.metrics.commits.inc(count)
+        self.metrics.last_processed.set(now)
+        
+        commit = self.git_reader.read_commit(newest_commit)
+        committed_at = str(commit.committer_time) if commit else self._git_output('log', '-1', '--format=%ct', newest_commit)
+        if committed_at.isdigit():
+            self.metrics.commit_lag.set(max(0.0, now - int(committed_at)))
+    
+    def _get_new_commit_hashes(self, old_commit: str, new_commit: str) -> List[str]:
+        """List commits reachable from new_commit that were not already processed, oldest first.
+        
+        Fast-forwards yield old..new. For non-fast-forward moves (rebase, reset,
+        amend) patch-equivalent rewrites of already-seen commits are skipped.
+        If the old position is no longer a valid commit, the previous HEAD
+        position from the reflog is used as the boundary instead. Linear
+        fast-forwards are walked in-process without running git.
+        """
+        if old_commit:
+            linear = self.git_reader.commits_between(old_commit, new_commit)
+            if linear is not None:
+                return linear
+        
+        if old_commit and not self._git_succeeds('cat-file', '-e', f'{old_commit}^{{commit}}'):
+            old_commit = self._git_output('rev-parse', '--verify', '-q', 'HEAD@{1}')
+        
+        if not old_commit:
+            return [new_commit]
+        
+        if self._git_succeeds('merge-base', '--is-ancestor', old_commit, new_commit):
+            rev_list = self._git_output('rev-list', '--reverse', f'{old_commit}..{new_commit}')
+        else:
+            rev_list = self._git_output(
+                'rev-list', '--reverse', '--cherry-pick', '--right-only', '--no-merges',
+                f'{old_commit}...{new_commit}'
+            )
+        
+        return rev_list.split()
+    
+    def _git_output(self, *args: str) -> str:
+        """Run a git command in the project and return stripped stdout ('' on failure)."""
+        try:
+            with self.metrics.stage("git"):
+                result = subprocess.run(['git', *args], capture_output=True, text=True, cwd=self.project_path)
+            if result.returncode == 0:
+                return result.stdout.strip()
+        except OSError:
+            pass
+        
+        return ""
+    
+    def _git_succeeds(self, *args: str) -> bool:
+        """Run a git command in the project and report whether it exited cleanly."""
+        try:
+            with self.metrics.stage("git"):
+                return subprocess.run(['git', *args], capture_output=True, cwd=self.project_path).returncode == 0
+        except OSError:
+            return False
+    
     def _get_last_commit_hash(self) -> str:
         """Get the hash of the last commit."""
+        head = self.git_reader.head()
+        if head:
+            return head
+        
         try:
-            result = subprocess.run([
-                'git', 'rev-parse', 'HEAD'
-            ], capture_output=True, text=True, cwd=self.project_path)
+            with self.metrics.stage("git"):
+                result = subprocess.run([
+                    'git', 'rev-parse', 'HEAD'
+                ], capture_output=True, text=True, cwd=self.project_path)
             
             if result.returncode == 0:
                 return result.stdout.strip()
@@ -281,6 +1094,62 @@ class LessonsLearnedAgent:
         
         return ""
     
+    def time_report(self, window_weeks: int = 4, since: Optional[str] = None) -> Dict[str, any]:
+        """Aggregate recorded debugging time from commit TIME: fields and from the lesson store.
+        
+        git selects the commits carrying a TIME: line itself, in one pass
+        over the history. Stored lessons from those same commits are not
+        counted twice.
+        """
+        print("⏱️ Collecting time spent from commit history and stored lessons...")
+        
+        records = []
+        seen_commits = set()
+        
+        args = ['log', '--no-merges', '-E', '-i', r'--grep=^[[:space:]]*time:[[:space:]]*[0-9.]+',
+                *commit_analyzer_module.LOG_ARGS]
+        if since:
+            args.append(f'--since={since}')
+        commits = self.commit_analyzer._parse_log_records(self._git_output(*args))
+        
+        categories = self.commit_analyzer.categorize_batch(
+            [commit['message'] for commit in commits], [commit['files_changed'] for commit in commits]
+        )
+        for commit, (category, _) in zip(commits, categories):
+            minutes = time_report_module.parse_minutes(commit['fields'].get('time'))
+            if minutes is None:
+                continue
+            seen_commits.add(commit['hash'][:8])
+            records.append(TimeRecord(
+                minutes=minutes,
+                timestamp=lesson_correlator_module.parse_timestamp(commit['date']),
+                category=category,
+                feature=self._commit_feature_name(commit['message']),
+                files=commit['files_changed'],
+                source="commit"
+            ))
+        
+        store_path = os.path.join(os.path.dirname(self.claude_md_path), ".lessons-store.db")
+        if self.store or os.path.exists(store_path):
+            since_time = lesson_correlator_module.parse_timestamp(since) if since else None
+            for category, feature_name, lesson in (self.store or LessonStore(store_path)).iter_lessons():
+                minutes = time_report_module.parse_minutes(lesson.get('time_spent'))
+                if minutes is None or lesson.get('commit_hash') in seen_commits:
+                    continue
+                timestamp = lesson_correlator_module.parse_timestamp(lesson.get('timestamp'))
+                if since_time and timestamp and timestamp < since_time:
+                    continue
+                records.append(TimeRecord(
+                    minutes=minutes,
+                    timestamp=timestamp,
+                    category=category,
+                    feature=feature_name,
+                    files=lesson.get('files_changed') or lesson.get('files_involved') or [],
+                    source="commit" if lesson.get('commit_hash') else "chat"
+                ))
+        
+        return TimeReport(records, window_weeks).build()
+    
     def create_lesson_from_manual_input(self, context: str, problem: str, solution: str, category: str = "General") -> bool:
         """Create a lesson from manual input."""
         print(f"📝 Creating manual lesson: {context}")
@@ -294,68 +1163,375 @@ class LessonsLearnedAgent:
             category=category
         )
         
+        if self.store:
+            self.store.add_lessons(category, context, [asdict(lesson)])
+            return self.render_views()
+        
         # Format and add to CLAUDE.md
         formatted = self.formatter.format_lesson_section([lesson], category, context)
         return self.updater.add_lesson_to_section(formatted, category, context)
 
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def make_job_handlers(agent_factory=None) -> Dict[str, callable]:
+    """Job handlers for JobWorkerPool, each using a per-thread agent for the job's repository.
+    
+    A failed CLAUDE.md write raises, so the job is retried instead of being
+    marked done.
+    """
+    agent_factory = agent_factory or LessonsLearnedAgent
+    local = threading.local()
+    
+    def agent_for(repo: str):
+        agents = getattr(local, "agents", None)
+        if agents is None:
+            agents = local.agents = {}
+        if repo not in agents:
+            agents[repo] = agent_factory(repo)
+            agents[repo].raise_on_write_failure = True
+        return agents[repo]
+    
+    return {
+        "commit": lambda payload: agent_for(payload["repo"]).process_commits([payload["commit"]]),
+        "transcript": lambda payload: agent_for(payload["repo"]).analyze_transcript_range(
+            payload["path"], payload["start"], payload["end"]
+        ),
+        "hook-event": lambda payload: agent_for(payload["repo"]).process_hook_event(payload["event"]),
+    }
+
+def _find_transcripts(directory: str, exclude: Optional[str] = None) -> List[str]:
+    """All transcript files below directory, skipping hidden entries and the cache file."""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(TRANSCRIPT_EXTENSIONS) and not name.startswith(".") and path != exclude:
+                paths.append(path)
+    return paths
+
+def _detector_version() -> str:
+    """Hash of the detection code, so cached results expire when it changes."""
+    digest = hashlib.sha256()
+    for name in ("chat-pattern-detector.py", "transcript-reader.py", "bounded-matcher.py"):
+        with open(os.path.join(current_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def _load_transcript_cache(cache_path: str) -> Dict[str, Dict]:
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_transcript_cache(cache_path: str, cache: Dict[str, Dict]):
+    """Atomically replace the per-file lesson cache."""
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+_worker_detector = None
+
+def _analyze_transcript_file_worker(path: str) -> List[Dict]:
+    """Process-pool entry point: extract one file's lessons as plain dicts.
+    
+    Lives at module level so it can be pickled by reference; each worker
+    process builds its detector once and reuses it for every file.
+    """
+    global _worker_detector
+    if _worker_detector is None:
+        _worker_detector = ChatPatternDetector(matcher=BoundedMatcher())
+    
+    lessons = []
+    with open(path, 'rb') as f:
+        if path.endswith(".jsonl"):
+            exchanges = (
+                (exchange.text, exchange.timestamp)
+                for exchange in TranscriptReader(max_exchange_chars=DIR_MAX_EXCHANGE_CHARS).iter_timed_exchanges(f)
+            )
+        else:
+            lines = (
+                line.decode('utf-8', errors='replace')
+                for line in chat_detector_module.read_bounded_lines(f, DIR_MAX_EXCHANGE_CHARS)
+            )
+            exchanges = ((text, None) for text in _worker_detector.iter_exchanges(lines, max_exchange_chars=DIR_MAX_EXCHANGE_CHARS))
+        
+        window = _worker_detector.problem_window()
+        for text, timestamp in exchanges:
+            lesson = _worker_detector._analyze_exchange(text, window)
+            if lesson:
+                lessons.append(dict(asdict(lesson), timestamp=timestamp or lesson.timestamp))
+    
+    return lessons
+
+def _pop_option(args: List[str], flag: str, default: Optional[str] = None) -> Optional[str]:
+    """Remove `flag value` or `flag=value` from args and return the value."""
+    for i, arg in enumerate(args):
+        if arg == flag and i + 1 < len(args):
+            value = args[i + 1]
+            del args[i:i + 2]
+            return value
+        if arg.startswith(flag + "="):
+            del args[i]
+            return arg.split("=", 1)[1]
+    return default
+
+def _pop_flag(args: List[str], flag: str) -> bool:
+    """Remove a boolean flag from args and report whether it was present."""
+    if flag in args:
+        args.remove(flag)
+        return True
+    return False
+
+def _parse_size(value: str) -> int:
+    """Parse a size like '512M', '2G' or '300' (megabytes) into bytes."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper().rstrip("B")
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(float(value) * units["M"])
+
+def _write_memory_profile(profiler, path: str):
+    profiler.write(path)
+    print(f"🧠 Memory profile written to {path}", file=sys.stderr)
+
 def main():
     """Main entry point for the agent."""
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    project_path = _pop_option(args, "--project", os.environ.get("LESSONS_PROJECT_PATH", DEFAULT_PROJECT_PATH))
+    max_memory = _pop_option(args, "--max-memory")
+    analyze_diffs = _pop_flag(args, "--with-diffs")
+    transcript_dir = _pop_option(args, "--dir")
+    workers = _pop_option(args, "--workers")
+    deadline_ms = _pop_option(args, "--deadline-ms")
+    deadline_ms = float(deadline_ms) if deadline_ms else None
+    queue_db = _pop_option(args, "--queue-db", os.environ.get("LESSONS_QUEUE_DB", job_queue_module.DEFAULT_QUEUE_DB))
+    use_queue = _pop_flag(args, "--queue")
+    use_store = _pop_flag(args, "--store") or bool(os.environ.get("LESSONS_STORE"))
+    metrics_port = _pop_option(args, "--metrics-port")
+    metrics_textfile = _pop_option(args, "--metrics-textfile")
+    memprofile = _pop_option(args, "--memprofile")
+    report_window = _pop_option(args, "--window")
+    since = _pop_option(args, "--since")
+    
+    if len(args) < 1:
         print("Usage:")
-        print("  python lessons-learned-agent.py analyze-chat <conversation_file>")
+        print("  python lessons-learned-agent.py analyze-chat <conversation_file | session.jsonl>")
+        print("  python lessons-learned-agent.py analyze-chat --dir <transcripts_dir> [--workers N]")
         print("  python lessons-learned-agent.py analyze-commits [limit]")
-        print("  python lessons-learned-agent.py monitor-commits")
+        print("  python lessons-learned-agent.py monitor-commits [--queue]")
+        print("  python lessons-learned-agent.py watch <repos_config.json>")
         print("  python lessons-learned-agent.py manual <context> <problem> <solution> [category]")
+        print("  python lessons-learned-agent.py backups")
+        print("  python lessons-learned-agent.py restore-backup <backup_id>")
+        print("  python lessons-learned-agent.py stats [--rebuild]")
+        print("  python lessons-learned-agent.py full-analysis [conversation_file] [--deadline-ms N]")
+        print("  python lessons-learned-agent.py resume [--deadline-ms N]")
+        print("  python lessons-learned-agent.py enqueue-commit <hash> [hash...]")
+        print("  python lessons-learned-agent.py enqueue-transcript <session.jsonl> [start_offset]")
+        print("  python lessons-learned-agent.py worker [--workers N] [--until-idle]")
+        print("  python lessons-learned-agent.py queue-stats [--retry-failed]")
+        print("  python lessons-learned-agent.py store-import [markdown_file]")
+        print("  python lessons-learned-agent.py render [--full]")
+        print("  python lessons-learned-agent.py report [--window WEEKS] [--since DATE]")
+        print("  python lessons-learned-agent.py lessons-for <path>")
+        print("Options:")
+        print("  --project <path>   Repository to analyze (default: $LESSONS_PROJECT_PATH)")
+        print("  --max-memory <size>  analyze-chat: stream the transcript within a memory budget (e.g. 256M)")
+        print("  --with-diffs         Scan commit diffs for concrete fix signatures")
+        print("  --deadline-ms <ms>   Stop after the budget, keep finished lessons and save the rest for 'resume'")
+        print("  --queue-db <path>    Job queue database (default: $LESSONS_QUEUE_DB or ~/.lessons-learned/jobs.db)")
+        print("  --queue              monitor-commits: enqueue new commits for 'worker' instead of analyzing inline")
+        print("  --store              Keep lessons in the canonical store and render CLAUDE.md/LESSONS_LEARNED.md from it")
+        print("  --metrics-port <port>      Serve Prometheus metrics on 127.0.0.1:<port>/metrics")
+        print("  --metrics-textfile <path>  Write Prometheus metrics to a textfile-collector file every 15s and at exit")
+        print("  --memprofile <path>        Write per-stage allocation sites and peak RSS as JSON at exit")
+        return
+    
+    command = args[0]
+    
+    if metrics_port:
+        server = agent_metrics_module.MetricsHTTPServer(agent_metrics_module.REGISTRY, int(metrics_port)).start()
+        print(f"📈 Metrics on http://127.0.0.1:{server.port}/metrics")
+    if metrics_textfile:
+        agent_metrics_module.TextfileExporter(agent_metrics_module.REGISTRY, metrics_textfile).start()
+    
+    if command == "watch":
+        if len(args) < 2:
+            print("❌ Please provide a repos config file")
+            return
+        
+        watcher = MultiRepoWatcher.from_config_file(
+            args[1],
+            lambda path, claude_md: LessonsLearnedAgent(path, claude_md, analyze_diffs=analyze_diffs, use_store=use_store)
+        )
+        watcher.run()
         return
     
-    project_path = "/Users/dakotabrown/LevelFitness-IOS"
-    agent = LessonsLearnedAgent(project_path)
+    if command == "worker":
+        queue = JobQueue(queue_db)
+        agent_metrics_module.REGISTRY.gauge("lessons_jobs", "Jobs in the queue database, by state.", ("state",)).set_function(
+            lambda: {(state,): count for state, count in queue.stats().items()}
+        )
+        pool = JobWorkerPool(
+            queue,
+            make_job_handlers(lambda path: LessonsLearnedAgent(path, analyze_diffs=analyze_diffs, use_store=use_store)),
+            workers=int(workers) if workers else 2
+        )
+        print(f"🧵 {pool.workers} job worker(s) on {queue_db}")
+        pool.run(until_idle="--until-idle" in args[1:])
+        print(f"✅ Processed {pool.processed} job(s), {pool.failed} failure(s)")
+        return
     
-    command = sys.argv[1]
+    if command == "queue-stats":
+        queue = JobQueue(queue_db)
+        if "--retry-failed" in args[1:]:
+            print(f"🔁 Re-queued {queue.retry_failed()} failed job(s)")
+        print(json.dumps({"counts": queue.stats(), "failed": queue.failed_jobs()}, indent=2))
+        return
+    
+    if command == "enqueue-transcript":
+        if len(args) < 2:
+            print("❌ Please provide a JSONL transcript path")
+            return
+        
+        queued = job_queue_module.enqueue_transcript(
+            JobQueue(queue_db), project_path, args[1], int(args[2]) if len(args) > 2 else None
+        )
+        print("📥 Transcript range queued" if queued else "ℹ️ Nothing new to queue")
+        return
+    
+    # Started before the agent exists so the profile also covers its setup
+    profiler = memory_profiler_module.StageMemoryProfiler().start() if memprofile else None
+    agent = LessonsLearnedAgent(project_path, analyze_diffs=analyze_diffs, use_store=use_store or command in ("store-import", "render"))
+    if profiler:
+        agent.metrics.profiler = profiler
+        atexit.register(_write_memory_profile, profiler, memprofile)
     
     if command == "analyze-chat":
-        if len(sys.argv) < 3:
+        if transcript_dir:
+            results = agent.analyze_transcript_directory(transcript_dir, int(workers) if workers else None)
+            print(json.dumps(results, indent=2, default=str))
+            return
+        
+        if len(args) < 2:
             print("❌ Please provide conversation file path")
             return
+        
+        if args[1].endswith(".jsonl"):
+            results = agent.analyze_transcript_file(args[1], _parse_size(max_memory) if max_memory else None)
+            print(json.dumps(results, indent=2, default=str))
+            return
+        
+        if max_memory:
+            with open(args[1], 'r', errors='replace') as f:
+                results = agent.analyze_chat_stream(f, _parse_size(max_memory))
+            print(json.dumps(results, indent=2, default=str))
+            return
             
-        with open(sys.argv[2], 'r') as f:
+        with open(args[1], 'r') as f, agent.metrics.stage("read"):
             conversation = f.read()
         
         results = agent.analyze_chat_session(conversation)
         print(json.dumps(results, indent=2, default=str))
     
     elif command == "analyze-commits":
-        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        limit = int(args[1]) if len(args) > 1 else 10
         results = agent.analyze_recent_commits(limit)
         print(json.dumps(results, indent=2, default=str))
     
     elif command == "monitor-commits":
-        agent.monitor_git_commits(watch_mode=True)
+        agent.monitor_git_commits(watch_mode=True, queue=JobQueue(queue_db) if use_queue else None)
+    
+    elif command == "enqueue-commit":
+        if len(args) < 2:
+            print("❌ Please provide at least one commit hash")
+            return
+        
+        commit_hashes = [agent._git_output('rev-parse', '--verify', '-q', f'{ref}^{{commit}}') or ref for ref in args[1:]]
+        queued = job_queue_module.enqueue_commits(JobQueue(queue_db), project_path, commit_hashes)
+        print(f"📥 Queued {queued} commit job(s)")
     
     elif command == "manual":
-        if len(sys.argv) < 5:
+        if len(args) < 4:
             print("❌ Usage: manual <context> <problem> <solution> [category]")
             return
             
-        context = sys.argv[2]
-        problem = sys.argv[3] 
-        solution = sys.argv[4]
-        category = sys.argv[5] if len(sys.argv) > 5 else "General"
+        context = args[1]
+        problem = args[2] 
+        solution = args[3]
+        category = args[4] if len(args) > 4 else "General"
         
         success = agent.create_lesson_from_manual_input(context, problem, solution, category)
         print("✅ Lesson added to CLAUDE.md" if success else "❌ Failed to add lesson")
     
     elif command == "full-analysis":
-        conversation_file = sys.argv[2] if len(sys.argv) > 2 else None
+        conversation_file = args[1] if len(args) > 1 else None
         conversation_text = None
         
         if conversation_file and os.path.exists(conversation_file):
-            with open(conversation_file, 'r') as f:
+            with open(conversation_file, 'r') as f, agent.metrics.stage("read"):
                 conversation_text = f.read()
         
-        results = agent.run_full_analysis(conversation_text)
+        results = agent.run_full_analysis(conversation_text, deadline_ms=deadline_ms, conversation_source=conversation_file)
+        print(json.dumps(results, indent=2, default=str))
+    
+    elif command == "resume":
+        results = agent.resume_unfinished(Deadline(deadline_ms))
         print(json.dumps(results, indent=2, default=str))
     
+    elif command == "backups":
+        for entry in agent.updater.list_backups():
+            print(f"{entry['id']}  {entry['created']}  {entry['size']} bytes")
+    
+    elif command == "restore-backup":
+        if len(args) < 2:
+            print("❌ Please provide a backup id (see 'backups')")
+            return
+        
+        agent.updater.restore_backup(args[1])
+    
+    elif command == "store-import":
+        # Default: adopt both existing views, so neither loses hand-written sections
+        paths = args[1:] or [view_path for view_path, _ in agent.views]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            updater = next((u for view_path, u in agent.views if os.path.abspath(view_path) == os.path.abspath(path)), None)
+            imported = agent.store.import_markdown(path, updater or ClaudeMdUpdater(path), agent.formatter.section_templates.keys())
+            print(f"📥 Imported {imported} section(s) from {path}")
+        agent.render_views()
+    
+    elif command == "render":
+        agent.render_views(full="--full" in args[1:])
+    
+    elif command == "report":
+        report = agent.time_report(int(report_window) if report_window else 4, since)
+        print(f"⏱️ {report['records']} record(s), {report['total_minutes'] / 60:.1f} hours")
+        print(json.dumps(report, indent=2))
+    
+    elif command == "lessons-for":
+        if len(args) < 2:
+            print("❌ Usage: lessons-for <path>")
+            return
+        
+        found = agent.lessons_for(args[1])
+        print(f"🔎 {len(found['lessons'])} lesson(s) for {found['path']} across {len(found['aliases'])} path(s)")
+        print(json.dumps(found, indent=2))
+    
+    elif command == "stats":
+        stats = agent.updater.get_lesson_statistics(rebuild="--rebuild" in args[1:])
+        print(json.dumps(stats, indent=2))
+    
     else:
         print(f"❌ Unknown command: {command}")
 
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Replay Load Generator for Lessons Learned Tracker
+Plays recorded or synthesized hook-event and commit streams against the agent in a scratch repository and reports lag, lost or duplicated lessons and CLAUDE.md write contention.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+import subprocess
+import contextlib
+import importlib.util
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+def import_module_from_path(module_name: str, file_path: str):
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+agent_module = import_module_from_path("lessons_learned_agent", os.path.join(current_dir, "lessons-learned-agent.py"))
+hook_prefilter_module = import_module_from_path("hook_prefilter", os.path.join(current_dir, "hook-prefilter.py"))
+
+agent_metrics_module = agent_module.agent_metrics_module
+job_queue_module = agent_module.job_queue_module
+lesson_correlator_module = agent_module.lesson_correlator_module
+
+# Synthetic streams are built from these, so the lessons read like the ones this project records
+COMPONENTS = [
+    ("Services", "WorkoutSyncQueue"), ("Services", "HealthKitService"), ("Services", "EarningsService"),
+    ("ViewControllers", "TeamDetailViewController"), ("ViewControllers", "CompetitionListViewController"),
+    ("Views", "LeaderboardCell"), ("Views", "TeamCreationWizardView"),
+]
+PROBLEMS = [
+    "crash when the session expired during sync", "blank page after returning from the background",
+    "constraint error when the keyboard appeared", "build error after adding the widget target",
+    "exception decoding the workout payload", "navigation stack broken after dismissing the wizard",
+]
+FIXES = [
+    "a guard for the missing session", "the missing height constraint on the container",
+    "the file to the app target membership", "an optional default for the payload field",
+    "a weak reference to the presenting controller",
+]
+
+@dataclass
+class TraceEvent:
+    time: float
+    kind: str
+    # hook-event: the event as the hook received it
+    event: Optional[Dict[str, any]] = None
+    # commit: the message and the paths it touches
+    message: Optional[str] = None
+    files: List[str] = field(default_factory=list)
+
+def load_trace(paths: Iterable[str]) -> List[TraceEvent]:
+    """Merge trace files into one stream ordered by time, starting at 0.
+
+    Times are Unix times, so a hook-event recording and the commits made
+    over the same hours interleave as they happened.
+    """
+    events = []
+    for path in paths:
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                events.append(TraceEvent(
+                    time=float(record["time"]),
+                    kind=record["kind"],
+                    event=record.get("event"),
+                    message=record.get("message"),
+                    files=record.get("files") or []
+                ))
+
+    events.sort(key=lambda event: event.time)
+    if events:
+        origin = events[0].time
+        for event in events:
+            event.time -= origin
+    return events
+
+def write_trace(events: Iterable[TraceEvent], path: str) -> int:
+    count = 0
+    with open(path, 'w') as f:
+        for event in events:
+            record = {"time": event.time, "kind": event.kind}
+            if event.kind == "hook-event":
+                record["event"] = event.event
+            else:
+                record["message"] = event.message
+                record["files"] = event.files
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+def record_commits(repo_path: str, since: Optional[str] = None, limit: Optional[int] = None) -> List[TraceEvent]:
+    """The repository's non-merge commits, oldest first, as replayable commit events."""
+    args = ['git', 'log', '--no-merges', *agent_module.commit_analyzer_module.LOG_ARGS]
+    if since:
+        args.append(f'--since={since}')
+    if limit:
+        args.append(f'-{limit}')
+    result = subprocess.run(args, capture_output=True, text=True, cwd=repo_path)
+    if result.returncode != 0:
+        raise ValueError(f"git log failed in {repo_path}: {result.stderr.strip()}")
+
+    analyzer = agent_module.CommitAnalyzer(repo_path)
+    events = []
+    for commit in reversed(analyzer._parse_log_records(result.stdout)):
+        timestamp = lesson_correlator_module.parse_timestamp(commit['date'])
+        if timestamp is None:
+            continue
+        events.append(TraceEvent(time=timestamp, kind="commit", message=commit['body'].strip('\n'),
+                                 files=commit['files_changed']))
+    return events
+
+def synthesize(hours: float = 1.0, events_per_hour: float = 300, commits_per_hour: float = 30,
+               lesson_share: float = 0.2, seed: Optional[int] = None) -> List[TraceEvent]:
+    """Poisson streams of hook events and commits, starting now; lesson_share of each carries a problem and its fix.
+
+    Every lesson gets a distinct case number, so two lessons never render
+    the same text and any repeat in CLAUDE.md is a real duplicate.
+    """
+    rng = random.Random(seed)
+    span = hours * 3600
+    events = []
+    case = 0
+    origin = time.time()
+
+    for kind, rate in (("hook-event", events_per_hour), ("commit", commits_per_hour)):
+        moment = rng.expovariate(rate / 3600) if rate > 0 else span
+        while moment < span:
+            directory, component = rng.choice(COMPONENTS)
+            path = f"RunstrRewards/{directory}/{component}.swift"
+            problem, fix = rng.choice(PROBLEMS), rng.choice(FIXES)
+
+            if rng.random() < lesson_share:
+                case += 1
+                if kind == "hook-event":
+                    events.append(TraceEvent(moment, kind, event=_hook_event(
+                        "Bash", {"command": "xcodebuild test -scheme RunstrRewards"},
+                        {"stdout": f"Test run failed: {problem} in {component} (case {case}).\n"
+                                   f"The issue was the order of setup in {path}; fixed by adding {fix}, working now."}
+                    )))
+                else:
+                    events.append(TraceEvent(moment, kind, files=[path], message=(
+                        f"Fix: {problem} in {component}\n\n"
+                        f"PROBLEM: {problem} in {component} (case {case})\n"
+                        f"SOLUTION: Added {fix}\n"
+                        f"TIME: {rng.choice([15, 30, 45, 90])} minutes"
+                    )))
+            elif kind == "hook-event":
+                events.append(TraceEvent(moment, kind, event=_hook_event(
+                    "Read", {"file_path": path}, {"content": f"import UIKit\n\nclass {component} {{\n}}\n"}
+                )))
+            else:
+                events.append(TraceEvent(moment, kind, files=[path], message=f"Add {rng.choice(['caching', 'logging', 'layout polish'])} to {component}"))
+
+            moment += rng.expovariate(rate / 3600)
+
+    events.sort(key=lambda event: event.time)
+    for event in events:
+        event.time += origin
+    return events
+
+def _hook_event(tool_name: str, tool_input: Dict[str, any], tool_response: Dict[str, any]) -> Dict[str, any]:
+    return {
+        "session_id": "replay",
+        "hook_event_name": "PostToolUse",
+        "tool_name": tool_name,
+        "tool_input": tool_input,
+        "tool_response": tool_response
+    }
+
+class ScratchRepository:
+    """A throwaway git repository that recorded commits are re-created in."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.commits = 0
+
+    def create(self) -> "ScratchRepository":
+        os.makedirs(self.path, exist_ok=True)
+        for args in (['init', '-q'], ['config', 'user.name', 'Replay'], ['config', 'user.email', 'replay@localhost'],
+                     ['config', 'commit.gpgsign', 'false']):
+            self._git(*args)
+
+        with open(os.path.join(self.path, "CLAUDE.md"), 'w') as f:
+            f.write("# CLAUDE.md\n\n## Lessons Learned\n\n")
+        with open(os.path.join(self.path, ".gitignore"), 'w') as f:
+            f.write("CLAUDE.md*\nLESSONS_LEARNED.md*\n.lessons-*\n")
+        self._git('add', '.gitignore')
+        self._git('commit', '-q', '-m', 'Initial commit')
+        return self
+
+    def commit(self, message: str, files: List[str]) -> str:
+        """Commit a change to each path (paths that cannot be created are skipped); returns the hash."""
+        self.commits += 1
+        touched = []
+        for path in files:
+            target = os.path.normpath(os.path.join(self.path, path))
+            if not target.startswith(self.path + os.sep):
+                continue
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'a') as f:
+                    f.write(f"// replayed change {self.commits}\n")
+                touched.append(path)
+            except OSError:
+                continue
+
+        if touched:
+            self._git('add', '--', *touched)
+        self._git('commit', '-q', '--allow-empty', '-F', '-', input=message or f"Replayed commit {self.commits}")
+        return self._git('rev-parse', 'HEAD').strip()
+
+    def _git(self, *args: str, input: Optional[str] = None) -> str:
+        result = subprocess.run(['git', *args], capture_output=True, text=True, cwd=self.path, input=input)
+        if result.returncode != 0:
+            raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result.stdout
+
+class ReplayRunner:
+    """Plays a trace against the agent and measures what comes out.
+
+    Events are dispatched at their trace time divided by speed. Hook events
+    pass through the same trigger prefilter as the real hook. Commits are
+    re-created in the scratch repository at their dispatch time, then
+    handed to the agent. mode "inline" runs each event on a pool of
+    concurrency threads, like hooks running the pipeline themselves;
+    mode "queue" enqueues jobs for a JobWorkerPool of concurrency workers.
+
+    Lag is measured per event from dispatch to the end of its handler, so
+    it includes queueing, analysis and the CLAUDE.md write. Every lesson an
+    event's handler reports is expected in CLAUDE.md exactly once; lessons
+    are identified by their rendered problem line.
+    """
+
+    def __init__(self, events: List[TraceEvent], scratch_dir: str, speed: float = 1.0,
+                 concurrency: int = 4, mode: str = "inline"):
+        if mode not in ("inline", "queue"):
+            raise ValueError(f"unknown mode '{mode}'")
+
+        self.events = events
+        self.scratch_dir = scratch_dir
+        self.speed = speed
+        self.concurrency = concurrency
+        self.mode = mode
+
+        self.repository = ScratchRepository(os.path.join(scratch_dir, "repo"))
+        # A registry of its own, so the figures cover this replay only
+        self.metrics = agent_metrics_module.PipelineMetrics(agent_metrics_module.MetricsRegistry())
+
+        self.lock = threading.Lock()
+        # Event index -> (kind, lag seconds, lesson problems); a rerun overwrites
+        self.outcomes: Dict[int, tuple] = {}
+        self.runs = 0
+        self.failures = 0
+        self.filtered = 0
+        self.max_behind = 0.0
+
+    def run(self) -> Dict[str, any]:
+        self.repository.create()
+        handlers = self._handlers()
+        dispatched = 0
+        started = time.monotonic()
+
+        if self.mode == "inline":
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="replay") as executor:
+                for index, kind, payload in self._dispatch(started):
+                    executor.submit(self._call, handlers[kind], payload)
+                    dispatched += 1
+        else:
+            queue = job_queue_module.JobQueue(os.path.join(self.scratch_dir, "jobs.db"))
+            pool = job_queue_module.JobWorkerPool(queue, handlers, workers=self.concurrency)
+            pool.start()
+            try:
+                for index, kind, payload in self._dispatch(started):
+                    queue.enqueue(kind, payload, key=f"replay:{index}")
+                    dispatched += 1
+                while not queue.is_idle():
+                    time.sleep(0.1)
+            finally:
+                pool.stop()
+
+        wall = time.monotonic() - started
+        return self._report(dispatched, wall)
+
+    def _dispatch(self, started: float):
+        """Yield (index, kind, payload) for each event at its scheduled time."""
+        repo = os.path.abspath(self.repository.path)
+        for index, event in enumerate(self.events):
+            due = started + event.time / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.max_behind = max(self.max_behind, -delay)
+
+            if event.kind == "hook-event":
+                if not hook_prefilter_module.has_trigger(json.dumps(event.event).encode("utf-8")):
+                    self.filtered += 1
+                    continue
+                payload = {"repo": repo, "event": event.event}
+            elif event.kind == "commit":
+                payload = {"repo": repo, "commit": self.repository.commit(event.message, event.files)}
+            else:
+                continue
+
+            payload["replay"] = {"index": index, "dispatched": time.monotonic()}
+            yield index, event.kind, payload
+
+    def _handlers(self) -> Dict[str, callable]:
+        handlers = agent_module.make_job_handlers(
+            lambda repo: agent_module.LessonsLearnedAgent(repo, metrics=self.metrics)
+        )
+
+        def measured(kind: str):
+            def handle(payload: Dict[str, any]):
+                try:
+                    results = handlers[kind](payload)
+                except Exception:
+                    with self.lock:
+                        self.runs += 1
+                        self.failures += 1
+                    raise
+
+                finished = time.monotonic()
+                problems = [
+                    lesson.problem if not isinstance(lesson, dict) else lesson.get('problem')
+                    for result in (results or {}).values() for lesson in result.get('lessons') or []
+                ]
+                with self.lock:
+                    self.runs += 1
+                    self.outcomes[payload["replay"]["index"]] = (
+                        kind, finished - payload["replay"]["dispatched"], problems
+                    )
+                return results
+            return handle
+
+        return {kind: measured(kind) for kind in ("hook-event", "commit")}
+
+    def _call(self, handler, payload: Dict[str, any]) -> None:
+        try:
+            handler(payload)
+        except Exception as e:
+            print(f"❌ Replay event {payload['replay']['index']} failed: {e}", file=sys.stderr)
+
+    def _report(self, dispatched: int, wall: float) -> Dict[str, any]:
+        lags: Dict[str, List[float]] = {"all": []}
+        expected = Counter()
+        for kind, lag, problems in self.outcomes.values():
+            lags["all"].append(lag)
+            lags.setdefault(kind, []).append(lag)
+            expected.update(problem for problem in problems if problem)
+
+        with open(os.path.join(self.repository.path, "CLAUDE.md"), 'r') as f:
+            content = f.read()
+
+        dropped, duplicated = [], []
+        written = 0
+        for problem, count in expected.items():
+            found = content.count(f"- {problem}\n")
+            written += min(found, count)
+            if found < count:
+                dropped.append({"problem": problem, "expected": count, "found": found})
+            elif found > count:
+                duplicated.append({"problem": problem, "expected": count, "found": found})
+
+        kinds = Counter(event.kind for event in self.events)
+        return {
+            "mode": self.mode,
+            "concurrency": self.concurrency,
+            "speed": self.speed,
+            "scratch_repo": self.repository.path,
+            "trace": {
+                "hook_events": kinds.get("hook-event", 0),
+                "commits": kinds.get("commit", 0),
+                "span_seconds": round(self.events[-1].time, 1) if self.events else 0.0
+            },
+            "dispatch": {
+                "dispatched": dispatched,
+                "filtered_hook_events": self.filtered,
+                "max_behind_seconds": round(self.max_behind, 3),
+                "wall_seconds": round(wall, 2)
+            },
+            "jobs": {
+                "completed": len(self.outcomes),
+                "failed_runs": self.failures,
+                "reruns": max(0, self.runs - self.failures - len(self.outcomes)),
+                "unfinished": dispatched - len(self.outcomes)
+            },
+            "lag_seconds": {kind: _summary(values) for kind, values in lags.items()},
+            "lessons": {
+                "expected": sum(expected.values()),
+                "written": written,
+                "dropped": sum(entry["expected"] - entry["found"] for entry in dropped),
+                "duplicated": sum(entry["found"] - entry["expected"] for entry in duplicated),
+                "dropped_examples": dropped[:5],
+                "duplicated_examples": duplicated[:5]
+            },
+            "claude_md": self._contention("CLAUDE.md")
+        }
+
+    def _contention(self, file_name: str) -> Dict[str, any]:
+        """Lock waits and rewrites of one markdown file, from the replay's metrics."""
+        series = self.metrics.lock_wait.series.get((file_name,))
+        acquisitions = sum(series[:-1]) if series else 0
+        wait_total = series[-1] if series else 0.0
+        contended = self.metrics.lock_contended.values.get((file_name,), 0.0)
+        rewrites = self.metrics.file_writes.values.get((file_name,), 0.0)
+        sections = self.metrics.sections_written.values.get((), 0.0)
+
+        return {
+            "lock_acquisitions": int(acquisitions),
+            "contended": int(contended),
+            "contended_share": round(contended / acquisitions, 3) if acquisitions else 0.0,
+            "wait_seconds_total": round(wait_total, 3),
+            "wait_seconds_mean": round(wait_total / acquisitions, 4) if acquisitions else 0.0,
+            "wait_p50_at_most": _bucket_quantile(self.metrics.lock_wait.buckets, series, 0.5),
+            "wait_p99_at_most": _bucket_quantile(self.metrics.lock_wait.buckets, series, 0.99),
+            "rewrites": int(rewrites),
+            "sections_written": int(sections),
+            "sections_per_rewrite": round(sections / rewrites, 2) if rewrites else 0.0
+        }
+
+def _summary(values: List[float]) -> Dict[str, any]:
+    if not values:
+        return {"count": 0}
+
+    values = sorted(values)
+    def percentile(q: float) -> float:
+        # Nearest rank
+        return round(values[min(len(values) - 1, max(0, int(q * len(values) + 0.999999) - 1))], 3)
+
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": round(values[-1], 3)
+    }
+
+def _bucket_quantile(buckets, series: Optional[List[float]], q: float) -> Optional[float]:
+    """Upper bound of the histogram bucket holding the q-quantile (None past the last bound)."""
+    if not series:
+        return None
+
+    target = q * sum(series[:-1])
+    cumulative = 0.0
+    for bound, count in zip(buckets, series):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return None
+
+def main():
+    args = sys.argv[1:]
+    pop_option, pop_flag = agent_module._pop_option, agent_module._pop_flag
+    since = pop_option(args, "--since")
+    limit = pop_option(args, "--limit")
+    hours = float(pop_option(args, "--hours", "1"))
+    events_per_hour = float(pop_option(args, "--events-per-hour", "300"))
+    commits_per_hour = float(pop_option(args, "--commits-per-hour", "30"))
+    lesson_share = float(pop_option(args, "--lesson-share", "0.2"))
+    seed = pop_option(args, "--seed")
+    speed = float(pop_option(args, "--speed", "1"))
+    concurrency = int(pop_option(args, "--concurrency", "4"))
+    mode = pop_option(args, "--mode", "inline")
+    scratch = pop_option(args, "--scratch")
+    report_path = pop_option(args, "--report")
+    verbose = pop_flag(args, "--verbose")
+
+    if not args or args[0] not in ("record-commits", "synthesize", "run"):
+        print("Usage:")
+        print("  python replay-load.py record-commits <repo> <trace.jsonl> [--since DATE] [--limit N]")
+        print("  python replay-load.py synthesize <trace.jsonl> [--hours H] [--events-per-hour N] [--commits-per-hour N]")
+        print("                                   [--lesson-share F] [--seed N]")
+        print("  python replay-load.py run <trace.jsonl> [more traces] [--speed X] [--concurrency N] [--mode inline|queue]")
+        print("                            [--scratch DIR] [--report PATH] [--verbose]")
+        print("\nHook events are recorded by setting LESSONS_RECORD_EVENTS=<trace.jsonl> for hook-prefilter.py.")
+        return
+
+    command = args[0]
+    if command == "record-commits":
+        if len(args) < 3:
+            print("❌ Usage: record-commits <repo> <trace.jsonl>")
+            return
+        count = write_trace(record_commits(args[1], since, int(limit) if limit else None), args[2])
+        print(f"📼 Recorded {count} commit(s) to {args[2]}")
+
+    elif command == "synthesize":
+        if len(args) < 2:
+            print("❌ Usage: synthesize <trace.jsonl>")
+            return
+        events = synthesize(hours, events_per_hour, commits_per_hour, lesson_share, int(seed) if seed else None)
+        count = write_trace(events, args[1])
+        print(f"🧪 Synthesized {count} event(s) over {hours:g} hour(s) to {args[1]}")
+
+    elif command == "run":
+        if len(args) < 2:
+            print("❌ Usage: run <trace.jsonl> [more traces]")
+            return
+        events = load_trace(args[1:])
+        scratch = scratch or tempfile.mkdtemp(prefix="lessons-replay-")
+        if os.path.exists(os.path.join(scratch, "repo")):
+            print(f"❌ {scratch} already holds a replay; choose an empty scratch directory")
+            return
+
+        print(f"▶️ Replaying {len(events)} event(s) at {speed:g}x with {concurrency} {mode} worker(s) in {scratch}")
+        runner = ReplayRunner(events, scratch, speed, concurrency, mode)
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                # The agent narrates every write; keep the report readable
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            report = runner.run()
+
+        lessons = report["lessons"]
+        status = "✅" if not lessons["dropped"] and not lessons["duplicated"] and not report["jobs"]["unfinished"] else "❌"
+        print(f"{status} {lessons['written']}/{lessons['expected']} lesson(s) written, "
+              f"{lessons['dropped']} dropped, {lessons['duplicated']} duplicated; "
+              f"p99 lag {report['lag_seconds']['all'].get('p99', 0)}s")
+        print(json.dumps(report, indent=2))
+        if report_path:
+            with open(report_path, 'w') as f:
+                json.dump(report, f, indent=2)
+                f.write('\n')
+
+if __name__ == "__main__":
+    main()
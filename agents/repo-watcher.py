@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Multi-Repository Watcher for Lessons Learned Tracker
+Watches many git repositories from one process and schedules their commit analysis on a shared worker pool.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+@dataclass
+class WatchedRepo:
+    name: str
+    agent: object
+    last_seen_commit: str = ""
+    pending_range: Optional[Tuple[str, str]] = None
+    in_flight: bool = False
+
+class MultiRepoWatcher:
+    """Polls several repositories and fairly schedules their analysis on a bounded pool.
+
+    Each repository has at most one analysis running and at most one pending
+    commit range; further HEAD moves while busy extend that range. Repositories
+    with pending work are served round-robin, so a busy repository cannot
+    starve the others.
+    """
+
+    def __init__(self, repos: List[WatchedRepo], max_workers: int = 4, poll_interval: float = 5.0):
+        self.repos = repos
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lessons-worker")
+        self.ready = deque()
+        self.running = 0
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_config_file(cls, config_path: str, agent_factory: Callable[..., object]) -> "MultiRepoWatcher":
+        """Build a watcher from a JSON config.
+
+        Example config:
+            {
+              "max_workers": 4,
+              "poll_interval": 5,
+              "repos": [
+                {"name": "ios", "path": "/src/LevelFitness-IOS"},
+                {"name": "backend", "path": "../backend", "claude_md": "../backend/docs/CLAUDE.md"}
+              ]
+            }
+        Relative paths are resolved against the config file's directory.
+        """
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+
+        base_dir = os.path.dirname(os.path.abspath(config_path))
+        repos = []
+        for entry in config.get("repos", []):
+            path = os.path.join(base_dir, os.path.expanduser(entry["path"]))
+            claude_md = entry.get("claude_md")
+            if claude_md:
+                claude_md = os.path.join(base_dir, os.path.expanduser(claude_md))
+
+            repos.append(WatchedRepo(
+                name=entry.get("name", os.path.basename(os.path.normpath(path))),
+                agent=agent_factory(os.path.normpath(path), claude_md)
+            ))
+
+        return cls(
+            repos,
+            max_workers=config.get("max_workers", 4),
+            poll_interval=config.get("poll_interval", 5.0)
+        )
+
+    def run(self) -> None:
+        """Poll all repositories until interrupted."""
+        print(f"👀 Watching {len(self.repos)} repositories with {self.max_workers} workers")
+        for repo in self.repos:
+            repo.last_seen_commit = repo.agent._get_last_commit_hash()
+            print(f"   {repo.name}: {repo.agent.project_path} @ {repo.last_seen_commit[:8] or '(no commits)'}")
+        print("   Press Ctrl+C to stop watching")
+
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                self.poll_once()
+
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching repositories")
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def poll_once(self) -> None:
+        """Check every repository's HEAD and schedule analysis for any that moved."""
+        for repo in self.repos:
+            current_commit = repo.agent._get_last_commit_hash()
+            if not current_commit or current_commit == repo.last_seen_commit:
+                continue
+
+            print(f"🆕 [{repo.name}] HEAD moved to {current_commit[:8]}")
+            with self.lock:
+                if repo.pending_range:
+                    # Coalesce with the range that is still waiting
+                    repo.pending_range = (repo.pending_range[0], current_commit)
+                else:
+                    repo.pending_range = (repo.last_seen_commit, current_commit)
+                    if not repo.in_flight:
+                        self.ready.append(repo)
+                repo.last_seen_commit = current_commit
+
+        self._dispatch()
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of scheduler state."""
+        with self.lock:
+            return {
+                "repos": len(self.repos),
+                "running": self.running,
+                "queued": len(self.ready)
+            }
+
+    def _dispatch(self) -> None:
+        """Hand ready repositories to the pool in round-robin order while workers are free."""
+        with self.lock:
+            while self.ready and self.running < self.max_workers:
+                repo = self.ready.popleft()
+                if repo.in_flight or not repo.pending_range:
+                    continue
+
+                old_commit, new_commit = repo.pending_range
+                repo.pending_range = None
+                repo.in_flight = True
+                self.running += 1
+                self.executor.submit(self._run, repo, old_commit, new_commit)
+
+    def _run(self, repo: WatchedRepo, old_commit: str, new_commit: str) -> None:
+        """Analyze one repository's commit range, then requeue it if more work arrived."""
+        try:
+            repo.agent.process_commit_range(old_commit, new_commit)
+        except Exception as e:
+            print(f"❌ [{repo.name}] Error analyzing {old_commit[:8]}..{new_commit[:8]}: {e}")
+        finally:
+            with self.lock:
+                repo.in_flight = False
+                self.running -= 1
+                if repo.pending_range:
+                    self.ready.append(repo)
+
+            self._dispatch()
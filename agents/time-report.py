@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Time Report for Lessons Learned Tracker
+Normalizes recorded debugging time to minutes and aggregates it by category, feature, file and week.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; aggregation falls back to pure Python
+    np = None
+
+# A "day" of debugging is a working day, not 24 hours
+MINUTES_PER_UNIT = {"d": 8 * 60, "h": 60, "m": 1}
+
+DURATION_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(days?|d|hours?|hrs?|h|minutes?|mins?|m)\b', re.IGNORECASE
+)
+
+# What may separate the parts of one duration ("2h 30m", "1 hour, 20 minutes", "1 day and 2 hours")
+DURATION_JOINER = re.compile(r'\s*(?:,\s*)?(?:and\s+)?', re.IGNORECASE)
+
+WEEK_SECONDS = 7 * 24 * 3600
+# 1970-01-05 was the first Monday after the epoch; weeks run Monday to Sunday, UTC
+WEEK_ORIGIN = 4 * 24 * 3600
+
+@dataclass
+class TimeRecord:
+    minutes: float
+    timestamp: Optional[float]
+    category: str
+    feature: str
+    files: List[str] = field(default_factory=list)
+    source: str = "commit"
+
+def parse_minutes(text: Optional[str]) -> Optional[float]:
+    """Minutes in the first duration phrase ("3 hours", "2h 30m", "45 mins"), or None if it has none.
+
+    Only a leading run of ever smaller units joined by spaces, commas or
+    "and" counts as one phrase, so "3 hours over 2 days" is 180 minutes.
+    """
+    if not text:
+        return None
+
+    total = None
+    previous = None
+    for match in DURATION_PATTERN.finditer(text):
+        unit = MINUTES_PER_UNIT[match.group(2)[0].lower()]
+        if previous is not None and not (
+            unit < previous[1] and DURATION_JOINER.fullmatch(text, previous[0].end(), match.start())
+        ):
+            break
+        total = (total or 0.0) + float(match.group(1)) * unit
+        previous = (match, unit)
+    return total
+
+class TimeReport:
+    """Aggregates time records; vectorized with NumPy when it is installed.
+
+    Every record is reduced to an integer code per dimension, so each
+    grouping is one weighted bincount. A record's minutes are split evenly
+    over its files, so file totals add up to the overall total. Weekly
+    totals per category form a (category x week) matrix, and the rolling
+    window is a difference of its cumulative sums along the week axis.
+    Records without a timestamp count in every total except the weekly ones.
+    """
+
+    def __init__(self, records: Sequence[TimeRecord], window_weeks: int = 4, top: int = 20):
+        self.records = list(records)
+        self.window_weeks = max(1, window_weeks)
+        self.top = top
+
+    def build(self) -> Dict[str, any]:
+        minutes = [record.minutes for record in self.records]
+        total = sum(minutes)
+
+        report = {
+            "records": len(self.records),
+            "undated": sum(1 for record in self.records if record.timestamp is None),
+            "total_minutes": round(total, 1),
+            "by_category": self._group([record.category for record in self.records], minutes, total),
+            "by_feature": self._group([record.feature for record in self.records], minutes, total),
+            "by_source": self._group([record.source for record in self.records], minutes, total),
+        }
+
+        file_keys = []
+        file_minutes = []
+        for record in self.records:
+            for path in record.files:
+                file_keys.append(path)
+                file_minutes.append(record.minutes / len(record.files))
+        report["by_file"] = self._group(file_keys, file_minutes, total)[:self.top]
+
+        report["weekly"] = self._weekly()
+        return report
+
+    def _group(self, keys: List[str], minutes: List[float], total: float) -> List[Dict[str, any]]:
+        """[{name, minutes, count, mean_minutes, share}] sorted by minutes, largest first."""
+        names, codes = _encode(keys)
+        sums = _bincount(codes, minutes, len(names))
+        counts = _bincount(codes, None, len(names))
+
+        groups = [
+            {
+                "name": name,
+                "minutes": round(sums[index], 1),
+                "count": int(counts[index]),
+                "mean_minutes": round(sums[index] / counts[index], 1) if counts[index] else 0.0,
+                "share": round(sums[index] / total, 3) if total else 0.0
+            }
+            for index, name in enumerate(names)
+        ]
+        return sorted(groups, key=lambda group: (-group["minutes"], group["name"]))
+
+    def _weekly(self) -> Dict[str, any]:
+        """Per-week totals and trailing window sums, overall and per category."""
+        dated = [record for record in self.records if record.timestamp is not None]
+        if not dated:
+            return {"window_weeks": self.window_weeks, "weeks": []}
+
+        week_numbers = [int((record.timestamp - WEEK_ORIGIN) // WEEK_SECONDS) for record in dated]
+        first_week = min(week_numbers)
+        week_count = max(week_numbers) - first_week + 1
+
+        categories, category_codes = _encode([record.category for record in dated])
+        cells = [code * week_count + (week - first_week) for code, week in zip(category_codes, week_numbers)]
+        matrix = _bincount(cells, [record.minutes for record in dated], len(categories) * week_count)
+
+        if np is not None:
+            matrix = np.asarray(matrix).reshape(len(categories), week_count)
+            rolling = _rolling_numpy(matrix, self.window_weeks)
+            rows, rolling_rows = matrix.tolist(), rolling.tolist()
+            per_week, rolling_total = matrix.sum(axis=0).tolist(), rolling.sum(axis=0).tolist()
+        else:
+            rows = [matrix[index * week_count:(index + 1) * week_count] for index in range(len(categories))]
+            rolling_rows = [_rolling_python(row, self.window_weeks) for row in rows]
+            per_week = [sum(column) for column in zip(*rows)]
+            rolling_total = [sum(column) for column in zip(*rolling_rows)]
+
+        weeks = []
+        for offset in range(week_count):
+            start = datetime.fromtimestamp((first_week + offset) * WEEK_SECONDS + WEEK_ORIGIN, tz=timezone.utc)
+            weeks.append({
+                "week": start.date().isoformat(),
+                "minutes": round(per_week[offset], 1),
+                "rolling_minutes": round(rolling_total[offset], 1),
+                "by_category": {
+                    category: round(rows[index][offset], 1)
+                    for index, category in enumerate(categories) if rows[index][offset]
+                },
+                "rolling_by_category": {
+                    category: round(rolling_rows[index][offset], 1)
+                    for index, category in enumerate(categories) if rolling_rows[index][offset]
+                }
+            })
+
+        return {"window_weeks": self.window_weeks, "weeks": weeks}
+
+def _encode(keys: List[str]) -> Tuple[List[str], List[int]]:
+    """Distinct keys in first-seen order, and each key's index among them."""
+    index: Dict[str, int] = {}
+    codes = [index.setdefault(key, len(index)) for key in keys]
+    return list(index), codes
+
+def _bincount(codes: List[int], weights: Optional[List[float]], size: int):
+    if np is not None:
+        return np.bincount(
+            np.asarray(codes, dtype=np.int64),
+            weights=None if weights is None else np.asarray(weights, dtype=np.float64),
+            minlength=size
+        ).astype(np.float64).tolist()
+
+    counts = [0.0] * size
+    for position, code in enumerate(codes):
+        counts[code] += 1.0 if weights is None else weights[position]
+    return counts
+
+def _rolling_numpy(matrix, window: int):
+    """Trailing window sums along the last axis: cumsum[k] - cumsum[k - window]."""
+    cumulative = np.cumsum(matrix, axis=-1)
+    rolling = cumulative.copy()
+    rolling[..., window:] -= cumulative[..., :-window]
+    return rolling
+
+def _rolling_python(values: List[float], window: int) -> List[float]:
+    rolling = []
+    running = 0.0
+    for index, value in enumerate(values):
+        running += value
+        if index >= window:
+            running -= values[index - window]
+        rolling.append(running)
+    return rolling
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Transcript Reader for Lessons Learned Tracker
+Streams JSONL session logs record by record and turns them into exchanges for ChatPatternDetector.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+# Content blocks carry their type right after the tool_use_id, well inside this many bytes
+MARKER_WINDOW_BYTES = 1024
+TOOL_RESULT_MARKERS = (b'"type":"tool_result"', b'"type": "tool_result"')
+
+class ByteRange:
+    """View of stream[start:end] providing the readline() TranscriptReader uses."""
+
+    def __init__(self, stream: BinaryIO, start: int, end: int):
+        self.stream = stream
+        self.end = end
+        stream.seek(start)
+
+    def readline(self, size: int = -1) -> bytes:
+        remaining = self.end - self.stream.tell()
+        if remaining <= 0:
+            return b''
+        return self.stream.readline(remaining if size < 0 else min(size, remaining))
+
+@dataclass
+class TranscriptExchange:
+    text: str
+    timestamp: Optional[str] = None
+
+class TranscriptReader:
+    """Reads session logs (one JSON record per line) without loading the whole file.
+
+    An exchange starts at a human prompt, or at a tool result that follows
+    assistant text, and runs up to the next such boundary. Build errors in
+    tool output therefore land in the same exchange as the assistant's
+    explanation of them. Messages are rendered as "user:", "assistant:" and
+    "tool:" lines. Records longer than max_tool_result_bytes whose first
+    bytes mark them as tool results are skipped without being decoded, and
+    are read past in bounded chunks so they are never held in memory at once.
+    """
+
+    def __init__(self, max_tool_result_bytes: int = 64 * 1024, max_exchange_chars: Optional[int] = None,
+                 include_tool_results: bool = True):
+        self.max_tool_result_bytes = max_tool_result_bytes
+        self.max_exchange_chars = max_exchange_chars
+        self.include_tool_results = include_tool_results
+
+        self.records_read = 0
+        self.records_skipped = 0
+        self.bytes_skipped = 0
+
+    def iter_exchanges(self, stream: BinaryIO) -> Iterator[str]:
+        """Yield exchange texts, the same shape ChatPatternDetector.iter_lessons() expects."""
+        for exchange in self.iter_timed_exchanges(stream):
+            yield exchange.text
+
+    def iter_timed_exchanges(self, stream: BinaryIO) -> Iterator[TranscriptExchange]:
+        """Yield exchanges with the timestamp of their first message."""
+        current_lines = []
+        current_size = 0
+        timestamp = None
+        previous_role = None
+
+        for role, text, message_timestamp in self.iter_messages(stream):
+            line = f"{role}: {text}"
+
+            starts_exchange = role == "user" or (role == "tool" and previous_role == "assistant")
+            previous_role = role
+            over_limit = self.max_exchange_chars and current_size + len(line) > self.max_exchange_chars
+            if (starts_exchange or over_limit) and current_lines:
+                yield TranscriptExchange('\n'.join(current_lines), timestamp)
+                current_lines = []
+                current_size = 0
+
+            if not current_lines:
+                timestamp = message_timestamp
+
+            if self.max_exchange_chars and len(line) > self.max_exchange_chars:
+                line = line[:self.max_exchange_chars]
+
+            current_lines.append(line)
+            current_size += len(line) + 1
+
+        if current_lines:
+            yield TranscriptExchange('\n'.join(current_lines), timestamp)
+
+    def iter_messages(self, stream: BinaryIO) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """Yield (role, text, timestamp) for every user, assistant and tool message."""
+        for raw in self._iter_records(stream):
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                continue
+
+            if not isinstance(record, dict) or record.get('type') not in ('user', 'assistant'):
+                continue
+
+            message = record.get('message') or {}
+            timestamp = record.get('timestamp')
+            content = message.get('content')
+            role = message.get('role', record['type'])
+
+            if isinstance(content, str):
+                if content.strip():
+                    yield role, content.strip(), timestamp
+                continue
+
+            for block in content or []:
+                if not isinstance(block, dict):
+                    continue
+
+                if block.get('type') == 'text' and block.get('text', '').strip():
+                    yield role, block['text'].strip(), timestamp
+                elif block.get('type') == 'tool_result' and self.include_tool_results:
+                    text = self._tool_result_text(block.get('content'))
+                    if text:
+                        yield "tool", text, timestamp
+
+    def _iter_records(self, stream: BinaryIO) -> Iterator[bytes]:
+        """Yield raw record lines, dropping oversized tool results undecoded."""
+        limit = self.max_tool_result_bytes
+
+        while True:
+            head = stream.readline(limit + 1)
+            if not head:
+                return
+
+            self.records_read += 1
+            if len(head) <= limit or head.endswith(b'\n'):
+                yield head
+                continue
+
+            # Longer than the limit: decide from the first bytes whether to keep it
+            window = head[:MARKER_WINDOW_BYTES]
+            if any(marker in window for marker in TOOL_RESULT_MARKERS):
+                self.records_skipped += 1
+                self.bytes_skipped += len(head) + self._discard_line(stream)
+                continue
+
+            chunks = [head]
+            while not chunks[-1].endswith(b'\n'):
+                chunk = stream.readline(limit + 1)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            yield b''.join(chunks)
+
+    def _discard_line(self, stream: BinaryIO) -> int:
+        """Skip the rest of the current line in bounded reads; returns bytes skipped."""
+        skipped = 0
+        while True:
+            chunk = stream.readline(self.max_tool_result_bytes + 1)
+            skipped += len(chunk)
+            if not chunk or chunk.endswith(b'\n'):
+                return skipped
+
+    @staticmethod
+    def _tool_result_text(content) -> str:
+        """Flatten a tool_result content field (string or list of text blocks)."""
+        if isinstance(content, str):
+            return content.strip()
+
+        parts: List[str] = []
+        for block in content or []:
+            if isinstance(block, dict) and block.get('type') == 'text':
+                parts.append(block.get('text', ''))
+        return '\n'.join(parts).strip()